@@ -0,0 +1,52 @@
+""" Benchmarks the roulette samplers in roulette_selection. Times the
+	per-generation build and the parent draws of the cumulative-sum 
+	binary search against the alias table for growing populations, 
+	and checks both reproduce the fitness weighting."""
+
+import time
+import numpy as np
+import roulette_selection as roulette
+
+pop_sizes = [1000, 10000, 100000, 1000000]
+pair_fraction = 0.5
+repeats = 5
+
+def time_sampler(sampler, fitness, draw_count, rng):
+	""" Times building a sampler and drawing from it. Returns the best
+		build and draw times over the repeats, in seconds."""
+	
+	build_times = []
+	draw_times = []
+	for _ in range(repeats):
+		start = time.perf_counter()
+		select_prob = roulette.build_sampler(fitness, sampler)
+		build_times.append(time.perf_counter() - start)
+		start = time.perf_counter()
+		roulette.draw_members(select_prob, draw_count, rng)
+		draw_times.append(time.perf_counter() - start)
+	return min(build_times), min(draw_times)
+
+def max_weight_error(sampler, fitness, rng, draw_count=2000000):
+	""" Compares draw frequencies to the fitness weighting. Returns the
+		largest absolute difference in selection probability."""
+	
+	select_prob = roulette.build_sampler(fitness, sampler)
+	counts = np.bincount(roulette.draw_members(select_prob, draw_count, rng), minlength=len(fitness))
+	return np.abs(counts / draw_count - fitness / fitness.sum()).max()
+
+if __name__ == '__main__':
+	rng = np.random.default_rng(0)
+	
+	fitness = rng.random(50)
+	for sampler in ('cumulative', 'alias'):
+		print("{:>10} max weight error: {:.5f}".format(sampler, max_weight_error(sampler, fitness, rng)))
+	
+	print("\n{:>10} {:>10} {:>12} {:>12}".format("Members", "Sampler", "Build (ms)", "Draw (ms)"))
+	for pop_size in pop_sizes:
+		fitness = rng.random(pop_size)
+		draw_count = 2 * int(pop_size * pair_fraction)
+		for sampler in ('cumulative', 'alias'):
+			build_time, draw_time = time_sampler(sampler, fitness, draw_count, rng)
+			print("{:>10} {:>10} {:>12.2f} {:>12.2f}".format(pop_size, sampler, 1000 * build_time, 1000 * draw_time))
+
+# ~~~ End ~~~
@@ -3,6 +3,7 @@ material_location ='material_properties.csv'
 force_location ='component_forces.txt'
 client_location ='client_info.csv'
 
+import design_context
 import utility_functions as utility
 import extfile_functions as extf
 import genetic_algorithm_functions as gaf
@@ -22,6 +23,8 @@ current_cycle = 0
 
 valid_gen = False
 
+design_context.configure(material_location, force_location, client_location)
+flf.size_component_cache(member_count)
 client_info = extf.import_client_info(client_location)
 while current_cycle < cycle_count: 
 	pop_count_list = []
@@ -77,22 +80,24 @@ while current_cycle < cycle_count:
 			input("Valid generation. Any key to continue...")
 
 	current_gen = 0
+	store = gaf.build_population_store(pop_list)
 
 	while current_gen < generation_count:
 		gen_start = time.time()
-		total_fitness = fe.fitness_evaluation(pop_list)
-		roulette.evaluate(pop_list)
+		fe.population_fitness_evaluation(store)
+		total_fitness = float(store.fitness.sum())
+		roulette.population_evaluate(store)
 		
-		print("\nPopulation size: " + str(len(pop_list)) + '\n')
+		print("\nPopulation size: " + str(len(store)) + '\n')
 		print("Current Generation: " + str(current_gen))
-		max_fitness,min_fitness = utility.min_max_member_fitness(pop_list)
+		max_fitness,min_fitness = float(store.fitness.max()), float(store.fitness.min())
 		print("Max Fitness: " + str(max_fitness))
 		print("Min Fitness: " + str(min_fitness))
 		gen_end = time.time()
 		print("Generation Time: " + str(gen_end-gen_start))
-		print("Average Fitness: " + str(total_fitness/len(pop_list)) + '\n')
+		print("Average Fitness: " + str(total_fitness/len(store)) + '\n')
 		
-		pop_count_list.append(len(pop_list))
+		pop_count_list.append(len(store))
 		max_fitness_list.append(max_fitness)
 		total_fitness_list.append(total_fitness)
 		current_gen += 1
@@ -100,6 +105,6 @@ while current_cycle < cycle_count:
 	extf.export_generation_data(pop_count_list,max_fitness_list,total_fitness_list)
 	end = time.time()
 	print("Elapsed Time: " + str(end-start))
-	cycle_count += 1
+	current_cycle += 1
 	setattr(PopMember,'is_initial_gen',True)
 print("\n~~~~~~ Program End ~~~~~~\n")
@@ -0,0 +1,107 @@
+""" Declares the component schema of the full-leg design: the design
+	variables, derived variables and gene width of each component type,
+	and the components making up a population member. The schema is
+	built once at import, so component lists, variable lists and the
+	genome layout are precomputed tuples rather than scans of instance
+	attributes."""
+from genome_layout import GENE_BITS, compile_layout
+
+class ComponentSchema():
+	""" Variables of one component type. design_variables are the genes,
+		in genome order. derived_variables are set by the component's
+		calculated_variables from the genes. kind groups the types that 
+		are evaluated alike, e.g. every cylinder type is a 'Cylinder', 
+		and defaults to the type name."""
+
+	def __init__(self, type_name, design_variables, derived_variables=(), gene_bits=GENE_BITS, kind=None):
+		self.type_name = type_name
+		self.kind = type_name if kind is None else kind
+		self.design_variables = tuple(design_variables)
+		self.derived_variables = tuple(derived_variables)
+		self.gene_bits = gene_bits
+		self.var_count = len(self.design_variables)
+		self.bit_count = self.var_count * gene_bits
+
+class MemberSchema():
+	""" Components of a population member, as (component name, schema)
+		pairs in member order."""
+
+	def __init__(self, components):
+		self.components = tuple(components)
+		self.component_names = tuple(comp_name for comp_name, schema in self.components)
+		self.component_types = tuple(schema.type_name for comp_name, schema in self.components)
+		self.comp_count = len(self.components)
+		gene_bits = {schema.gene_bits for comp_name, schema in self.components}
+		if len(gene_bits) > 1:
+			raise ValueError("Components must share one gene width: " + str(sorted(gene_bits)))
+		self.gene_bits = gene_bits.pop() if gene_bits else GENE_BITS
+		self._layout = None
+
+	def layout(self):
+		""" Returns the GenomeLayout of the member, compiled on first
+			use."""
+
+		if self._layout is None:
+			self._layout = compile_layout(self.component_names, self.component_types, [schema.design_variables for comp_name, schema in self.components], self.gene_bits)
+		return self._layout
+
+# ~~~ Component Types ~~~
+
+CYLINDER_VARIABLES = ('inner_diameter', 'cyl_length', 'cyl_thickness', 'base_thickness')
+CYLINDER_DERIVED = ('calc_r_head',)
+
+CYLINDER = ComponentSchema('Cylinder', CYLINDER_VARIABLES, CYLINDER_DERIVED)
+MAIN_CYLINDER = ComponentSchema('MainCylinder', CYLINDER_VARIABLES, CYLINDER_DERIVED, kind='Cylinder')
+RECEIVER_CYLINDER = ComponentSchema('ReceiverCylinder', CYLINDER_VARIABLES, CYLINDER_DERIVED, kind='Cylinder')
+STRUCTURE = ComponentSchema('Structure',
+	('rib_width', 'rib_length', 'flange_width', 'flange_thickness', 'core_diameter', 'core_inner_diameter', 'core_thickness', 'mount_thickness', 'mount_width', 'mount_modifier', 'mount_peg_diameter'),
+	('calc_flange_radius', 'calc_mount_width', 'calc_mount_height'))
+GIMBAL = ComponentSchema('Gimbal',
+	('peg_length', 'peg_diameter', 'mount_modifier', 'mount_thickness'),
+	('calc_mount_width', 'calc_mount_height'))
+
+# Component types by type name. >>> Modify with added component types <<<
+COMPONENT_TYPES = {schema.type_name: schema for schema in (CYLINDER, MAIN_CYLINDER, RECEIVER_CYLINDER, STRUCTURE, GIMBAL)}
+
+def kind_components(layout, kind):
+	""" Names of the components of a genome layout whose type is of the
+		given kind, in layout order. Returns a tuple."""
+
+	return tuple(comp_name for comp_name, comp_type in zip(layout.comp_names, layout.comp_types) if COMPONENT_TYPES[comp_type].kind == kind)
+
+def kind_variables(layout, kind):
+	""" Design variables shared by the components of a genome layout of
+		the given kind. Returns a tuple, empty if the layout has no such
+		component."""
+
+	var_names = {COMPONENT_TYPES[comp_type].design_variables for comp_type in layout.comp_types if COMPONENT_TYPES[comp_type].kind == kind}
+	if len(var_names) > 1:
+		raise ValueError("Component types of kind " + kind + " have different design variables")
+	return var_names.pop() if var_names else ()
+
+# ~~~ Population Member ~~~
+# >>> Modify with added components <<<
+
+MEMBER = MemberSchema((
+	('FemurStructure', STRUCTURE),
+	('TibiaStructure', STRUCTURE),
+	('HipGimbal', GIMBAL),
+	('KneeGimbal', GIMBAL),
+	('AnkleGimbal', GIMBAL),
+	('AnkleAbductCylinder', CYLINDER),
+	('AnkleAdductCylinder', CYLINDER),
+	('AnkleExtendCylinder', CYLINDER),
+	('AnkleFlexCylinder', CYLINDER),
+	('AnkleInternalCylinder', CYLINDER),
+	('AnkleExternalCylinder', CYLINDER),
+	('HipAbductCylinder', CYLINDER),
+	('HipAdductCylinder', CYLINDER),
+	('HipExtendCylinder', CYLINDER),
+	('HipFlexCylinder', CYLINDER),
+	('KneeExtendCylinder', CYLINDER),
+	('KneeFlexCylinder', CYLINDER),
+	('MainCylinder', MAIN_CYLINDER),
+	('ReceiverCylinder', RECEIVER_CYLINDER),
+	))
+
+# ~~~ End ~~~
@@ -0,0 +1,94 @@
+""" Runs the GA cycles of the _test.py study as independent, seeded jobs
+	in a process pool. Each cycle evolves its own population as a 
+	PopulationStore, writes its
+	own generation data file, and returns a summary; the summaries are
+	merged into one cycle summary file at the end. Workers use the design
+	context current in the parent, set with design_context.configure()."""
+
+import os, random, time
+from concurrent.futures import ProcessPoolExecutor
+
+import design_context
+import utility_functions as utility
+import full_leg_functions as flf
+import extfile_functions as extf
+import genetic_algorithm_functions as gaf
+import roulette_selection as roulette
+import fitness_evaluation as fe
+from full_leg_classes import PopMember
+from island_model import initial_population
+
+def run_cycle(cycle_id, seed, member_count, generation_count):
+	""" Runs one complete GA cycle from a fresh initial population.
+		Writes the cycle's generation data file. Returns a summary
+		dictionary of the cycle."""
+
+	start = time.time()
+	utility.seed(seed)
+	flf.size_component_cache(member_count)
+	setattr(PopMember,'is_initial_gen',True)
+	setattr(PopMember,'next_mem',0)
+	store = gaf.build_population_store(initial_population(member_count))
+
+	pop_count_list = []
+	max_fitness_list = []
+	total_fitness_list = []
+	current_gen = 0
+	try:
+		while current_gen < generation_count:
+			fe.population_fitness_evaluation(store)
+			total_fitness = float(store.fitness.sum())
+			roulette.population_evaluate(store)
+			pop_count_list.append(len(store))
+			max_fitness_list.append(float(store.fitness.max()))
+			total_fitness_list.append(total_fitness)
+			current_gen += 1
+	except SystemExit:
+		# Dead population; keep the generations run so far
+		pass
+
+	data_file = extf.export_generation_data(pop_count_list, max_fitness_list, total_fitness_list, '_cycle' + str(cycle_id))
+	return {
+		'cycle': cycle_id,
+		'seed': seed,
+		'generations': current_gen,
+		'final_pop_count': pop_count_list[-1] if pop_count_list else 0,
+		'max_fitness': max(max_fitness_list, default=0),
+		'final_total_fitness': total_fitness_list[-1] if total_fitness_list else 0,
+		'elapsed': time.time() - start,
+		'data_file': data_file,
+		}
+
+def run_cycles(cycle_count, member_count, generation_count, workers=None, seed=None):
+	""" Runs cycle_count independent cycles across a process pool, each
+		seeded from seed (random by default) and its cycle number.
+		Writes the merged cycle summary file. Returns the list of cycle
+		summaries ordered by cycle."""
+
+	if seed is None:
+		seed = random.randrange(2**31)
+	if workers is None:
+		workers = min(cycle_count, os.cpu_count())
+
+	cycle_ids = range(cycle_count)
+	seeds = [seed + cycle_id for cycle_id in cycle_ids]
+	with ProcessPoolExecutor(max_workers=workers, initializer=design_context.set_context, initargs=(design_context.get_context(),)) as executor:
+		summary_list = list(executor.map(run_cycle, cycle_ids, seeds, [member_count] * cycle_count, [generation_count] * cycle_count))
+
+	extf.export_cycle_summary(summary_list)
+	return summary_list
+
+if __name__ == '__main__':
+	design_context.configure('material_properties.csv', 'component_forces.txt', 'client_info.csv')
+	member_count = 100
+	generation_count = 150
+	cycle_count = 10
+
+	start = time.time()
+	summary_list = run_cycles(cycle_count, member_count, generation_count)
+	for summary in summary_list:
+		print("Cycle " + str(summary['cycle']) + " Max Fitness: " + str(summary['max_fitness']) + " (" + str(summary['generations']) + " generations)")
+	print("Elapsed Time: " + str(time.time()-start))
+	print("\n~~~~~~ Program End ~~~~~~\n")
+
+# ~~~ End ~~~
@@ -0,0 +1,136 @@
+""" Holds the input file locations of a design run and loads their data
+	on first use, so importing the design modules reads no files. Scripts
+	set the locations with configure() before building members; the file
+	names below are used when nothing was configured."""
+import extfile_functions as extf
+import problem_definition
+from material_table import load_material_table, source_stamp
+
+DEFAULT_LOCATIONS = {
+	'material_location': 'material_properties.csv',
+	'force_location': 'component_forces.txt',
+	'client_location': 'client_info.csv',
+	}
+
+_context = None
+
+class DesignContext():
+	""" Input file locations of a run, with the material table and the
+		problem definition loaded from them on first access. key() loads
+		them again if a file's modification time or size has changed. 
+		Pickles as its locations only, so it can be sent to worker 
+		processes."""
+
+	def __init__(self, material_location=None, force_location=None, client_location=None):
+		self.material_location = material_location or DEFAULT_LOCATIONS['material_location']
+		self.force_location = force_location or DEFAULT_LOCATIONS['force_location']
+		self.client_location = client_location or DEFAULT_LOCATIONS['client_location']
+		self._materials = None
+		self._material_stamp = None
+		self._problem = None
+
+	def __getstate__(self):
+		return {'material_location': self.material_location, 'force_location': self.force_location, 'client_location': self.client_location}
+
+	def __setstate__(self, state):
+		self.__init__(**state)
+
+	def locations(self):
+		""" Returns the input file locations as a tuple."""
+
+		return (self.material_location, self.force_location, self.client_location)
+
+	def key(self):
+		""" Reloads any input file changed since it was loaded. Returns 
+			the input file locations, the problem file hashes and the 
+			material file's stamp as a tuple, for the evaluation cache 
+			keys."""
+
+		self.reload()
+		return (self.locations(), self._problem.hashes, self._material_stamp)
+
+	def reload(self):
+		""" Loads the problem definition and the material table again if
+			their files have changed since they were loaded. Returns 
+			void."""
+
+		# load_problem checks the files' stamps before reusing a problem
+		self._problem = problem_definition.load_problem(self.force_location, self.client_location)
+		stamp = source_stamp(self.material_location)
+		if stamp != self._material_stamp:
+			self._materials = load_material_table(self.material_location)
+			self._material_stamp = stamp
+
+	def materials(self):
+		""" Returns the material table, material list and material name
+			list as a tuple, loading them on first use."""
+
+		if self._materials is None:
+			self.reload()
+		return self._materials
+
+	@property
+	def material_table(self):
+		return self.materials()[0]
+
+	@property
+	def material_list(self):
+		return self.materials()[1]
+
+	@property
+	def mat_names(self):
+		return self.materials()[2]
+
+	@property
+	def unit_list(self):
+		return self.material_table.unit_list()
+
+	@property
+	def problem(self):
+		if self._problem is None:
+			self.reload()
+		return self._problem
+
+	@property
+	def client_info(self):
+		return self.problem.client_info
+
+	def component_forces(self, comp_name):
+		""" Returns a new dictionary of a component's forces, read
+			through the cached force table of extf.import_forces."""
+
+		return extf.import_forces(self.force_location, comp_name)
+
+def configure(material_location=None, force_location=None, client_location=None):
+	""" Makes a new context with the given locations current. Returns
+		the context."""
+
+	return set_context(DesignContext(material_location, force_location, client_location))
+
+def set_context(context):
+	""" Makes a context current. Also used as a worker process
+		initializer. Returns the context."""
+
+	global _context
+	_context = context
+	return context
+
+def get_context():
+	""" Returns the current context, making one with the default 
+		locations on first use."""
+
+	if _context is None:
+		set_context(DesignContext())
+	return _context
+
+class ContextAttribute():
+	""" Class attribute read from the current context on every access,
+		e.g. PopMember.material_list."""
+
+	def __init__(self, name):
+		self.name = name
+
+	def __get__(self, instance, owner):
+		return getattr(get_context(), self.name)
+
+# ~~~ End ~~~
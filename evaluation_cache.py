@@ -0,0 +1,109 @@
+""" Defines the evaluation caches for the genetic algorithm. Converged
+	populations keep reproducing genomes that were already evaluated, so
+	member results are memoized by a hash of the packed genome, the
+	component material IDs and the evaluation context, with
+	least-recently-used eviction."""
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from genome_layout import GenomeLayout
+from population_store import MATERIAL_DTYPE
+
+# Bytes of the blake2b digest used as a cache key
+KEY_SIZE = 16
+
+def genome_key(packed, material_ids, context=()):
+	""" Hashes a packed genome, its material IDs and a tuple of the
+		evaluation context it was scored in into a cache key. Returns a
+		bytes digest."""
+
+	digest = hashlib.blake2b(digest_size=KEY_SIZE)
+	digest.update(np.ascontiguousarray(packed, dtype=np.uint8).tobytes())
+	digest.update(np.ascontiguousarray(material_ids, dtype=MATERIAL_DTYPE).tobytes())
+	digest.update(repr(context).encode())
+	return digest.digest()
+
+def member_key(member, context=()):
+	""" Builds the cache key of a population member from its genes,
+		component materials and evaluation context. Returns a bytes
+		digest."""
+
+	layout = GenomeLayout.from_member(member)
+	packed = layout.encode(np.asarray(layout.member_genes(member)))
+	return genome_key(packed, layout.member_materials(member), context)
+
+class LRUCache():
+	""" Bounded mapping with least-recently-used eviction. Counts hits
+		and misses."""
+
+	def __init__(self, max_size=100000):
+		self.max_size = max_size
+		self.hits = 0
+		self.misses = 0
+		self._entries = OrderedDict()
+
+	def __len__(self):
+		return len(self._entries)
+
+	def __contains__(self, key):
+		return key in self._entries
+
+	def get(self, key):
+		""" Looks up a key, marking it as recently used. Returns the
+			entry, or None on a miss."""
+
+		entry = self._entries.get(key)
+		if entry is None:
+			self.misses += 1
+			return None
+		self._entries.move_to_end(key)
+		self.hits += 1
+		return entry
+
+	def put(self, key, entry):
+		""" Stores an entry, evicting the least recently used entries 
+			beyond max_size. Returns void."""
+
+		self._entries[key] = entry
+		self._entries.move_to_end(key)
+		while len(self._entries) > self.max_size:
+			self._entries.popitem(last=False)
+
+	def resize(self, max_size):
+		""" Sets max_size, evicting the least recently used entries 
+			beyond it. Returns void."""
+
+		self.max_size = max_size
+		while len(self._entries) > self.max_size:
+			self._entries.popitem(last=False)
+
+	def clear(self):
+		""" Removes every entry and resets the counters. Returns void."""
+
+		self._entries.clear()
+		self.hits = 0
+		self.misses = 0
+
+	@property
+	def hit_rate(self):
+		lookups = self.hits + self.misses
+		return self.hits / lookups if lookups else 0.0
+
+class FitnessCache(LRUCache):
+	""" LRU cache of member evaluation results keyed by member_key. 
+		Entries are (total_fitness, is_valid, total_mass, total_cost)
+		tuples."""
+
+	def put(self, key, total_fitness, is_valid, total_mass, total_cost):
+		""" Stores the results for a key. Returns void."""
+
+		super().put(key, (total_fitness, is_valid, total_mass, total_cost))
+
+class ComponentCache(LRUCache):
+	""" LRU cache of single-component results keyed by 
+		full_leg_functions.component_key. Entries are dictionaries 
+		holding the component's mass, stress dictionary and validity 
+		from define_components, and its safety factors and fitness once
+		fitness_evaluation has scored it."""
+
+# ~~~ End ~~~
@@ -1,7 +1,8 @@
 """Defines GA functions for interacting with external files"""
 from pprint import pprint
-import csv
+import csv, os
 import datetime
+from types import MappingProxyType
 
 def assign_class_attr(location, class_dest, check_val):
 	"""Assigns class attributes from an external .txt file"""
@@ -145,42 +146,75 @@ def build_material_list(mat_location):
 				material_list.append(material_dict)
 	return material_list,name_list,unit_list
 
-def import_forces(location,component_name):
-	"""Reads force names and values from an external file, ignoring 
-		comments and empty lines. Returns dictionary of forces and 
-		pressure with corresponding names."""	
-	force_list = {}
-	comp_match = False
+# Parsed forces files, keyed by path, with the modification time and 
+# size they were parsed at
+_force_tables = {}
+
+def parse_forces(location):
+	"""Reads the force names and values of every component section of 
+		an external file in one pass, ignoring comments and empty lines.
+		Sections end at the first blank line, and only the first section
+		of each component is read. Returns a read-only dictionary of 
+		read-only force dictionaries keyed by component name."""
+	force_table = {}
+	force_list = None
 	with open(location) as file_object:
 		for line in file_object:
 
-			# Skip blank lines
-			try:
-				line_reader = line.split()
-				check = line_reader[0]
-			except IndexError:
-				if comp_match == True:
-					break
+			# Skip blank lines, which end the current section
+			line_reader = line.split()
+			if not line_reader:
+				force_list = None
 				continue
 			
-			# If title found, add values
-			if comp_match == True:
+			# If in a section, add values
+			if force_list is not None:
 				line_key = line_reader.pop(0)
 				force_list[line_key] = int(line_reader[-1])
 				continue
 			
-			# Check for corresponding title
-			if line_reader[0] != '#':
-				continue
-			elif line_reader[1] != component_name:
-				continue
-			elif line_reader[1] == component_name:
-				comp_match = True
+			# Check for a new section title
+			if line_reader[0] != '#' or len(line_reader) < 2:
 				continue
-			else:
-				input(">>> Component Match Error")
+			force_list = {}
+			if not(line_reader[1] in force_table):
+				force_table[line_reader[1]] = force_list
+
+	return MappingProxyType({name: MappingProxyType(forces) for name,forces in force_table.items()})
 
-	return force_list
+def force_table(location):
+	"""Returns the parsed force table of a file, parsing it only on first
+		use or when the file's modification time or size has changed."""
+	path = os.path.abspath(location)
+	file_stat = os.stat(path)
+	stamp = (file_stat.st_mtime_ns, file_stat.st_size)
+	cached = _force_tables.get(path)
+	if cached is None or cached[0] != stamp:
+		cached = (stamp, parse_forces(path))
+		_force_tables[path] = cached
+	return cached[1]
+
+def store_force_table(location, table):
+	"""Stores an already parsed force table for a file at its current 
+		modification time and size, e.g. from a problem snapshot. 
+		Returns void."""
+	path = os.path.abspath(location)
+	file_stat = os.stat(path)
+	_force_tables[path] = ((file_stat.st_mtime_ns, file_stat.st_size), table)
+
+def reload_forces(location=None):
+	"""Drops the parsed force table of a file (all files by default), so
+		the next lookup reparses it. Returns void."""
+	if location is None:
+		_force_tables.clear()
+	else:
+		_force_tables.pop(os.path.abspath(location), None)
+
+def import_forces(location,component_name):
+	"""Looks up the force names and values of a component in the parsed
+		force table of an external file. Returns a new dictionary of 
+		forces and pressure with corresponding names."""	
+	return dict(force_table(location).get(component_name, {}))
 
 def import_client_info(location):
 	client_info = {}
@@ -198,9 +232,13 @@ def import_client_info(location):
 				i += 2
 	return client_info
 
-def export_generation_data(pop_count_list, max_fitness_list, total_fitness_list):
+def export_generation_data(pop_count_list, max_fitness_list, total_fitness_list, suffix=''):
+	"""Writes per-generation population data to a dated .csv file. The
+		suffix is appended to the file name so parallel cycles started in
+		the same minute write separate files. Returns the file name."""
+	
 	now = datetime.datetime.now()
-	file_name = 'gen_data_' + str(now.month) + '-' + str(now.day) + '-' + str(now.year) +'_'+ str(now.hour) + str(now.minute)+'.csv'
+	file_name = 'gen_data_' + str(now.month) + '-' + str(now.day) + '-' + str(now.year) +'_'+ str(now.hour) + str(now.minute) + suffix + '.csv'
 	with open(file_name, 'x', newline = "") as csvfile:
 		gen_info_writer = csv.writer(csvfile,dialect='excel')
 		gen = 0
@@ -210,5 +248,21 @@ def export_generation_data(pop_count_list, max_fitness_list, total_fitness_list)
 			gen_info_writer.writerow(temp_line)
 			gen += 1
 		gen_info_writer.writerow(['Data End'])
+	return file_name
+
+def export_cycle_summary(summary_list, suffix=''):
+	"""Writes one row per GA cycle, as returned by the cycle runner, to a
+		dated .csv file. Returns the file name."""
+	
+	now = datetime.datetime.now()
+	file_name = 'cycle_summary_' + str(now.month) + '-' + str(now.day) + '-' + str(now.year) +'_'+ str(now.hour) + str(now.minute) + suffix + '.csv'
+	columns = ['cycle', 'seed', 'generations', 'final_pop_count', 'max_fitness', 'final_total_fitness', 'elapsed', 'data_file']
+	with open(file_name, 'x', newline = "") as csvfile:
+		summary_writer = csv.writer(csvfile,dialect='excel')
+		summary_writer.writerow(columns)
+		for summary in summary_list:
+			summary_writer.writerow([summary[n] for n in columns])
+		summary_writer.writerow(['Data End'])
+	return file_name
 	
 # ~~ End ~~
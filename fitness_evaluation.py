@@ -1,11 +1,24 @@
 """ Defines the evaluation functions for determining fitness values of 
 	each member's design. A zero fitness score is default and marks a
 	member as unfit for reproduction."""
-import math
+import math, os
+import numpy as np
 import utility_functions as utility
+import full_leg_functions as flf
+import genetic_algorithm_functions as gaf
+import evaluation_cache
+import design_context
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from genome_layout import GenomeLayout
+from population_store import PopulationStore, SharedPopulationStore, GENE_DTYPE, MATERIAL_DTYPE
 from pprint import pprint
 
 design_factor = 1.75
+
+# Memoized member results keyed by genome, consulted by 
+# fitness_evaluation. Set to None to disable caching.
+fitness_cache = evaluation_cache.FitnessCache(max_size=100000)
 	
 def stress_eval(component, design_factor):
 	""" Increments fitness score based on a design component's max 
@@ -54,6 +67,35 @@ def stress_eval(component, design_factor):
 			
 	return
 	
+def cached_stress_eval(component, design_factor):
+	""" Runs stress_eval, reusing the safety factors and fitness stored
+		in the component's cache entry by an earlier evaluation of an 
+		identical component at the same design factor. Returns void."""
+	
+	entry = getattr(component, 'stress_entry', None)
+	if entry is None:
+		stress_eval(component, design_factor)
+		return
+	
+	if entry.get('design_factor') == design_factor:
+		component.safety_factors = dict(entry['safety_factors'])
+		component.fitness = entry['fitness']
+		if entry['stress_valid'] == False:
+			component.is_valid = False
+		return
+	
+	# Record only the validity found by this evaluation
+	was_valid = component.clear_valid()
+	stress_eval(component, design_factor)
+	entry['design_factor'] = design_factor
+	entry['safety_factors'] = dict(component.safety_factors)
+	entry['fitness'] = component.fitness
+	entry['stress_valid'] = getattr(component, 'is_valid', True)
+	if was_valid == False:
+		component.is_valid = False
+	
+	return
+	
 def deflection_eval(member):
 	""" Calculates the deflection of members based on 
 	material properties and stresses and compares 
@@ -118,34 +160,293 @@ def max_power_eval(member):
 		
 	pass
 
-def fitness_evaluation(pop_list):
+def cache_context():
+	""" Returns the design factor and the design context key that 
+		fitness_cache results depend on, as a tuple for 
+		evaluation_cache.member_key."""
+	
+	return (design_factor, design_context.get_context().key())
+
+def fitness_evaluation(pop_list, workers=None, use_cache=True):
 	""" Evaluates each component of each member of the population against
-	fitness criteria and assigns a total fitness score for each member."""
+	fitness criteria and assigns a total fitness score for each member.
+	Members found in fitness_cache take their cached results; the rest 
+	are defined and scored. If workers (parallel_workers by default) is 
+	above 1, uncached members are evaluated in a process pool instead."""
+	
+	if workers is None:
+		workers = parallel_workers
+	if workers and workers > 1:
+		return parallel_fitness_evaluation(pop_list, workers, use_cache)
+	cache = fitness_cache if use_cache else None
+	key_context = cache_context() if cache is not None else None
 	
 	total_fitness = 0
 	for mem in pop_list:
 		if mem.is_evaluated == True:
 			#~ print(" >>>>>> Already Evaluated <<<<<<")
 			continue
-			
+		
+		# Reuse the results of an identical genome
+		if cache is not None:
+			key = evaluation_cache.member_key(mem, key_context)
+			entry = cache.get(key)
+			if entry is not None:
+				apply_results(mem, *entry)
+				total_fitness += mem.total_fitness
+				continue
+		
+		# Only changed components are rescored
+		flf.define_components(mem)
+		mem.total_fitness = 0
 		for comp_name,comp in mem.component_dict.items():
-			stress_eval(comp,design_factor)
-			mem.total_fitness =+ comp.fitness
+			if comp_name in mem.dirty_comps:
+				cached_stress_eval(comp,design_factor)
+			mem.total_fitness += comp.fitness
+		mem.dirty_comps = set()
 		is_valid_check(mem)
 		total_fitness += mem.total_fitness
 		mem.is_evaluated = True
+		if cache is not None:
+			cache.put(key, mem.total_fitness, mem.is_valid, mem.total_mass, mem.total_cost)
 
 	return total_fitness
 
+def apply_results(mem, total_fitness, is_valid, total_mass, total_cost):
+	""" Writes member-level evaluation results to a population member 
+		and marks it defined and evaluated. Component results are not 
+		written, so its components stay dirty. Returns void."""
+	
+	mem.total_fitness = total_fitness
+	mem.is_valid = is_valid
+	mem.total_mass = total_mass
+	mem.total_cost = total_cost
+	mem.is_defined = True
+	mem.is_evaluated = True
+
+# ~~~ Parallel Evaluation ~~~
+# Workers take the parent's design context, so they load the same input
+# files. For member lists, worker processes rebuild members from genes 
+# and material IDs only, and return fitness, validity, mass and cost. For a
+# SharedPopulationStore, workers attach to the shared buffers once and 
+# evaluate row ranges in place. Scripts using a process pool must guard
+# their main loop with if __name__ == '__main__' on platforms that spawn
+# workers.
+
+# Worker processes used by fitness_evaluation. None or 1 runs serially.
+parallel_workers = None
+
+# Chunks submitted per worker, to balance uneven evaluation times.
+chunks_per_worker = 4
+
+_executor = None
+_executor_key = None
+
+# Store attached by each shared-memory worker process
+_shared_store = None
+
+def get_executor(workers, initializer=None, initargs=(), key=None):
+	""" Returns a process pool with the given number of workers, reusing
+		the pool between generations while workers and key are unchanged.
+		initializer is run once in each new worker with initargs."""
+	
+	global _executor, _executor_key
+	if _executor is None or _executor_key != (workers, key):
+		shutdown_executor()
+		_executor = ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+		_executor_key = (workers, key)
+	return _executor
+
+def shutdown_executor():
+	""" Shuts down the shared process pool, if any. Returns void."""
+	
+	global _executor, _executor_key
+	if _executor is not None:
+		_executor.shutdown()
+	_executor = None
+	_executor_key = None
+
+def evaluate_chunk(genes, material_ids, layout, factor=None):
+	""" Worker function. Builds members from a block of genes and 
+		material IDs, defines and evaluates them serially at the 
+		parent's design factor. Returns fitness, validity, mass and 
+		cost arrays."""
+	
+	global design_factor
+	if factor is not None:
+		design_factor = factor
+	store = PopulationStore(layout, len(genes))
+	store.append(genes, material_ids)
+	pop_list = gaf.store_to_members(store)
+	for mem in pop_list:
+		flf.define_components(mem)
+	fitness_evaluation(pop_list, workers=1, use_cache=False)
+	
+	fitness = np.array([mem.total_fitness for mem in pop_list], dtype=np.float64)
+	is_valid = np.array([mem.is_valid for mem in pop_list], dtype=bool)
+	mass = np.array([mem.total_mass for mem in pop_list], dtype=np.float64)
+	cost = np.array([mem.total_cost for mem in pop_list], dtype=np.float64)
+	return fitness, is_valid, mass, cost
+
+def parallel_fitness_evaluation(pop_list, workers, use_cache=True):
+	""" Evaluates every unevaluated member of the population in a 
+		process pool. Members are sent as chunks of genes and material 
+		IDs, and their fitness, validity, mass and cost are written back.
+		Already evaluated members are skipped, and cached members take 
+		their results from fitness_cache. Returns the total fitness of 
+		the evaluated members."""
+	
+	cache = fitness_cache if use_cache else None
+	key_context = cache_context() if cache is not None else None
+	total_fitness = 0
+	pending = []
+	keys = []
+	for mem in pop_list:
+		if mem.is_evaluated == True:
+			continue
+		if cache is not None:
+			key = evaluation_cache.member_key(mem, key_context)
+			entry = cache.get(key)
+			if entry is not None:
+				apply_results(mem, *entry)
+				total_fitness += mem.total_fitness
+				continue
+			keys.append(key)
+		pending.append(mem)
+	if not pending:
+		return total_fitness
+	
+	layout = GenomeLayout.from_member(pending[0])
+	genes = np.array([layout.member_genes(mem) for mem in pending], dtype=GENE_DTYPE)
+	material_ids = np.array([layout.member_materials(mem) for mem in pending], dtype=MATERIAL_DTYPE)
+	chunk_count = min(len(pending), workers * chunks_per_worker)
+	gene_chunks = np.array_split(genes, chunk_count)
+	material_chunks = np.array_split(material_ids, chunk_count)
+	
+	context = design_context.get_context()
+	executor = get_executor(workers, design_context.set_context, (context,), context.locations())
+	results = list(executor.map(evaluate_chunk, gene_chunks, material_chunks, repeat(layout, chunk_count), repeat(design_factor, chunk_count)))
+	fitness, is_valid, mass, cost = (np.concatenate(n) for n in zip(*results))
+	
+	for i, mem in enumerate(pending):
+		apply_results(mem, float(fitness[i]), bool(is_valid[i]), float(mass[i]), float(cost[i]))
+		if cache is not None:
+			cache.put(keys[i], mem.total_fitness, mem.is_valid, mem.total_mass, mem.total_cost)
+	
+	return total_fitness + float(fitness.sum())
+
+def attach_shared_store(handle, context=None):
+	""" Worker initializer. Attaches the worker to the shared population
+		buffers once, and makes the parent's design context current. 
+		Returns void."""
+	
+	global _shared_store
+	if context is not None:
+		design_context.set_context(context)
+	_shared_store = SharedPopulationStore.attach(handle)
+
+def evaluate_shared_rows(start, stop, size, factor=None):
+	""" Worker function. Evaluates the unevaluated rows in [start, stop)
+		of the attached shared store in place, at the parent's design 
+		factor. Returns the total fitness of the evaluated rows."""
+	
+	global design_factor
+	if factor is not None:
+		design_factor = factor
+	_shared_store.size = size
+	rows = start + np.flatnonzero(~_shared_store.is_evaluated[start:stop])
+	if len(rows) == 0:
+		return 0.0
+	return population_fitness_evaluation(_shared_store, rows)
+
+def shared_fitness_evaluation(store, workers=None):
+	""" Evaluates the unevaluated rows of a SharedPopulationStore across
+		a process pool. Workers attach to the store's buffers once and 
+		evaluate disjoint row ranges in place, so only row bounds are 
+		sent per generation. Rows are scored by 
+		population_fitness_evaluation, which scores members as 
+		fitness_evaluation does. Returns the total fitness of the 
+		evaluated rows."""
+	
+	if workers is None:
+		workers = parallel_workers or os.cpu_count()
+	handle = store.handle()
+	context = design_context.get_context()
+	executor = get_executor(workers, attach_shared_store, (handle, context), tuple(handle['blocks'].values()) + context.locations())
+	
+	bounds = np.linspace(0, len(store), workers * chunks_per_worker + 1).astype(int)
+	totals = executor.map(evaluate_shared_rows, bounds[:-1], bounds[1:], repeat(len(store)), repeat(design_factor))
+	return float(sum(totals))
+
+def stress_eval_array(safety_factors, design_factor):
+	""" Vectorized stress_eval for one component across a population. 
+		Takes a dictionary of safety factor arrays of length N, in the
+		order the component records its stresses, with NaN for stresses
+		a member does not record. Scores as stress_eval does. Returns 
+		fitness and validity arrays of length N."""
+	
+	sf = np.stack(list(safety_factors.values()), axis=-1)
+	recorded = ~np.isnan(sf)
+	
+	# Check validity of design
+	in_range = (sf >= design_factor) & (sf <= 5*design_factor)
+	is_valid = np.all(in_range | ~recorded, axis=-1)
+	
+	# Fitness value based on FoS distance from design factor. The 
+	# quadratic term of stress_eval is clamped to zero for every factor,
+	# so only the cosine ramp and the decay term remain.
+	factor_target = 1.10 * design_factor
+	target_offset = factor_target-1
+	max_score = 100
+	fit_mod = np.zeros(sf.shape)
+	ramp = recorded & (sf >= 1) & (sf < factor_target)
+	fit_mod[ramp] = -0.5*np.cos((sf[ramp]-1)*math.pi/target_offset)+0.5
+	decay = recorded & (sf >= factor_target)
+	fit_mod[decay] = target_offset/(2*(sf[decay]-1))
+	
+	# stress_eval rescores every factor recorded so far on each pass of
+	# its stress loop, so of m factors the one at position i is scored 
+	# m - i times. A factor below 1 at position p ends the loop in its 
+	# own pass, after the factors before it are scored once more.
+	position = np.cumsum(recorded, axis=-1) - 1
+	count = np.count_nonzero(recorded, axis=-1)
+	stop = np.where(recorded & (sf < 1), position, sf.shape[-1]).min(axis=-1, initial=sf.shape[-1])
+	stopped = stop < count
+	stop = np.minimum(stop, count)
+	weight = stop[..., None] - position + stopped[..., None]
+	weight = np.where(recorded & (position < stop[..., None]), weight, 0)
+	fitness = max_score * (fit_mod * weight).sum(axis=-1)
+	
+	return fitness, is_valid
+
+def population_fitness_evaluation(store, rows=None):
+	""" Evaluates every unevaluated member of a PopulationStore in one 
+		vectorized pass. Member fitness is the sum of its component 
+		fitness scores. Writes fitness, validity and evaluation flags 
+		back to the store. Returns the total fitness of the evaluated
+		rows."""
+	
+	rows, results = flf.define_population(store, rows)
+	fitness = np.zeros(len(rows))
+	is_valid = results['is_valid'].copy()
+	for comp_name in store.layout.comp_names:
+		comp_fitness, comp_valid = stress_eval_array(results[comp_name]['safety_factors'], design_factor)
+		fitness += comp_fitness
+		is_valid &= comp_valid
+	
+	store.fitness[rows] = fitness
+	store.is_valid[rows] = is_valid
+	store.is_evaluated[rows] = True
+	
+	return float(fitness.sum())
+
 def is_valid_check(member):
 	"""Checks members to see if there are any invalid 
 		components in their design. If so, sets the 
 		member's is_valid to False."""
 	
-	comp_names = utility.param_list_assign(member)
-	for name in comp_names:
-		comp = getattr(member,name)
-		if comp.is_valid == False:
+	for comp in member.component_dict.values():
+		if getattr(comp, 'is_valid', True) == False:
 			member.is_valid = False
 			break
 	
@@ -5,9 +5,14 @@
 	factors such as stress, deflection, and other
 	analysis functions."""
 import random, math, os
+import numpy as np
 import utility_functions as utility
 import extfile_functions as extf
-from __main__ import material_location, force_location, client_location
+import design_context
+import component_schema
+from design_context import ContextAttribute
+from material_table import MaterialTable, MaterialProperties
+from population_store import CHANCE_DTYPE
 from pprint import pprint
 
 #~ class Force():
@@ -20,9 +25,20 @@ class PopMember():
 	# Set class variables
 	next_mem = 0
 	is_initial_gen = True
+	schema = component_schema.MEMBER
 	
-	material_list, mat_names, unit_list = extf.build_material_list(material_location)
-	client_info = extf.import_client_info(client_location)
+	# Input data, loaded from the design context on first access
+	material_table = ContextAttribute('material_table')
+	material_list = ContextAttribute('material_list')
+	mat_names = ContextAttribute('mat_names')
+	unit_list = ContextAttribute('unit_list')
+	problem = ContextAttribute('problem')
+	client_info = ContextAttribute('client_info')
+	
+	# Fixed instance attributes, with one slot per component
+	__slots__ = ('mem_id', 'age', 'comp_count', 'total_fitness', 'total_mass', 'total_cost',
+		'is_valid', 'is_defined', 'is_evaluated', 'component_dict', 'dirty_comps', 
+		'mass_dict', 'cost_dict', 'xover_chance', 'mutate_chance', '__weakref__') + component_schema.MEMBER.component_names
 	
 	def __init__(self):
 		next_mem = 0
@@ -31,8 +47,8 @@ class PopMember():
 		# Initialize  member characteristics, increment class variable next_mem
 		self.mem_id = next_mem
 		self.age = -3
-		# >>> Change if components are added to the design. Error checking variable <<<
-		self.comp_count = 19
+		# Error checking variable, from the component schema
+		self.comp_count = self.schema.comp_count
 		next_mem += 1
 		
 		# Initialize evaluation variables and classes
@@ -82,6 +98,13 @@ class PopMember():
 		for comp_name,comp in self.component_dict.items():
 			comp.name = comp_name
 			comp.define_forces()
+		self.share_chances()
+		
+		# Initialize incremental evaluation variables. Every component 
+		# starts dirty, i.e. changed since its last evaluation.
+		self.dirty_comps = set(self.component_dict)
+		self.mass_dict = {}
+		self.cost_dict = {}
 	
 	def reset_member(self):
 		for comp_name, comp in self.component_dict.items():
@@ -91,55 +114,92 @@ class PopMember():
 			self.is_defined = False
 			self.is_evaluated = False
 		self.define_component_list()
+		self.mark_dirty()
+	
+	def mark_dirty(self, comp_names=None):
+		""" Marks components (all by default) as changed since their last
+			evaluation, so define_components and fitness_evaluation 
+			re-run them. Clears the member's evaluation state. Returns 
+			void."""
+		
+		if comp_names is None:
+			comp_names = self.component_dict
+		self.dirty_comps.update(comp_names)
+		self.is_valid = True
+		self.is_defined = False
+		self.is_evaluated = False
+	
+	def inherit_components(self, parent, comp_names):
+		""" Copies the evaluation state of components identical to those
+			of an evaluated parent, and marks them clean. Components the 
+			parent has not evaluated are left dirty. Returns void."""
+		
+		if parent.is_evaluated == False:
+			return
+		for comp_name in comp_names:
+			if comp_name in parent.dirty_comps:
+				continue
+			comp = self.component_dict[comp_name]
+			parent_comp = parent.component_dict[comp_name]
+			comp.force = dict(parent_comp.force)
+			comp.stress = dict(parent_comp.stress)
+			comp.safety_factors = dict(parent_comp.safety_factors)
+			comp.fitness = parent_comp.fitness
+			comp.stress_entry = getattr(parent_comp, 'stress_entry', None)
+			if getattr(parent_comp, 'is_valid', True) == False:
+				comp.is_valid = False
+			self.mass_dict[comp_name] = parent.mass_dict[comp_name]
+			self.cost_dict[comp_name] = parent.cost_dict[comp_name]
+			self.dirty_comps.discard(comp_name)
 			
 	def define_component_list(self):
-		self.component_dict = {}
-		# >>> Modify with added components <<<
-		component_types = ['Cylinder', 'Gimbal', 'Structure']
-		for n in self.__dict__:
-			for comp_type in component_types:
-				if comp_type in n:
-					self.component_dict[n] = self.__dict__[n]
+		# >>> Modify component_schema.MEMBER with added components <<<
+		self.component_dict = {comp_name: getattr(self, comp_name) for comp_name in self.schema.component_names}
+	
+	def share_chances(self, xover_chance=None, mutate_chance=None):
+		""" Gathers the per-bit crossover and mutation chances of every 
+			component into one float32 array each, in genome layout order,
+			and points each component's XoverChance and MutateChance at 
+			its slice. Chances given as float32 arrays, e.g. the rows of
+			a population store, are used in place without copying; the 
+			store re-binds its members when compaction or growth moves 
+			their rows. Returns void."""
+		
+		layout = self.schema.layout()
+		if xover_chance is None:
+			xover_chance = layout.member_chances(self, 'XoverChance')
+		if mutate_chance is None:
+			mutate_chance = layout.member_chances(self, 'MutateChance')
+		self.xover_chance = np.asarray(xover_chance, dtype=CHANCE_DTYPE)
+		self.mutate_chance = np.asarray(mutate_chance, dtype=CHANCE_DTYPE)
+		for comp_name, bits in zip(layout.comp_names, layout.comp_bit_slices):
+			comp = self.component_dict[comp_name]
+			comp.XoverChance = self.xover_chance[bits]
+			comp.MutateChance = self.mutate_chance[bits]
 	
 	def assign_genome(self,genome_info):
 		self.define_component_list()
 		for comp_name,gen_info in genome_info.items():
 			self.component_dict[comp_name].binary_decode(gen_info[0],gen_info[1])
 		for comp_name,comp in self.component_dict.items():
+			comp.calculated_variables()
 			comp.define_component_variables()		
 		
 #				 --- Evaluation Classes ---
 class Deflection():
 	pass
 
-class MaterialProperties():
-	""" Stores material property data for a component. """
-	
-	def __init__(self,material_list,material_ID):
-
-		MatProperties = {}
-		# Cycles through material list looking for a matching name value
-		for entry in material_list:
-			if int(entry['id']) == material_ID:
-				for k,v in entry.items():
-					if k == 'ID':
-						continue
-					MatProperties[k] = v
-		
-		self.name = MatProperties['name']
-		self.treatment = MatProperties['treatment']
-		self.cost = MatProperties['cost']
-		self.density = MatProperties['density']
-		self.ultimate_tensile_strength = MatProperties['ultimate_tensile_strength']
-		self.yield_strength = MatProperties['yield_strength']
-		self.elastic_modulus = MatProperties['elastic_modulus']
-		self.poissons_ratio = MatProperties['poissons_ratio']
-
 # 				--- Design Classes ---
 
 class Component(object):
 	""" Contains the design parameters for the main
 		actuation cylinder member."""
+	
+	# Instance attributes shared by every component. Subclasses add 
+	# their schema's variables.
+	__slots__ = ('name', 'force', 'stress', 'safety_factors', 'fitness', 'stress_entry', 
+		'is_valid', 'Material', 'material_ID', 'var_count', 'XoverChance', 'MutateChance',
+		'variable_dict')
 		
 	def __init__(self): 
 		
@@ -148,12 +208,12 @@ class Component(object):
 	def get_new_values(self):
 		for var_name, var in self.variable_dict.items():
 			#~ print(var_name)
-			#~ print(self.__dict__[var_name])
-			self.__dict__[var_name] = random.randint(1,63)
+			#~ print(getattr(self, var_name))
+			setattr(self, var_name, random.randint(1,63))
 			self.define_component_variables()
 	
 	def define_forces(self):
-		self.force = extf.import_forces(force_location,self.name)
+		self.force = design_context.get_context().component_forces(self.name)
 		
 	def binary_encode(self):
 		"""Encodes class variables into a binary string, storing the values in an instance variable"""
@@ -222,45 +282,48 @@ class Component(object):
 		
 		# Assign decoded values to non-calculated variables
 		for name, var in self.variable_dict.items():
-			self.__dict__[name] = val_dict[name]
+			setattr(self, name, val_dict[name])
 
 	def define_component_variables(self):
-		self.variable_dict = {}
-		# >>> Modify with changes in component non-design variables.
-		variable_types = ['force','stress','var_count','material_ID','Material','Chance','dict','structure','name','calc','fitness','safety','valid']
-		for n in self.__dict__:
-			is_valid = True
-			for var_type in variable_types:
-				if var_type in n:
-					is_valid = False
-					break
-			if is_valid == True:
-				self.variable_dict[n] = self.__dict__[n]
+		# >>> Modify component_schema with changes in design variables <<<
+		self.variable_dict = {name: getattr(self, name) for name in self.schema.design_variables}
+	
+	def clear_valid(self):
+		""" Removes the component's is_valid flag, if set. Returns the 
+			component's previous validity."""
+		
+		try:
+			was_valid = self.is_valid
+		except AttributeError:
+			return True
+		del self.is_valid
+		return was_valid
 
 	def roulette_chance(self):
-		self.XoverChance = [0] * (self.var_count * 6 )
-		self.MutateChance = [0] * (self.var_count * 6 )
-		for n in self.XoverChance:
-			n = (random.randint(1,9)/10)
-		for n in self.MutateChance:	
-			n = (random.randint(1,3)/10)		
+		""" Starts every per-bit crossover and mutation chance at zero.
+			Returns void."""
+		
+		self.XoverChance = np.zeros(self.schema.bit_count, dtype=CHANCE_DTYPE)
+		self.MutateChance = np.zeros(self.schema.bit_count, dtype=CHANCE_DTYPE)
 	
 
 class Cylinder(Component):
 	""" Contains the design parameters for the main
 		actuation cylinder member."""
+	
+	schema = component_schema.CYLINDER
+	__slots__ = schema.design_variables + schema.derived_variables
 		
 	def __init__(self): 
 
-		# >>> Change if variables added or removed <<<
-		self.var_count = 4
+		self.var_count = self.schema.var_count
 		self.roulette_chance()
 							
 		# Initialize variables
 		if getattr(PopMember,'is_initial_gen') == True:
 			# Random Variables:
 			self.material_ID = random.randint(1,len(PopMember.material_list))
-			self.Material = MaterialProperties(PopMember.material_list,self.material_ID)
+			self.Material = PopMember.material_table.material(self.material_ID)
 						
 			self.inner_diameter = random.randint(1,20)
 			self.cyl_length = random.randint(1,20)
@@ -289,19 +352,21 @@ class Cylinder(Component):
 class MainCylinder(Component):
 	""" Contains the design parameters for the main
 		actuation cylinder member."""
+	
+	schema = component_schema.MAIN_CYLINDER
+	__slots__ = schema.design_variables + schema.derived_variables
 		
 	def __init__(self): 
 		# >>> CALCULATE MAX EXTERNAL CYL SIZE <<<
 		
-		# >>> Change if variables added or removed <<<
-		self.var_count = 4
+		self.var_count = self.schema.var_count
 		self.roulette_chance()
 	
 		# Initialize variables
 		if getattr(PopMember,'is_initial_gen') == True:
 			# Random Variables:
 			self.material_ID = random.randint(1,len(PopMember.material_list))
-			self.Material = MaterialProperties(PopMember.material_list,self.material_ID)
+			self.Material = PopMember.material_table.material(self.material_ID)
 						
 			self.inner_diameter = random.randint(1,20)
 			self.cyl_length = random.randint(1,20)
@@ -328,23 +393,25 @@ class MainCylinder(Component):
 class ReceiverCylinder(Component):
 	""" Contains the design parameters for the receiver
 		actuation cylinder member."""
+	
+	schema = component_schema.RECEIVER_CYLINDER
+	__slots__ = schema.design_variables + schema.derived_variables
 		
 	def __init__(self): 
 		# >>> CALCULATE MAX EXTERNAL CYL SIZE <<<
 		
-		# >>> Change if variables added or removed <<<
-		self.var_count = 4
+		self.var_count = self.schema.var_count
 		self.roulette_chance()
 		
 		# Client Variables
-		self.force = extf.import_forces(force_location,'ReceiverCylinder')
+		self.force = design_context.get_context().component_forces('ReceiverCylinder')
 		self.stress = {}
 			
 		# Initialize variables
 		if getattr(PopMember,'is_initial_gen') == True:
 			# Random Variables:
 			self.material_ID = random.randint(1,len(PopMember.material_list))
-			self.Material = MaterialProperties(PopMember.material_list,self.material_ID)
+			self.Material = PopMember.material_table.material(self.material_ID)
 						
 			self.inner_diameter = random.randint(1,20)
 			self.cyl_length = random.randint(1,20)
@@ -371,11 +438,13 @@ class ReceiverCylinder(Component):
 class Structure(Component):
 	""" Contains the design parameters for the femur
 		structural member."""
+	
+	schema = component_schema.STRUCTURE
+	__slots__ = schema.design_variables + schema.derived_variables + ('structure_length',)
 		
 	def __init__(self):
 		
-		# >>> Change if variables added or removed <<<
-		self.var_count = 11
+		self.var_count = self.schema.var_count
 		self.roulette_chance()
 		
 		# Client Variables
@@ -386,7 +455,7 @@ class Structure(Component):
 		if getattr(PopMember,'is_initial_gen') == True:
 			# Random Variables:
 			self.material_ID = random.randint(1,len(PopMember.material_list))
-			self.Material = MaterialProperties(PopMember.material_list,self.material_ID)
+			self.Material = PopMember.material_table.material(self.material_ID)
 			
 			self.rib_width = random.randint(1,20)
 			self.rib_length = random.randint(1,20)
@@ -428,11 +497,13 @@ class Structure(Component):
 class Gimbal(Component):
 	""" Contains the design parameters for the ankle 
 		gimbal assembly (mounts, cross). """
+	
+	schema = component_schema.GIMBAL
+	__slots__ = schema.design_variables + schema.derived_variables
 		
 	def __init__(self):
 		
-		# >>> Change if variables added or removed <<<
-		self.var_count = 4
+		self.var_count = self.schema.var_count
 		self.roulette_chance()
 
 		# Client variables
@@ -442,7 +513,7 @@ class Gimbal(Component):
 		if getattr(PopMember,'is_initial_gen') == True:
 			# Random Variables:
 			self.material_ID = random.randint(1,len(PopMember.material_list))
-			self.Material = MaterialProperties(PopMember.material_list,self.material_ID)
+			self.Material = PopMember.material_table.material(self.material_ID)
 						
 			self.peg_length = random.randint(1,20)
 			self.peg_diameter = random.randint(1,20)
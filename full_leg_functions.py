@@ -2,17 +2,18 @@
 	as per the (supposed) drawings included in the folder. This file 
 	changes based on the need of the client."""
 import geometry, conversions, math, os
+import numpy as np
 import utility_functions as utility
 from utility_functions import name_get
 import stress_calculations as sc
 import genetic_algorithm_functions as gaf
 import extfile_functions as extf
-from __main__ import client_location
+import evaluation_cache
+import design_context
+import component_schema
 from full_leg_classes import *
 from pprint import pprint
 
-client_info = extf.import_client_info(client_location)
-
 
 # >>> Configured for metric system and mm inputs <<<
 LENGTH_CONVERT = 10**(-3)
@@ -91,7 +92,7 @@ def structure_stresses(bone,prox_forces,dist_forces):
 	bending_lever = (bone.core_diameter/2 + bone.mount_width)
 	
 	# Find max axial force
-	max_axial = float(client_info['Weight']) - max_prox_force - max_dist_force
+	max_axial = float(PopMember.client_info['Weight']) - max_prox_force - max_dist_force
 
 	# Calculate area and MoI for cross-section (x,y symmetric, rotated 45deg)
 	rotate_deg = 45
@@ -217,7 +218,7 @@ def gimbal_stresses(gimbal,joint_forces):
 	joint_y_forces = [n for x,n in joint_forces.items() if x.endswith('_ab') or x.endswith('_ad')]
 	joint_z_forces = [n for x,n in joint_forces.items() if x.endswith('_ir') or x.endswith('_or')]
 	
-	body_force = float(client_info['Weight'])
+	body_force = float(PopMember.client_info['Weight'])
 	
 	# 					>>>> Extended Stresses <<<<
 	# --> 		Axial (Ignoring transverse axial load on pin)
@@ -269,7 +270,7 @@ def gimbal_stresses(gimbal,joint_forces):
 	
 	shear_area = ((gimbal.peg_diameter - gimbal.calc_mount_width) * gimbal.mount_thickness) * AREA_CONVERT
 	# Calculate max force (All pistons fully engaged) and stress
-	shear_force = int(client_info['Weight'])
+	shear_force = int(PopMember.client_info['Weight'])
 	try:
 		gimbal.stress['fl_shear_stress'] = sc.axial(shear_force,shear_area)
 	except ZeroDivisionError:
@@ -279,7 +280,7 @@ def gimbal_stresses(gimbal,joint_forces):
 	# --> 		Bending >> Mount
 	# > X-axis (Max at mount base)
 	bend_lever = gimbal.calc_mount_height
-	bend_force = int(client_info['Weight']) + math.sin(math.pi/4)*(axial_force-int(client_info['Weight']))
+	bend_force = int(PopMember.client_info['Weight']) + math.sin(math.pi/4)*(axial_force-int(PopMember.client_info['Weight']))
 	bend_moment = bend_force * bend_lever
 	
 	
@@ -414,6 +415,153 @@ def ankle_joint(member):
 
 	return
 
+# ~~~ Component Cache ~~~
+# Components are only affected by their own genes, their material and 
+# the cylinder forces acting on them, so children that share components 
+# with evaluated members reuse those components' results.
+
+# Generations of a population's components kept by component_cache. 
+# Entries take about 1.3 KB each.
+COMPONENT_CACHE_GENERATIONS = 5
+
+# Cache of component results. None disables component caching. Sized for
+# a 100-member population until size_component_cache is called.
+component_cache = evaluation_cache.ComponentCache(max_size=100 * component_schema.MEMBER.comp_count * COMPONENT_CACHE_GENERATIONS)
+
+def size_component_cache(member_count, generations=None):
+	""" Bounds component_cache to every component of member_count 
+		members over a number of generations (by default 
+		COMPONENT_CACHE_GENERATIONS). Returns void."""
+	
+	if generations is None:
+		generations = COMPONENT_CACHE_GENERATIONS
+	if component_cache is not None:
+		component_cache.resize(member_count * component_schema.MEMBER.comp_count * generations)
+
+def component_key(member, comp, context_key=None):
+	""" Builds the cache key of a component from its type, design 
+		variables, material ID, force inputs and the design context key 
+		(read from the current context unless given). Structures and 
+		gimbals are keyed by name, as each one reads different 
+		cylinders. Returns a tuple."""
+	
+	if comp.schema.kind == 'Cylinder':
+		comp_type = 'Cylinder'
+		forces = (comp.force['cyl_pressure'],)
+	elif comp.name in STRUCTURE_JOINTS:
+		comp_type = comp.name
+		forces = tuple(getattr(member, cyl).force['max_force'] for joint in STRUCTURE_JOINTS[comp.name] for key,cyl in joint)
+	elif comp.name in GIMBAL_JOINTS:
+		comp_type = comp.name
+		forces = tuple(getattr(member, cyl).force['max_force'] for key,cyl in GIMBAL_JOINTS[comp.name])
+	else:
+		comp_type = comp.name
+		forces = ()
+	if context_key is None:
+		context_key = design_context.get_context().key()
+	return (comp_type, tuple(comp.variable_dict.values()), comp.Material.id, forces, context_key)
+
+def cached_component_stresses(member, comp, context_key=None):
+	""" Calculates a component's mass and stresses through 
+		component_cache. On a hit the cached stresses and validity are 
+		copied to the component. Either way comp.stress_entry is set to
+		the cache entry so fitness_evaluation can reuse its safety 
+		factors. Returns the component mass, or None if the component
+		geometry is degenerate."""
+	
+	key = component_key(member, comp, context_key)
+	entry = component_cache.get(key)
+	if entry is None:
+		# Record only the validity found by this calculation
+		was_valid = comp.clear_valid()
+		comp_mass = component_stresses(member, comp)
+		entry = {'mass': comp_mass, 'stress': dict(comp.stress), 'is_valid': getattr(comp, 'is_valid', True)}
+		component_cache.put(key, entry)
+		if was_valid == False:
+			comp.is_valid = False
+	else:
+		comp.stress = dict(entry['stress'])
+		if entry['is_valid'] == False:
+			comp.is_valid = False
+	comp.stress_entry = entry
+	
+	return entry['mass']
+
+def component_stresses(member, comp):
+	""" Calculates the mass and stresses of one component of a member.
+		Cylinder forces must already be defined. Stresses are stored in
+		comp.stress. Returns the component mass, or None if the 
+		component geometry is degenerate."""
+	
+	# Check for component type
+	
+	# ~~> Structures <~~
+	if comp.schema.kind == 'Structure':
+		# Calculate structure member mass
+		try:
+			rib_vol = 4 * geometry.rib_area(comp) * comp.structure_length
+			core_vol = 2 * geometry.vol_cyl(comp.core_thickness,comp.core_diameter/2)
+		except ZeroDivisionError:
+			comp.is_valid = False
+			return None
+		comp_mass = comp.Material.density * (rib_vol + core_vol)
+		
+		# Calculate stresses on structure
+		if 'Femur' in comp.name:
+			femur_interactions(member)
+		if 'Tibia' in comp.name:
+			tibia_interactions(member)	
+
+	# ~~> Cylinders <~~		
+	elif comp.schema.kind == 'Cylinder':
+		# Calculate cylinder member mass
+		try:
+			out_vol = geometry.vol_cyl(comp.cyl_length,(comp.inner_diameter/2 + comp.cyl_thickness))
+			in_vol = geometry.vol_cyl((comp.cyl_length-2*comp.base_thickness),(comp.inner_diameter/2))
+		except AttributeError:
+			out_vol = geometry.vol_cyl(comp.cyl_length,comp._outer_diameter/2)
+			in_vol = geometry.vol_cyl((comp.cyl_length-2*comp.base_thickness),(comp._outer_diameter/2 - comp.cyl_thickness))
+		comp_mass = comp.Material.density * (out_vol - in_vol)
+
+		# Calculate stresses on cylinder
+		cyl_stresses(comp)
+		
+	# ~~> Gimbals <~~	
+	elif comp.schema.kind == 'Gimbal':
+		# Calculate cross member mass
+		peg_vol = 2 * geometry.vol_cyl(comp.peg_length,comp.peg_diameter/2)
+		core_vol = geometry.vol_cyl(comp.peg_diameter,comp.peg_diameter/2)
+		cyl_intersect = geometry.vol_cyl_intersect(comp.peg_diameter/2)
+		#~ os.system('cls')
+		#~ input(comp)
+		comp_mass = comp.Material.density * (peg_vol + core_vol - 2 * cyl_intersect)
+			
+		# Calculate stresses on gimbal
+		if 'Hip' in comp.name:
+			hip_joint(member)
+		elif 'Knee' in comp.name:
+			knee_joint(member)
+		elif 'Ankle' in comp.name:
+			ankle_joint(member)
+		else:
+			print(comp.name)
+			input("~Check1~ Component Name not defined.")
+	else:
+		print(comp.name)
+		input("Component type not defined.")
+	
+	return comp_mass
+
+def dirty_components(member):
+	""" Expands a member's changed components with every component that
+		reads the forces of a changed cylinder. Returns a set of 
+		component names."""
+	
+	dirty = set(member.dirty_comps)
+	for comp_name in member.dirty_comps:
+		dirty.update(COMPONENT_DEPENDENTS.get(comp_name, ()))
+	return dirty
+
 def define_components(member):
 	""" Defines derived values as per required for the design. Derived
 		values should begin with a '~' for the search function to find 
@@ -426,87 +574,462 @@ def define_components(member):
 		#~ print(" >>>>>> Already Defined <<<<<<")
 		return
 	
-	# Calculate force output of all cylinders
+	# Only components changed since the last evaluation, and the 
+	# components reading their forces, are recalculated
+	member.dirty_comps = dirty_components(member)
+	
+	# Calculate force output of changed cylinders
 	for i,comp in member.component_dict.items():
-		if not('Cylinder' in comp.name):
+		if comp.schema.kind != 'Cylinder' or not(i in member.dirty_comps):
 			continue
 		comp.force['max_force'] = piston_force(comp)
 	
-	# Calculate mass, stresses, and cost for each component
+	# Calculate mass, stresses, and cost for each changed component
+	if component_cache is not None:
+		context_key = design_context.get_context().key()
 	for i,comp in member.component_dict.items():
+		if not(i in member.dirty_comps):
+			continue
 		
 		# Define component stress class variables
 		comp.stress= {}
 		comp.safety_factors = {}	
 		comp.fitness = 0
-
-		# Check for component type
+		comp.stress_entry = None
+		comp.clear_valid()
 		
-		# ~~> Structures <~~
-		if 'Structure' in comp.name:
-			# Calculate structure member mass
-			try:
-				rib_vol = 4 * geometry.rib_area(comp) * comp.structure_length
-				core_vol = 2 * geometry.vol_cyl(comp.core_thickness,comp.core_diameter/2)
-			except ZeroDivisionError:
-				comp.is_valid = False
-				continue
-			comp_mass = comp.Material.density * (rib_vol + core_vol)
-			
-			# Calculate stresses on structure
-			if 'Femur' in comp.name:
-				femur_interactions(member)
-			if 'Tibia' in comp.name:
-				tibia_interactions(member)	
-
-		# ~~> Cylinders <~~		
-		elif 'Cylinder' in comp.name:
-			# Calculate cylinder member mass
-			try:
-				out_vol = geometry.vol_cyl(comp.cyl_length,(comp.inner_diameter/2 + comp.cyl_thickness))
-				in_vol = geometry.vol_cyl((comp.cyl_length-2*comp.base_thickness),(comp.inner_diameter/2))
-			except AttributeError:
-				out_vol = geometry.vol_cyl(comp.cyl_length,comp._outer_diameter/2)
-				in_vol = geometry.vol_cyl((comp.cyl_length-2*comp.base_thickness),(comp._outer_diameter/2 - comp.cyl_thickness))
-			comp_mass = comp.Material.density * (out_vol - in_vol)
-
-			# Calculate stresses on cylinder
-			cyl_stresses(comp)
-			
-		# ~~> Gimbals <~~	
-		elif 'Gimbal' in comp.name:
-			# Calculate cross member mass
-			peg_vol = 2 * geometry.vol_cyl(comp.peg_length,comp.peg_diameter/2)
-			core_vol = geometry.vol_cyl(comp.peg_diameter,comp.peg_diameter/2)
-			cyl_intersect = geometry.vol_cyl_intersect(comp.peg_diameter/2)
-			#~ os.system('cls')
-			#~ input(comp)
-			comp_mass = comp.Material.density * (peg_vol + core_vol - 2 * cyl_intersect)
-				
-			# Calculate stresses on gimbal
-			if 'Hip' in comp.name:
-				hip_joint(member)
-			elif 'Knee' in comp.name:
-				knee_joint(member)
-			elif 'Ankle' in comp.name:
-				ankle_joint(member)
-			else:
-				print(comp.name)
-				input("~Check1~ Component Name not defined.")
+		# Reuse the results of an identical component under the same 
+		# forces
+		if component_cache is not None:
+			comp_mass = cached_component_stresses(member, comp, context_key)
 		else:
-			print(comp.name)
-			input("Component type not defined.")	
+			comp_mass = component_stresses(member, comp)
+		if comp_mass is None:
+			comp_mass = 0
 
-		# Increment member total mass and total cost
-		member.total_mass += comp_mass
+		# Store component mass and cost
+		member.mass_dict[i] = comp_mass
 		try:
-			member.total_cost += comp_mass * comp.Material['cost']
+			member.cost_dict[i] = comp_mass * comp.Material.cost
 		except TypeError:
 			#~ print("Missing cost information for " + str(comp.material_properties['name']))
-			member.total_cost += comp_mass * 50
+			member.cost_dict[i] = comp_mass * MISSING_COST
 	
+	# Total in component order, as the totals were accumulated before
+	member.total_mass = sum(member.mass_dict[i] for i in member.component_dict)
+	member.total_cost = sum(member.cost_dict[i] for i in member.component_dict)
 	member.is_defined = True
 	
 	return
 
+# ~~~ Batch Evaluation ~~~
+# Vectorized versions of define_components and its stress functions.
+# Members are evaluated as rows of a gene matrix, and each component type
+# is evaluated for every member in one pass.
+
+# Component kinds of component_schema evaluated by the batch functions
+BATCH_KINDS = ('Cylinder', 'Structure', 'Gimbal')
+
+# Cylinders driving each joint, keyed as in the *_interactions functions
+HIP_CYLINDERS = (('hip_ad','HipAdductCylinder'),('hip_ab','HipAbductCylinder'),('hip_ex','HipExtendCylinder'),('hip_fl','HipFlexCylinder'))
+KNEE_CYLINDERS = (('knee_ex','KneeExtendCylinder'),('knee_fl','KneeFlexCylinder'))
+ANKLE_CYLINDERS = (('ankle_ad','AnkleAdductCylinder'),('ankle_ab','AnkleAbductCylinder'),('ankle_ex','AnkleExtendCylinder'),('ankle_fl','AnkleFlexCylinder'),('ankle_ir','AnkleInternalCylinder'),('ankle_or','AnkleExternalCylinder'))
+STRUCTURE_JOINTS = {'FemurStructure': (HIP_CYLINDERS, KNEE_CYLINDERS), 'TibiaStructure': (KNEE_CYLINDERS, ANKLE_CYLINDERS)}
+GIMBAL_JOINTS = {'HipGimbal': HIP_CYLINDERS, 'KneeGimbal': KNEE_CYLINDERS, 'AnkleGimbal': ANKLE_CYLINDERS}
+
+def component_dependents():
+	""" Maps each cylinder to the structures and gimbals reading its 
+		max_force. Returns a dictionary of component name sets."""
+	
+	dependents = {}
+	for comp_name,joints in STRUCTURE_JOINTS.items():
+		for key,cyl in joints[0] + joints[1]:
+			dependents.setdefault(cyl, set()).add(comp_name)
+	for comp_name,joint in GIMBAL_JOINTS.items():
+		for key,cyl in joint:
+			dependents.setdefault(cyl, set()).add(comp_name)
+	return dependents
+
+COMPONENT_DEPENDENTS = component_dependents()
+
+MISSING_COST = 50
+
+# Material arrays and batch plans built under the current design context.
+# They read the material table and cylinder pressures, so they are 
+# rebuilt when the context key changes.
+_batch_cache = {'context_key': None, 'materials': None, 'plans': {}}
+
+def batch_cache(context_key):
+	""" Returns the batch cache for a design context key, emptying it if
+		it was built under another key."""
+	
+	if _batch_cache['context_key'] != context_key:
+		_batch_cache.update(context_key=context_key, materials=None, plans={})
+	return _batch_cache
+
+def material_arrays(context_key=None):
+	""" Builds lookup arrays of material density, yield strength and cost
+		indexed by material ID. Built once per design context key (the 
+		current context's unless given) from PopMember.material_table.
+		Returns a dictionary of arrays."""
+	
+	if context_key is None:
+		context_key = design_context.get_context().key()
+	cache = batch_cache(context_key)
+	if cache['materials'] is None:
+		table = PopMember.material_table
+		cache['materials'] = {
+			'density': table.by_id('density', 0),
+			'yield_strength': table.by_id('yield_strength', 0),
+			'cost': table.by_id('cost', float(MISSING_COST)),
+			}
+	return cache['materials']
+
+def batch_plan(layout, context_key=None):
+	""" Collects the component names, design variables, gene columns, 
+		component indices and cylinder pressures needed to evaluate 
+		members with the given layout, grouping components by their 
+		schema's kind. Built once per layout and design context key (the
+		current context's unless given). Returns a dictionary."""
+	
+	if context_key is None:
+		context_key = design_context.get_context().key()
+	plans = batch_cache(context_key)['plans']
+	if layout in plans:
+		return plans[layout]
+	
+	plan = {}
+	for kind in BATCH_KINDS:
+		names = component_schema.kind_components(layout, kind)
+		var_names = component_schema.kind_variables(layout, kind)
+		plan[kind] = {
+			'names': names,
+			'variables': var_names,
+			'columns': layout.columns(names, var_names),
+			'comp_index': np.array([layout.comp_index[n] for n in names], dtype=np.intp),
+			}
+	
+	# Cylinder pressures, as read by piston_force and cyl_stresses
+	cyl_pressure = [int(design_context.get_context().component_forces(n)['cyl_pressure']) for n in plan['Cylinder']['names']]
+	plan['Cylinder']['pressure'] = np.array(cyl_pressure, dtype=np.float64)
+	plan['Cylinder']['force_pressure'] = np.array([int(p * PRESSURE_CONVERT) for p in cyl_pressure], dtype=np.float64)
+	plan['Cylinder']['position'] = {n: i for i, n in enumerate(plan['Cylinder']['names'])}
+	
+	plans[layout] = plan
+	return plan
+
+def _gene_variables(genes, columns, var_names):
+	""" Reads the gene columns of a batch plan as floats. Returns a 
+		dictionary of arrays keyed by variable name, each of shape 
+		(N,) + columns.shape[:-1]."""
+	
+	g = genes[:, columns].astype(np.float64)
+	return {name: g[..., i] for i, name in enumerate(var_names)}
+
+def _abs_extreme(forces, mode='max'):
+	""" Vectorized utility.dict_search in 'abs' mode over the last axis.
+		Returns the signed value with the largest (or smallest) 
+		magnitude."""
+	
+	mag = np.abs(forces)
+	index = mag.argmax(axis=-1) if mode == 'max' else mag.argmin(axis=-1)
+	return np.take_along_axis(forces, index[..., None], axis=-1)[..., 0]
+
+def _force_terms(prox, dist, truncate=False):
+	""" Builds the four max/min force differences compared in 
+		structure_stresses. Returns None if either force set is empty, 
+		matching the ValueError fallback to the previous terms."""
+	
+	if prox.shape[-1] == 0 or dist.shape[-1] == 0:
+		return None
+	max_prox, min_prox = _abs_extreme(prox), _abs_extreme(prox, 'min')
+	max_dist, min_dist = _abs_extreme(dist), _abs_extreme(dist, 'min')
+	if truncate:
+		max_prox, min_prox, max_dist, min_dist = (np.trunc(n) for n in (max_prox, min_prox, max_dist, min_dist))
+	terms = (np.abs(max_prox - max_dist), np.abs(max_prox - min_dist), np.abs(min_prox - min_dist), np.abs(min_prox - max_dist))
+	return np.max(terms, axis=0)
+
+def _axis_forces(joint_forces, suffixes):
+	""" Stacks the joint forces whose keys end with any of the suffixes.
+		Returns an (N, k) array."""
+	
+	cols = [val for key, val in joint_forces if key.endswith(suffixes)]
+	if not cols:
+		return np.zeros((len(joint_forces[0][1]), 0))
+	return np.stack(cols, axis=-1)
+
+def batch_cylinders(genes, material_ids, plan, materials):
+	""" Vectorized piston_force, cylinder mass and cyl_stresses for every
+		cylinder of every member. Returns max force, mass, validity and
+		a dictionary of stress arrays, each of shape (N, cylinders)."""
+	
+	cyl = plan['Cylinder']
+	var = _gene_variables(genes, cyl['columns'], cyl['variables'])
+	inner_diameter, cyl_length, cyl_thickness, base_thickness = (var[n] for n in ('inner_diameter', 'cyl_length', 'cyl_thickness', 'base_thickness'))
+	density = materials['density'][material_ids[:, cyl['comp_index']]]
+	
+	# Piston force from the head radius (calc_r_head == inner_diameter)
+	max_force = geometry.area_circle_array(conversions.mm_to_in(inner_diameter))
+	max_force *= AREA_CONVERT * cyl['force_pressure']
+	
+	# Cylinder mass
+	mass = geometry.vol_cyl_array(cyl_length, inner_diameter/2 + cyl_thickness)
+	mass -= geometry.vol_cyl_array(cyl_length - 2*base_thickness, inner_diameter/2)
+	mass *= density
+	
+	# Pressure vessel stresses
+	in_rad = inner_diameter/2 * LENGTH_CONVERT
+	out_rad = in_rad + cyl_thickness * LENGTH_CONVERT
+	cyl_stress = sc.pressure_vessel_array(in_rad, out_rad, cyl['pressure'] * PRESSURE_CONVERT)
+	stress = {
+		'tangential_stress': cyl_stress[0],
+		'radial_stress': cyl_stress[1],
+		'longitudinal_stress': cyl_stress[2],
+		}
+	is_valid = ~sc.failed_mask(stress.values())
+	
+	# cyl_stresses records no stresses for a zero wall thickness
+	for val in stress.values():
+		val[~is_valid] = np.nan
+	
+	return max_force, mass, is_valid, stress
+
+def batch_structure(genes, material_ids, plan, materials, comp_name, prox_forces, dist_forces):
+	""" Vectorized structure mass, structure_stresses and 
+		cyl_mount_stresses for one structure component across all 
+		members. Forces are lists of (key, (N,) array) pairs. Returns 
+		mass, validity and a dictionary of stress arrays."""
+	
+	struct = plan['Structure']
+	position = struct['names'].index(comp_name)
+	var = _gene_variables(genes, struct['columns'][position], struct['variables'])
+	rib_width, rib_length, flange_width, flange_thickness, core_diameter, core_inner_diameter, core_thickness, mount_thickness, mount_width = (var[n] for n in ('rib_width', 'rib_length', 'flange_width', 'flange_thickness', 'core_diameter', 'core_inner_diameter', 'core_thickness', 'mount_thickness', 'mount_width'))
+	comp_index = struct['comp_index'][position]
+	density = materials['density'][material_ids[:, comp_index]]
+	structure_length = PopMember.client_info['FemurLength']
+	weight = float(PopMember.client_info['Weight'])
+	
+	flange_radius = np.sqrt(rib_length**2 + (flange_width/2)**2)
+	
+	# Rib area and mass. Degenerate ribs give NaN areas, and are given 
+	# no mass as in component_stresses.
+	rib_area = geometry.rib_area_array(flange_width, flange_thickness, rib_width, rib_length, core_diameter, flange_radius)
+	degenerate = np.isnan(rib_area)
+	is_valid = ~degenerate
+	core_vol = 2 * geometry.vol_cyl_array(core_thickness, core_diameter/2)
+	mass = density * (4 * rib_area * structure_length + core_vol)
+	mass[degenerate] = 0
+	
+	# Cross-section area and moments of inertia, accumulated through a
+	# single MoI work buffer
+	cs_area = 4 * rib_area
+	cs_area += geometry.area_circle_array(core_diameter/2, core_inner_diameter/2)
+	cs_area *= AREA_CONVERT
+	length_to_segment = core_diameter + rib_length + flange_thickness
+	rib_seg_angle = geometry.segment_angle_array(length_to_segment, flange_width/2)
+	is_valid &= ~np.isnan(rib_seg_angle)
+	
+	work = np.empty((3, len(genes)))
+	geometry.moi_segment_array(flange_radius, rib_seg_angle, out=work)
+	non_rotated_moi = 2 * work[0] + 2 * work[1]
+	flange_offset = length_to_segment - flange_thickness/2
+	geometry.moi_rectangle_array(flange_width, flange_thickness, 0, (flange_offset, 0), out=work)
+	non_rotated_moi += 2 * work[0]
+	geometry.moi_rectangle_array(flange_thickness, flange_width, 0, (0, flange_offset), out=work)
+	non_rotated_moi += 2 * work[0]
+	rib_offset = length_to_segment - flange_thickness - rib_length/2
+	geometry.moi_rectangle_array(rib_width, rib_length, 0, (rib_offset, 0), out=work)
+	non_rotated_moi += 2 * work[0]
+	geometry.moi_rectangle_array(rib_length, rib_width, 0, (0, rib_offset), out=work)
+	non_rotated_moi += 2 * work[0]
+	geometry.moi_circle_array(core_diameter/2, core_inner_diameter/2, out=work)
+	non_rotated_moi += work[0]
+	
+	# Rotate the MoI by 45 degrees
+	geometry.moi_rotate_array([non_rotated_moi, non_rotated_moi], 45, out=work)
+	moi = work[0].copy()
+	polar_moi = (work[0] + work[1]) * MOI_CONVERT
+	
+	# Force extremes, as selected by structure_stresses
+	prox_all = np.stack([val for key, val in prox_forces], axis=-1)
+	dist_all = np.stack([val for key, val in dist_forces], axis=-1)
+	bending_lever = core_diameter/2 + mount_width
+	max_axial = weight - _abs_extreme(prox_all) - _abs_extreme(dist_all)
+	
+	prox_x = _axis_forces(prox_forces, ('_fl','_ex'))
+	prox_y = _axis_forces(prox_forces, ('_ab','_ad'))
+	prox_z = _axis_forces(prox_forces, ('_ir','_or'))
+	dist_x = _axis_forces(dist_forces, ('_fl','_ex'))
+	dist_z = _axis_forces(dist_forces, ('_ir','_or'))
+	bending_x = _force_terms(prox_x, dist_x)
+	# structure_stresses compares the proximal y-forces against themselves
+	bending_y = _force_terms(prox_y, prox_y, truncate=True)
+	if bending_y is None:
+		bending_y = bending_x
+	torsion_force = _force_terms(prox_z, dist_z, truncate=True)
+	if torsion_force is None:
+		torsion_force = bending_y
+	
+	stress = {}
+	stress['axial_stress'] = sc.axial_array(max_axial, cs_area)
+	stress['bending_stress_x'] = sc.bending_array(bending_x * bending_lever, flange_radius, moi * MOI_CONVERT)
+	stress['bending_stress_y'] = sc.bending_array(bending_y * bending_lever, flange_radius, moi * MOI_CONVERT)
+	stress['torsion_stress'] = sc.torsion_array(torsion_force * bending_lever, flange_radius, polar_moi * MOI_CONVERT)
+	
+	# Cylinder mount stresses; the last force of each set is recorded
+	axial_area = geometry.area_rectangle(mount_width/2, mount_thickness) * AREA_CONVERT
+	shear_area = geometry.area_rectangle(mount_width, mount_thickness) * AREA_CONVERT
+	stress['prox_axial_stress'] = sc.axial_array(prox_forces[-1][1], axial_area)
+	stress['prox_shear_stress'] = sc.axial_array(prox_forces[-1][1], shear_area)
+	stress['dist_axial_stress'] = sc.axial_array(dist_forces[-1][1], axial_area)
+	stress['dist_shear_stress'] = sc.axial_array(dist_forces[-1][1], shear_area)
+	mount_moi = geometry.moi_rectangle_array(mount_thickness, mount_width)[0]
+	for index, val in prox_forces:
+		stress['prox_bending_stress' + index] = sc.bending_array(val * mount_width, mount_width/2, mount_moi)
+	for index, val in dist_forces:
+		stress['dist_bending_stress' + index] = sc.bending_array(val * mount_width, mount_width/2, mount_moi)
+	
+	# structure_stresses records no structure stresses past a degenerate
+	# segment angle, and component_stresses no stresses at all for a 
+	# degenerate rib
+	for name in ('axial_stress', 'bending_stress_x', 'bending_stress_y', 'torsion_stress'):
+		stress[name][np.isnan(rib_seg_angle)] = np.nan
+	for val in stress.values():
+		val[degenerate] = np.nan
+	
+	# Failed (infinite) stresses are left to the safety factors, as the
+	# scalar functions return sc.FAILED_STRESS for them
+	return mass, is_valid, stress
+
+def batch_gimbals(genes, material_ids, plan, materials, joint_forces):
+	""" Vectorized gimbal mass and gimbal_stresses for every gimbal of 
+		every member. joint_forces holds the summed cylinder force on 
+		each gimbal, shape (N, gimbals). Returns mass, validity and a
+		dictionary of stress arrays, each of shape (N, gimbals)."""
+	
+	gim = plan['Gimbal']
+	var = _gene_variables(genes, gim['columns'], gim['variables'])
+	peg_length, peg_diameter, mount_modifier, mount_thickness = (var[n] for n in ('peg_length', 'peg_diameter', 'mount_modifier', 'mount_thickness'))
+	density = materials['density'][material_ids[:, gim['comp_index']]]
+	body_force = float(PopMember.client_info['Weight'])
+	int_weight = int(PopMember.client_info['Weight'])
+	
+	mount_width = (mount_modifier/100 + 1) * peg_diameter
+	mount_height = 1.5 * mount_width
+	
+	# Cross member mass
+	peg_vol = 2 * geometry.vol_cyl_array(peg_length, peg_diameter/2)
+	core_vol = geometry.vol_cyl_array(peg_diameter, peg_diameter/2)
+	cyl_intersect = geometry.vol_cyl_intersect_array(peg_diameter/2)
+	mass = density * (peg_vol + core_vol - 2 * cyl_intersect)
+	
+	# Extended stresses
+	axial_force = body_force + joint_forces
+	stress = {}
+	stress['ex_axial_stress'] = sc.axial_array(axial_force, geometry.area_rectangle(mount_width, mount_thickness) * AREA_CONVERT)
+	stress['ex_shear_stress'] = sc.axial_array(axial_force, math.pi/4 * peg_diameter**2 * AREA_CONVERT)
+	peg_moi = geometry.moi_circle_array(peg_diameter/2)[0]
+	bend_moment = axial_force * (peg_length - peg_diameter)/2
+	stress['ex_bending_x'] = sc.bending_array(bend_moment, peg_diameter/2, peg_moi * MOI_CONVERT)
+	stress['ex_bending_y'] = -1 * stress['ex_bending_x']
+	
+	# Flexed stresses
+	shear_area = (peg_diameter - mount_width) * mount_thickness * AREA_CONVERT
+	stress['fl_shear_stress'] = sc.axial_array(int_weight, shear_area)
+	bend_force = int_weight + math.sin(math.pi/4) * (axial_force - int_weight)
+	mount_moi = geometry.moi_rectangle_array(mount_thickness, mount_width)[0]
+	stress['fl_bending_x'] = sc.bending_array(bend_force * mount_height, mount_width/2, mount_moi * MOI_CONVERT)
+	
+	# gimbal_stresses records every stress, so failed (infinite) 
+	# stresses are left to the safety factors
+	is_valid = np.ones(mass.shape, dtype=bool)
+	return mass, is_valid, stress
+
+def batch_safety_factors(stress, yield_strength):
+	""" Vectorized safety factor calculation from fe.stress_eval. Zero 
+		stresses score the same 10000 as the scalar version, and failed
+		(infinite) stresses are scored as the scalar functions' 
+		sc.FAILED_STRESS. Stresses a member does not record (NaN) give
+		NaN factors. Returns a dictionary of safety factor arrays."""
+	
+	material_yield = np.trunc(yield_strength * 10 ** 6)
+	safety_factors = {}
+	for name, val in stress.items():
+		sf = np.full(material_yield.shape, 10000.0)
+		stress_mag = np.abs(val)
+		stress_mag[np.isinf(stress_mag)] = sc.FAILED_STRESS
+		np.divide(material_yield, stress_mag, out=sf, where=(stress_mag != 0))
+		safety_factors[name] = sf
+	return safety_factors
+
+def evaluate_genes(genes, material_ids, layout):
+	""" Evaluates mass, stresses and safety factors for N members given 
+		as rows of a gene matrix and a material ID matrix. Mirrors 
+		define_components for every member at once. Returns a 
+		dictionary keyed by component name holding 'mass', 'is_valid', 
+		'stress' and 'safety_factors' arrays of length N, plus member 
+		level 'total_mass', 'total_cost' and 'is_valid' arrays. 
+		'is_valid' flags only the degenerate geometry define_components
+		rejects itself; stress failures are found by scoring the safety
+		factors with fe.stress_eval_array."""
+	
+	genes = np.asarray(genes)
+	material_ids = np.asarray(material_ids)
+	context_key = design_context.get_context().key()
+	plan = batch_plan(layout, context_key)
+	materials = material_arrays(context_key)
+	results = {}
+	
+	def record(comp_name, mass, is_valid, stress):
+		mat = material_ids[:, layout.comp_index[comp_name]]
+		results[comp_name] = {
+			'mass': mass,
+			'is_valid': is_valid,
+			'stress': stress,
+			'safety_factors': batch_safety_factors(stress, materials['yield_strength'][mat]),
+			'cost': mass * materials['cost'][mat],
+			}
+	
+	# ~~> Cylinders <~~
+	max_force, mass, is_valid, stress = batch_cylinders(genes, material_ids, plan, materials)
+	position = plan['Cylinder']['position']
+	for i, comp_name in enumerate(plan['Cylinder']['names']):
+		comp_stress = {name: val[:, i] for name, val in stress.items()}
+		record(comp_name, mass[:, i], is_valid[:, i], comp_stress)
+	
+	def joint(cylinders):
+		return [(key, max_force[:, position[comp_name]]) for key, comp_name in cylinders]
+	
+	# ~~> Structures <~~
+	for comp_name in plan['Structure']['names']:
+		prox, dist = STRUCTURE_JOINTS[comp_name]
+		mass, is_valid, stress = batch_structure(genes, material_ids, plan, materials, comp_name, joint(prox), joint(dist))
+		record(comp_name, mass, is_valid, stress)
+	
+	# ~~> Gimbals <~~
+	gimbal_names = plan['Gimbal']['names']
+	joint_forces = np.stack([sum(val for key, val in joint(GIMBAL_JOINTS[n])) for n in gimbal_names], axis=-1)
+	mass, is_valid, stress = batch_gimbals(genes, material_ids, plan, materials, joint_forces)
+	for i, comp_name in enumerate(gimbal_names):
+		comp_stress = {name: val[:, i] for name, val in stress.items()}
+		record(comp_name, mass[:, i], is_valid[:, i], comp_stress)
+	
+	results['total_mass'] = sum(results[n]['mass'] for n in layout.comp_names)
+	results['total_cost'] = sum(results[n]['cost'] for n in layout.comp_names)
+	results['is_valid'] = np.logical_and.reduce([results[n]['is_valid'] for n in layout.comp_names])
+	return results
+
+def define_population(store, rows=None):
+	""" Evaluates the unevaluated rows of a PopulationStore (or the given
+		rows) in one pass, writing total mass and cost back to the store.
+		Returns the row indices evaluated and the evaluate_genes results."""
+	
+	if rows is None:
+		rows = np.flatnonzero(~store.is_evaluated)
+	rows = np.asarray(rows, dtype=np.intp)
+	results = evaluate_genes(store.genes[rows], store.material_ids[rows], store.layout)
+	store.mass[rows] = results['total_mass']
+	store.cost[rows] = results['total_cost']
+	return rows, results
+
 # >>> End <<<
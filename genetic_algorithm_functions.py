@@ -2,6 +2,7 @@
 	initial population generation, crossover, mutation, and population
 	regeneration."""
 import random, os
+import numpy as np
 
 import utility_functions as utility
 import extfile_functions as extf
@@ -9,7 +10,7 @@ import mutation_functions as mutate
 import full_leg_functions as flf
 
 from full_leg_classes import *
-from __main__ import *
+from population_store import PopulationStore
 from pprint import pprint
 
 # ~~~~~/~~~~~ Initialization Functions ~~~~~\~~~~~
@@ -26,7 +27,33 @@ def generate_initial_population(member_count):
 		setattr(PopMember,'next_mem',PopMember.next_mem+1)
 	
 	return population_list
-	
+
+# ~~~~~/~~~~~ Population Store Functions ~~~~~\~~~~~
+
+def build_population_store(pop_list):
+	""" Copies a list of population members into an array-backed
+		PopulationStore. Returns the store."""
+
+	return PopulationStore.from_members(pop_list)
+
+def store_to_members(store, rows=None):
+	""" Builds PopMember objects for the given store rows (all rows by
+		default) so they can be passed to the per-member functions.
+		Returns a list of population members."""
+
+	if rows is None:
+		rows = range(len(store))
+
+	pop_list = []
+	for row in rows:
+		mem = PopMember()
+		store.write_member(row, mem)
+		for comp_name,comp in mem.component_dict.items():
+			comp.Material = PopMember.material_table.material(comp.material_ID)
+		pop_list.append(mem)
+
+	return pop_list
+
 # ~~~~~/~~~~~ Crossover Functions  ~~~~~\~~~~~
 
 def xover_point(chrom1_xover):
@@ -64,6 +91,8 @@ def member_xover(member1, member2):
 		each design component within it."""
 	new_genome_dict1 = {}
 	new_genome_dict2 = {}
+	same_comps1 = []
+	same_comps2 = []
 	
 	# Crossover each component's genome and store the new genome in a dictionary
 	for comp_name,comp in member1.component_dict.items():
@@ -78,6 +107,8 @@ def member_xover(member1, member2):
 			print(comp1)
 			print(comp2)
 			input("Component Genome Assignment Error")
+		parent_genome1 = list(genome1)
+		parent_genome2 = list(genome2)
 		
 		# Pick a member to pull XoverChance from and find the crossover index.
 		xover_index_list = [0] * random.randint(1,6)
@@ -112,6 +143,12 @@ def member_xover(member1, member2):
 		genome1 = mutate.mutate(genome1,comp1.MutateChance)
 		genome2 = mutate.mutate(genome2,comp2.MutateChance)
 		
+		# Track components left unchanged by crossover and mutation
+		if genome1 == parent_genome1:
+			same_comps1.append(comp_name)
+		if genome2 == parent_genome2:
+			same_comps2.append(comp_name)
+		
 		# Build list structure for genome information
 		genome_info1 = [genome1,key1]
 		genome_info2 = [genome2,key2]
@@ -135,11 +172,134 @@ def member_xover(member1, member2):
 		new_mem2.component_dict[comp_name].Material = comp.Material
 	
 	#~ input(type(new_mem1.Material))
+	
+	# Reuse the parents' evaluation of unchanged components
+	new_mem1.inherit_components(member1, same_comps1)
+	new_mem2.inherit_components(member2, same_comps2)
 
-	# Define new member evaluation standards
-	flf.define_components(new_mem1)
-	flf.define_components(new_mem2)
+	# New members are defined by fitness_evaluation, which can skip 
+	# genomes already in the fitness cache
 	
 	return new_mem1, new_mem2
 
+# ~~~~~/~~~~~ Population Crossover Functions  ~~~~~\~~~~~
+
+# Crossover points per component are drawn from 1 to this many, as in 
+# member_xover.
+MAX_XOVER_POINTS = 6
+
+# Weight added to every bit's XoverChance when drawing crossover points,
+# so components whose chances are all zero still cross over.
+XOVER_WEIGHT_FLOOR = 0.001
+
+def xover_masks(layout, xover_chance1, xover_chance2, rng=None):
+	""" Builds packed crossover masks for a batch of parent pairs. For
+		each component of each pair, 1 to MAX_XOVER_POINTS crossover 
+		points are placed, each drawn in proportion to the per-bit 
+		XoverChance of one randomly chosen parent. As in xover_point, a
+		point never falls on a component's first bit, so no point swaps
+		a whole component. A mask bit is set where the genome is taken 
+		from the other parent, i.e. after an odd number of points within
+		its component. Returns the (pairs, byte_count) masks and boolean
+		(pairs, bit_count) arrays of the bits chosen from each parent's
+		chances."""
+
+	if rng is None:
+		rng = utility.rng
+	pair_count = len(xover_chance1)
+	shape = (pair_count, layout.comp_count, MAX_XOVER_POINTS)
+	point_count = rng.integers(1, MAX_XOVER_POINTS + 1, size=shape[:2] + (1,))
+	pairs, comps, slots = np.nonzero(np.arange(MAX_XOVER_POINTS) < point_count)
+	from_second = rng.random(len(pairs)) < 0.5
+	seg_start = np.array([seg.start for seg in layout.comp_bit_slices])[comps]
+	seg_stop = np.array([seg.stop for seg in layout.comp_bit_slices])[comps]
+
+	# Cumulative point weights of both parents, stacked so row i + 
+	# pair_count holds the second parent of pair i
+	row_width = layout.bit_count + 1
+	weights = np.zeros((2 * pair_count, row_width), dtype=np.float32)
+	np.cumsum(np.concatenate((xover_chance1, xover_chance2)), axis=1, out=weights[:, 1:])
+	weights += np.arange(row_width, dtype=np.float32) * XOVER_WEIGHT_FLOOR
+	weights = weights.ravel()
+
+	# Inverse-CDF draw of each point within its component segment,
+	# leaving out the first bit, by a binary search run for all points
+	# of the batch at once
+	row_start = (pairs + from_second * pair_count) * row_width
+	low = row_start + seg_start + 1
+	high = row_start + seg_stop - 1
+	target = weights[low]
+	target += rng.random(len(pairs), dtype=np.float32) * (weights[high + 1] - target)
+	for step in range(int(np.max(seg_stop - seg_start - 1, initial=1)).bit_length()):
+		mid = (low + high) // 2
+		below = weights[mid + 1] <= target
+		low = np.where(below, mid + 1, low)
+		high = np.where(below, high, mid)
+	points = pairs * layout.bit_count + (low - row_start)
+
+	# Mark the bits drawn from each parent's chances
+	chosen1 = np.zeros((pair_count, layout.bit_count), dtype=bool)
+	chosen2 = np.zeros((pair_count, layout.bit_count), dtype=bool)
+	chosen1.ravel()[points[~from_second]] = True
+	chosen2.ravel()[points[from_second]] = True
+
+	# A bit is swapped when an odd number of points lie at or before it
+	# within its component
+	toggles = np.bincount(points, minlength=chosen1.size).astype(np.uint8).reshape(chosen1.shape)
+	for seg in layout.comp_bit_slices:
+		np.cumsum(toggles[:, seg], axis=1, dtype=np.uint8, out=toggles[:, seg])
+	masks = layout.pack(toggles & 1)
+
+	return masks, chosen1, chosen2
+
+def population_xover(store, parents1, parents2, rng=None):
+	""" Vectorized member_xover for a whole generation. Takes index 
+		arrays of paired parent rows and crosses every component of 
+		every pair at once through bit masks over the packed genomes. 
+		Parents' XoverChance values adapt through chance_modify_array.
+		Crossover points never fall on a component's first bit, so the
+		first child takes the leading bits of every component from 
+		parents1 and the second from parents2, and each child inherits
+		the materials and chances of that parent. Returns packed child 
+		genomes, material IDs and crossover chances for 2 * pairs 
+		children."""
+
+	parents1 = np.asarray(parents1, dtype=np.intp)
+	parents2 = np.asarray(parents2, dtype=np.intp)
+	layout = store.layout
+	genome1 = store.packed_genomes(parents1)
+	genome2 = store.packed_genomes(parents2)
+	xover_chance1 = store.xover_chance[parents1]
+	xover_chance2 = store.xover_chance[parents2]
+
+	# Swap the masked bits between parents
+	masks, chosen1, chosen2 = xover_masks(layout, xover_chance1, xover_chance2, rng)
+	swap = (genome1 ^ genome2) & masks
+	children = np.concatenate((genome1 ^ swap, genome2 ^ swap))
+
+	# Adapt the parents' crossover chances
+	xover_chance1 = utility.chance_modify_array(xover_chance1, chosen1, "xover")
+	xover_chance2 = utility.chance_modify_array(xover_chance2, chosen2, "xover")
+	store.xover_chance[parents1] = xover_chance1
+	store.xover_chance[parents2] = xover_chance2
+
+	material_ids = np.concatenate((store.material_ids[parents1], store.material_ids[parents2]))
+	xover_chance = np.concatenate((xover_chance1, xover_chance2))
+	return children, material_ids, xover_chance
+
+def population_new_gen(store, parents1, parents2, rng=None):
+	""" Crosses the paired parent rows, mutates the children and appends
+		them to the store as unevaluated members. Children inherit the 
+		MutateChance values of their leading parent, and the adapted 
+		values are written back to the parents as in mutate. Returns the
+		slice of new rows."""
+
+	parents1 = np.asarray(parents1, dtype=np.intp)
+	parents2 = np.asarray(parents2, dtype=np.intp)
+	children, material_ids, xover_chance = population_xover(store, parents1, parents2, rng)
+	parents = np.concatenate((parents1, parents2))
+	children, mutate_chance = mutate.mutate_population(children, store.mutate_chance[parents], store.layout, rng)
+	store.mutate_chance[parents] = mutate_chance
+	return store.append(store.layout.decode(children), material_ids, xover_chance, mutate_chance)
+
 # ~~~ End ~~~
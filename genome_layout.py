@@ -0,0 +1,149 @@
+""" Defines the genome layout used to store population members as flat
+	arrays. The layout fixes the order of components and of the design
+	variables within them, so every (component, variable) pair maps to
+	a single gene column and a fixed bit offset shared by all members.
+	Genomes are packed MSB-first into one uint8 buffer per member, the
+	same bit order as utility.binary_encode."""
+import numpy as np
+
+# Bits per design variable, matching utility.binary_encode
+GENE_BITS = 6
+
+_compiled_layouts = {}
+
+class GenomeLayout():
+	""" Column layout for the genes of a population member. Built once
+		per design and shared by every member and population store."""
+
+	def __init__(self, comp_names, comp_types, comp_variables, gene_bits=GENE_BITS):
+		self.comp_names = tuple(comp_names)
+		self.comp_types = tuple(comp_types)
+		self.comp_variables = tuple(tuple(var_names) for var_names in comp_variables)
+		self.comp_count = len(self.comp_names)
+		self.comp_index = {name: i for i, name in enumerate(self.comp_names)}
+
+		# Assign one gene column per (component, variable) pair
+		gene_columns = []
+		comp_slices = []
+		for comp_name, var_names in zip(self.comp_names, self.comp_variables):
+			start = len(gene_columns)
+			for var_name in var_names:
+				gene_columns.append((comp_name, var_name))
+			comp_slices.append(slice(start, len(gene_columns)))
+		self.gene_columns = tuple(gene_columns)
+		self.gene_count = len(self.gene_columns)
+		self.gene_index = {col: i for i, col in enumerate(self.gene_columns)}
+		self.comp_slices = tuple(comp_slices)
+
+		# Assign fixed bit offsets within the packed genome
+		if not 0 < gene_bits <= 8:
+			raise ValueError("Gene width must be 1-8 bits: " + str(gene_bits))
+		self.gene_bits = gene_bits
+		self.gene_max = 2**gene_bits - 1
+		self.bit_count = self.gene_count * gene_bits
+		self.byte_count = (self.bit_count + 7) // 8
+		self.bit_offsets = {col: i * gene_bits for i, col in enumerate(self.gene_columns)}
+		self.comp_bit_slices = tuple(slice(n.start * gene_bits, n.stop * gene_bits) for n in self.comp_slices)
+		self._bit_shifts = np.arange(gene_bits - 1, -1, -1, dtype=np.uint8)
+		self._bit_weights = (1 << self._bit_shifts).astype(np.uint8)
+
+		# Record the first bit of the component each bit belongs to
+		self.bit_comp_start = np.zeros(self.bit_count, dtype=np.intp)
+		for n in self.comp_bit_slices:
+			self.bit_comp_start[n] = n.start
+
+	@classmethod
+	def from_member(cls, member):
+		""" Builds the layout from the component dictionary of an
+			existing population member. Layouts are compiled once per
+			design schema, so members sharing a schema share the same
+			layout object. Members with a component_schema.MemberSchema
+			take its precompiled layout. Returns a GenomeLayout."""
+
+		schema = getattr(member, 'schema', None)
+		if schema is not None:
+			return schema.layout()
+
+		comp_names = []
+		comp_types = []
+		comp_variables = []
+		for comp_name, comp in member.component_dict.items():
+			comp_names.append(comp_name)
+			comp_types.append(type(comp).__name__)
+			comp_variables.append(tuple(comp.variable_dict))
+		return compile_layout(comp_names, comp_types, comp_variables)
+
+	def columns(self, comp_names, var_names):
+		""" Returns an integer index array of shape
+			(len(comp_names), len(var_names)) selecting the gene columns
+			of the named variables for each named component."""
+
+		return np.array([[self.gene_index[(comp_name, var_name)] for var_name in var_names] for comp_name in comp_names], dtype=np.intp)
+
+	# ~~~ Bit Packing ~~~
+
+	def encode(self, genes):
+		""" Packs gene values of shape (..., gene_count) into genomes of
+			shape (..., byte_count). Values above gene_max saturate as in
+			utility.binary_encode. Returns a uint8 array."""
+
+		genes = np.clip(genes, 0, self.gene_max).astype(np.uint8)
+		bits = (genes[..., None] >> self._bit_shifts) & 1
+		return np.packbits(bits.reshape(genes.shape[:-1] + (self.bit_count,)), axis=-1)
+
+	def decode(self, packed):
+		""" Unpacks genomes of shape (..., byte_count) back into gene
+			values of shape (..., gene_count). Returns a uint8 array."""
+
+		bits = self.unpack(packed).reshape(packed.shape[:-1] + (self.gene_count, self.gene_bits))
+		return bits @ self._bit_weights
+
+	def unpack(self, packed):
+		""" Expands packed genomes into one uint8 per bit. Returns an
+			array of shape (..., bit_count)."""
+
+		return np.unpackbits(packed, axis=-1, count=self.bit_count)
+
+	def pack(self, bits):
+		""" Packs an array of bits of shape (..., bit_count) into
+			genomes. Returns a uint8 array of shape (..., byte_count)."""
+
+		return np.packbits(bits, axis=-1)
+
+	def member_genes(self, member):
+		""" Reads the design variables of a population member in layout
+			order. Returns a list of gene values."""
+
+		genes = []
+		for comp_name, var_names in zip(self.comp_names, self.comp_variables):
+			comp = member.component_dict[comp_name]
+			for var_name in var_names:
+				genes.append(getattr(comp, var_name))
+		return genes
+
+	def member_chances(self, member, chance_name):
+		""" Concatenates a per-bit chance list (XoverChance or
+			MutateChance) of every component of a population member in
+			layout order. Returns a list of bit_count chances."""
+
+		chances = []
+		for comp_name in self.comp_names:
+			chances.extend(getattr(member.component_dict[comp_name], chance_name))
+		return chances
+
+	def member_materials(self, member):
+		""" Reads the material ID of each component of a population
+			member in layout order. Returns a list of material IDs."""
+
+		return [member.component_dict[comp_name].Material.id for comp_name in self.comp_names]
+
+def compile_layout(comp_names, comp_types, comp_variables, gene_bits=GENE_BITS):
+	""" Returns the GenomeLayout for a design schema, compiling it on
+		first use and reusing it afterwards."""
+
+	key = (tuple(comp_names), tuple(comp_types), tuple(tuple(n) for n in comp_variables), gene_bits)
+	if key not in _compiled_layouts:
+		_compiled_layouts[key] = GenomeLayout(comp_names, comp_types, comp_variables, gene_bits)
+	return _compiled_layouts[key]
+
+# ~~~ End ~~~
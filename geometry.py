@@ -2,6 +2,8 @@
 	sections"""
 
 import math, conversions
+import numpy as np
+import utility_functions as utility
 
 # ~~~ Area Functions ~~~
 
@@ -218,6 +220,144 @@ def moi_rotate(inertias,theta):
 	
 	return inertia_list
 
+# ~~~ Array Functions ~~~
+# Array-aware versions of the functions above. Inputs broadcast as NumPy
+# arrays, and results are written into the caller-provided out buffer 
+# when one is given, so whole populations can be evaluated without 
+# per-member list allocations. MoI functions return a (3, ...) array 
+# holding [I_x, I_y, J_z].
+
+def area_circle_array(radius, in_radius=0, out=None):
+	""" Array version of area_circle. Returns area in unit^2."""
+	
+	out = utility.out_buffer(out, radius, in_radius)
+	np.square(radius, out=out)
+	out -= np.square(in_radius)
+	out *= math.pi
+	return out
+
+def segment_angle_array(adjacent, opposite, out=None):
+	""" Array version of segment_angle. Entries with a zero adjacent 
+		length are set to NaN instead of raising ZeroDivisionError.
+		Returns angle in degrees."""
+	
+	out = utility.out_buffer(out, adjacent, opposite)
+	with np.errstate(divide='ignore', invalid='ignore'):
+		np.divide(opposite, adjacent, out=out)
+	np.arctan(out, out=out)
+	out *= 2 * 180/math.pi
+	out[np.broadcast_to(np.equal(adjacent, 0), out.shape)] = np.nan
+	return out
+
+def area_circ_segment_array(seg_angle, radius, out=None):
+	""" Array version of area_circ_segment. Angle in degrees. Returns 
+		area in units^2."""
+	
+	out = utility.out_buffer(out, seg_angle, radius)
+	rad_angle = np.multiply(seg_angle, math.pi/180)
+	np.subtract(rad_angle, np.sin(rad_angle), out=out)
+	out *= np.square(radius)
+	out /= 2
+	return out
+
+def rib_area_array(flange_width, flange_thickness, rib_width, rib_length, core_diameter, flange_radius, out=None):
+	""" Array version of rib_area, taking the structure dimensions as 
+		arrays instead of a component. Degenerate ribs (zero angle 
+		length) give NaN. Returns area in unit^2."""
+	
+	out = utility.out_buffer(out, flange_width, flange_thickness, rib_width, rib_length, core_diameter, flange_radius)
+	angle_length = np.add(flange_width, rib_length)
+	angle_length += core_diameter
+	seg_angle = segment_angle_array(angle_length, np.divide(flange_width, 2))
+	area_circ_segment_array(seg_angle, flange_radius, out=out)
+	out += np.multiply(flange_width, flange_thickness)
+	out += np.multiply(rib_width, rib_length)
+	return out
+
+def vol_cyl_array(length, radius, in_radius=0, out=None):
+	""" Array version of vol_cyl. Returns volume in unit^3."""
+	
+	out = utility.out_buffer(out, length, radius, in_radius)
+	area_circle_array(radius, in_radius, out=out)
+	out *= length
+	return out
+
+def vol_cyl_intersect_array(radius, out=None):
+	""" Array version of vol_cyl_intersect. Returns volume in unit^3."""
+	
+	out = utility.out_buffer(out, radius)
+	np.power(radius, 3, out=out)
+	out *= 8 * (2 - math.sqrt(2))
+	return out
+
+def moi_circle_array(radius, in_radius=0, center_offset=(0,0), out=None):
+	""" Array version of moi_circle. Offsets may be arrays. Returns a 
+		(3, ...) array of [I_x, I_y, J_z]."""
+	
+	out = utility.out_buffer(out, radius, in_radius, center_offset[0], center_offset[1], lead=(3,))
+	np.power(radius, 4, out=out[0, ...])
+	out[0] -= np.power(in_radius, 4)
+	out[0] *= math.pi/4
+	out[1] = out[0]
+	
+	# Apply parallel axis theorem
+	area = area_circle_array(radius, in_radius)
+	out[0] += area * np.square(center_offset[0])
+	out[1] += area * np.square(center_offset[1])
+	np.add(out[0], out[1], out=out[2, ...])
+	return out
+
+def moi_rectangle_array(base, height, angle_offset=0, center_offset=(0,0), out=None):
+	""" Array version of moi_rectangle. Angle in degrees; offsets may be
+		arrays. Returns a (3, ...) array of [I_x, I_y, J_z]."""
+	
+	out = utility.out_buffer(out, base, height, angle_offset, center_offset[0], center_offset[1], lead=(3,))
+	rad_offset = np.multiply(angle_offset, math.pi/180)
+	cos_sq = np.square(np.cos(rad_offset))
+	sin_sq = np.square(np.sin(rad_offset))
+	base_sq = np.square(base)
+	height_sq = np.square(height)
+	area = np.multiply(base, height)
+	
+	out[0] = height_sq*cos_sq + base_sq*sin_sq
+	out[1] = base_sq*cos_sq + height_sq*sin_sq
+	out[:2] *= area/12
+	
+	# Apply parallel axis theorem
+	out[0] += area * np.square(center_offset[0])
+	out[1] += area * np.square(center_offset[1])
+	np.add(out[0], out[1], out=out[2, ...])
+	return out
+
+def moi_segment_array(radius, segment_angle, out=None):
+	""" Array version of moi_segment. Angle in degrees. Returns a 
+		(3, ...) array of [I_x, I_y, J_z]."""
+	
+	out = utility.out_buffer(out, radius, segment_angle, lead=(3,))
+	segment_rads = np.multiply(segment_angle, math.pi/180)
+	sin_rads = np.sin(segment_rads)
+	common = 2 * sin_rads * np.square(np.sin(segment_rads/2))
+	radius_4 = np.power(radius, 4)
+	out[0] = radius_4/8 * (segment_rads - sin_rads + common)
+	out[1] = radius_4/24 * (3*segment_rads - 3*sin_rads + common)
+	np.add(out[0], out[1], out=out[2, ...])
+	return out
+
+def moi_rotate_array(inertias, theta, out=None):
+	""" Array version of moi_rotate. Takes [I_x, I_y, ...] with array 
+		entries and an angle in degrees. Returns a (3, ...) array of 
+		[I_x, I_y, J_z]."""
+	
+	initial_x = np.asarray(inertias[0])
+	initial_y = np.asarray(inertias[1])
+	out = utility.out_buffer(out, initial_x, initial_y, theta, lead=(3,))
+	term1 = (initial_x + initial_y)/2
+	term2 = (initial_x - initial_y)/2 * np.cos(2*np.multiply(theta, math.pi/180))
+	np.add(term1, term2, out=out[0, ...])
+	np.subtract(term1, term2, out=out[1, ...])
+	np.add(out[0], out[1], out=out[2, ...])
+	return out
+
 # ~~~ 3D Moment of Inertia Calculations ~~~
 
 # >>> End <<<
@@ -0,0 +1,187 @@
+""" Defines the island model for the genetic algorithm. Several
+	populations evolve independently in separate processes, each held 
+	in a PopulationStore and evolved by roulette.population_evaluate, 
+	and every few generations each island sends copies of its best 
+	members to another island over a ring or random topology. Migrants
+	travel as gene and material ID arrays only. Islands use the design 
+	context current in the parent, set with design_context.configure()."""
+
+import multiprocessing, random
+import numpy as np
+
+import design_context
+import utility_functions as utility
+import genetic_algorithm_functions as gaf
+import roulette_selection as roulette
+import fitness_evaluation as fe
+import full_leg_functions as flf
+from full_leg_classes import PopMember
+from population_store import PopulationStore
+
+# ~~~ Migration ~~~
+
+def migration_target(island_id, island_count, epoch, topology='ring', seed=0):
+	""" Picks the island that receives this island's migrants in a
+		migration epoch. 'ring' always sends to the next island. 'random'
+		shifts every island by the same random offset each epoch, so each
+		island sends and receives exactly one batch. Returns the target
+		island ID."""
+
+	if topology == 'ring':
+		offset = 1
+	elif topology == 'random':
+		offset = int(np.random.default_rng((seed, epoch)).integers(1, island_count))
+	else:
+		raise ValueError("Unknown migration topology: " + str(topology))
+	return (island_id + offset) % island_count
+
+def select_migrants(store, migrant_count):
+	""" Copies the genes and material IDs of the fittest valid, evaluated
+		rows of a store. Returns a dictionary of gene and material ID 
+		arrays."""
+
+	candidates = np.flatnonzero(store.is_valid & store.is_evaluated)
+	candidates = candidates[np.argsort(-store.fitness[candidates], kind='stable')][:migrant_count]
+	if len(candidates) == 0:
+		return {'genes': None, 'material_ids': None}
+	return {
+		'genes': store.genes[candidates].copy(),
+		'material_ids': store.material_ids[candidates].copy(),
+		}
+
+def receive_migrants(store, migrants):
+	""" Replaces the least fit rows of a store with received migrant 
+		arrays, then evaluates the migrants. Returns the store."""
+
+	if migrants['genes'] is None or not len(store):
+		return store
+	keep = np.ones(len(store), dtype=bool)
+	keep[np.argsort(store.fitness, kind='stable')[:len(migrants['genes'])]] = False
+	store.compact(keep)
+	rows = store.append(migrants['genes'], migrants['material_ids'])
+	fe.population_fitness_evaluation(store, np.arange(rows.start, rows.stop))
+	return store
+
+# ~~~ Island Process ~~~
+
+# Resets of unfit initial members before an island starts evolving.
+max_resets = 200
+
+def initial_population(member_count):
+	""" Generates and evaluates an initial population, regenerating the
+		members scoring below 1 until at least two members are fit or
+		max_resets is reached, as in the _test.py reset loop. Returns the
+		population list."""
+
+	pop_list = gaf.generate_initial_population(member_count)
+	for member in pop_list:
+		flf.define_components(member)
+	fe.fitness_evaluation(pop_list)
+
+	reset_count = 0
+	while sum(mem.total_fitness >= 1 for mem in pop_list) < 2 and reset_count < max_resets:
+		for mem in pop_list:
+			if mem.total_fitness < 1:
+				mem.reset_member()
+				mem.total_fitness = 0
+				mem.total_mass = 0
+				mem.total_cost = 0
+				mem.is_valid = True
+			flf.define_components(mem)
+		fe.fitness_evaluation(pop_list)
+		reset_count += 1
+
+	setattr(PopMember,'is_initial_gen',False)
+	return pop_list
+
+def run_island(island_id, island_count, member_count, generation_count, migration_interval, migrant_count, topology, seed, inboxes, results, context=None):
+	""" Evolves one island population in its own process, exchanging
+		migrants through the island inbox queues. The initial population
+		is built as members and then evolved as a PopulationStore. Puts the island ID, the
+		generation history and the best member's genes on the results
+		queue. The island runs under the given design context, if any.
+		Returns void."""
+
+	if context is not None:
+		design_context.set_context(context)
+	utility.seed(seed + island_id)
+	flf.size_component_cache(member_count)
+	setattr(PopMember,'is_initial_gen',True)
+	setattr(PopMember,'next_mem',0)
+
+	history = {'pop_count': [], 'max_fitness': [], 'total_fitness': []}
+	store = gaf.build_population_store(initial_population(member_count))
+
+	epoch = 0
+	current_gen = 0
+	try:
+		while current_gen < generation_count:
+			fe.population_fitness_evaluation(store)
+			total_fitness = float(store.fitness.sum())
+			roulette.population_evaluate(store)
+			history['pop_count'].append(len(store))
+			history['max_fitness'].append(float(store.fitness.max()))
+			history['total_fitness'].append(total_fitness)
+			current_gen += 1
+
+			# Exchange migrants every migration_interval generations
+			if island_count > 1 and current_gen % migration_interval == 0 and current_gen < generation_count:
+				target = migration_target(island_id, island_count, epoch, topology, seed)
+				inboxes[target].put(select_migrants(store, migrant_count))
+				store = receive_migrants(store, inboxes[island_id].get())
+				epoch += 1
+	except SystemExit:
+		# Dead population. Keep sending empty batches so no other island
+		# waits on this one, and keep draining the inbox so the sending
+		# islands' queue feeders never block on an unread pipe.
+		store = PopulationStore(store.layout)
+		while current_gen < generation_count:
+			current_gen += 1
+			if island_count > 1 and current_gen % migration_interval == 0 and current_gen < generation_count:
+				target = migration_target(island_id, island_count, epoch, topology, seed)
+				inboxes[target].put(select_migrants(store, migrant_count))
+				inboxes[island_id].get()
+				epoch += 1
+
+	fe.population_fitness_evaluation(store)
+	results.put((island_id, history, select_migrants(store, 1)))
+
+def run_islands(island_count, member_count, generation_count, migration_interval=5, migrant_count=2, topology='ring', seed=None):
+	""" Runs island_count populations in parallel processes, migrating
+		the top migrant_count members of each island every
+		migration_interval generations. Returns a list of each island's
+		generation history and best member, ordered by island ID."""
+
+	if seed is None:
+		seed = random.randrange(2**31)
+	inboxes = [multiprocessing.Queue() for _ in range(island_count)]
+	results = multiprocessing.Queue()
+	processes = []
+	for island_id in range(island_count):
+		args = (island_id, island_count, member_count, generation_count, migration_interval, migrant_count, topology, seed, inboxes, results, design_context.get_context())
+		process = multiprocessing.Process(target=run_island, args=args)
+		process.start()
+		processes.append(process)
+
+	# Collect results before joining so full queues cannot block exit
+	island_results = [None] * island_count
+	for _ in range(island_count):
+		island_id, history, best = results.get()
+		island_results[island_id] = {'history': history, 'best': best}
+	for process in processes:
+		process.join()
+
+	return island_results
+
+if __name__ == '__main__':
+	design_context.configure('material_properties.csv', 'component_forces.txt', 'client_info.csv')
+	island_count = 4
+	member_count = 100
+	generation_count = 150
+
+	island_results = run_islands(island_count, member_count, generation_count)
+	for island_id, result in enumerate(island_results):
+		history = result['history']
+		print("Island " + str(island_id) + " Max Fitness: " + str(max(history['max_fitness'], default=0)))
+
+# ~~~ End ~~~
@@ -0,0 +1,266 @@
+""" Defines the indexed material table. The material list read from
+	material_properties.csv is stored once as read-only columnar arrays
+	with a material ID to row map, so single materials are found in
+	constant time and whole populations are gathered with one indexing
+	call per property. The parsed materials are kept in a snapshot file
+	next to the CSV, so later imports and worker processes skip parsing."""
+import hashlib, os, pickle
+import numpy as np
+
+import extfile_functions as extf
+
+def python_value(column, row):
+	""" Reads one entry of a table column as a Python value."""
+
+	val = column[row]
+	return val.item() if isinstance(val, np.generic) else val
+
+class MaterialTable():
+	""" Immutable column store of material properties. Columns made only
+		of numbers are float arrays; columns mixing numbers and text
+		(e.g. 'N/A' costs) keep their values in object arrays."""
+
+	def __init__(self, columns, units=None):
+		self.names = tuple(columns)
+		self.units = dict(units or {})
+		self.columns = {}
+		for name,column in columns.items():
+			column = np.array(column, dtype=column.dtype)
+			column.flags.writeable = False
+			self.columns[name] = column
+
+		# Map material IDs to rows, through a dictionary for single IDs
+		# and a lookup array for arrays of IDs
+		self.ids = self.columns['id'].astype(np.intp)
+		self.ids.flags.writeable = False
+		self.row_index = {int(mat_id): row for row, mat_id in enumerate(self.ids)}
+		self._id_rows = np.full(int(self.ids.max(initial=0)) + 1, -1, dtype=np.intp)
+		self._id_rows[self.ids] = np.arange(len(self.ids))
+		self._id_rows.flags.writeable = False
+		self._materials = {}
+
+	@classmethod
+	def from_list(cls, material_list, unit_list=()):
+		""" Builds a table from the material list and unit list of
+			extf.build_material_list. Returns the table."""
+
+		names = tuple(material_list[0].keys()) if material_list else ()
+		columns = {}
+		for name in names:
+			values = [entry[name] for entry in material_list]
+			if all(isinstance(val, float) for val in values):
+				columns[name] = np.array(values, dtype=float)
+			else:
+				columns[name] = np.empty(len(values), dtype=object)
+				columns[name][:] = values
+		return cls(columns, dict(zip(names, unit_list)))
+
+	def unit_list(self):
+		""" Returns the units of each property, in column order."""
+
+		return [self.units.get(name, '') for name in self.names]
+
+	def __len__(self):
+		return len(self.ids)
+
+	def __contains__(self, material_ID):
+		return int(material_ID) in self.row_index
+
+	def row(self, material_ID):
+		""" Finds the row of a material ID. Raises KeyError for unknown
+			IDs. Returns the row index."""
+
+		return self.row_index[int(material_ID)]
+
+	def rows(self, material_ids):
+		""" Finds the rows of an array of material IDs. Raises KeyError
+			if any ID is unknown. Returns an array of row indices."""
+
+		material_ids = np.asarray(material_ids, dtype=np.intp)
+		known = (material_ids >= 0) & (material_ids < len(self._id_rows))
+		rows = np.full(material_ids.shape, -1, dtype=np.intp)
+		rows[known] = self._id_rows[material_ids[known]]
+		if np.any(rows < 0):
+			raise KeyError("Unknown material IDs: " + str(np.unique(material_ids[rows < 0]).tolist()))
+		return rows
+
+	def value(self, name, material_ID):
+		""" Returns one property of a material as a Python value."""
+
+		return python_value(self.columns[name], self.row(material_ID))
+
+	def gather(self, name, material_ids, fill=np.nan):
+		""" Gathers a numeric property for an array of material IDs of
+			any shape. Text values, such as a missing cost, are replaced
+			by fill. Returns a float array."""
+
+		column = self.columns[name]
+		if column.dtype == object:
+			column = np.array([fill if isinstance(val, str) else val for val in column], dtype=float)
+		return column[self.rows(material_ids)]
+
+	def by_id(self, name, fill=np.nan):
+		""" Builds a float array of a property indexed directly by
+			material ID, with fill at unused IDs. Returns the array."""
+
+		values = np.full(len(self._id_rows), fill, dtype=float)
+		values[self.ids] = self.gather(name, self.ids, fill)
+		return values
+
+	def properties(self, material_ID):
+		""" Returns a dictionary of every property of a material, as in
+			the rows of the material list."""
+
+		row = self.row(material_ID)
+		return {name: python_value(self.columns[name], row) for name in self.names}
+
+	def material(self, material_ID):
+		""" Returns the shared MaterialProperties view of a material."""
+
+		material_ID = int(material_ID)
+		try:
+			return self._materials[material_ID]
+		except KeyError:
+			mat = MaterialProperties(self, material_ID)
+			self._materials[material_ID] = mat
+			return mat
+
+class MaterialProperties():
+	""" Stores material property data for a component. Holds only the
+		table and row of the material; properties are read from the
+		table columns. Views are shared between components through
+		MaterialTable.material."""
+
+	__slots__ = ('table', 'row')
+
+	def __init__(self, table, material_ID):
+		self.table = table
+		self.row = table.row(material_ID)
+
+	def _get(self, name):
+		return python_value(self.table.columns[name], self.row)
+
+	@property
+	def id(self):
+		return int(self.table.ids[self.row])
+
+	@property
+	def name(self):
+		return self._get('name')
+
+	@property
+	def treatment(self):
+		return self._get('treatment')
+
+	@property
+	def cost(self):
+		return self._get('cost')
+
+	@property
+	def density(self):
+		return self._get('density')
+
+	@property
+	def ultimate_tensile_strength(self):
+		return self._get('ultimate_tensile_strength')
+
+	@property
+	def yield_strength(self):
+		return self._get('yield_strength')
+
+	@property
+	def elastic_modulus(self):
+		return self._get('elastic_modulus')
+
+	@property
+	def poissons_ratio(self):
+		return self._get('poissons_ratio')
+
+# ~~~ Snapshot ~~~
+# The snapshot holds the parsed material, name and unit lists, keyed by 
+# the CSV's modification time, size and hash. PopMember needs the list 
+# itself as well as the table, and the list loads faster from a pickle 
+# than from column arrays.
+
+# Bump when the snapshot contents change
+SNAPSHOT_VERSION = 2
+
+def snapshot_location(location):
+	""" Returns the snapshot path kept next to a material CSV."""
+
+	return os.path.splitext(location)[0] + '.pickle'
+
+def source_stamp(location):
+	""" Returns the modification time and size of a file."""
+
+	file_stat = os.stat(location)
+	return (file_stat.st_mtime_ns, file_stat.st_size)
+
+def source_hash(location):
+	""" Returns the blake2b hex digest of a file's contents."""
+
+	with open(location, 'rb') as file_object:
+		return hashlib.blake2b(file_object.read(), digest_size=16).hexdigest()
+
+def save_snapshot(location, stamp, digest, material_list, name_list, unit_list):
+	""" Writes the snapshot of the CSV at location through a temporary 
+		file. Failures to write are ignored, as the snapshot is only a 
+		cache. Returns void."""
+
+	snapshot = snapshot_location(location)
+	temp_location = snapshot + '.' + str(os.getpid()) + '.tmp'
+	data = {'version': SNAPSHOT_VERSION, 'stamp': stamp, 'hash': digest, 'material_list': material_list, 'name_list': name_list, 'unit_list': unit_list}
+	try:
+		with open(temp_location, 'wb') as file_object:
+			pickle.dump(data, file_object, protocol=pickle.HIGHEST_PROTOCOL)
+		os.replace(temp_location, snapshot)
+	except OSError:
+		try:
+			os.remove(temp_location)
+		except OSError:
+			pass
+
+def read_snapshot(location, stamp):
+	""" Reads the snapshot of the CSV at location. The snapshot is used
+		if the CSV's modification time and size are unchanged, or
+		otherwise if its contents hash the same, in which case the 
+		snapshot is saved again with the new stamp. Returns the 
+		material, name and unit lists, or None if the snapshot is 
+		missing, stale or unreadable."""
+
+	try:
+		with open(snapshot_location(location), 'rb') as file_object:
+			data = pickle.load(file_object)
+	except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+		return None
+	if not isinstance(data, dict) or data.get('version') != SNAPSHOT_VERSION:
+		return None
+	lists = data['material_list'], data['name_list'], data['unit_list']
+	if data.get('stamp') != stamp:
+		digest = source_hash(location)
+		if data.get('hash') != digest:
+			return None
+		save_snapshot(location, stamp, digest, *lists)
+	return lists
+
+def load_material_list(location):
+	""" Loads the material list and unit list of a CSV from its 
+		snapshot, or parses the CSV with extf.build_material_list and 
+		writes a new snapshot. Returns the material, name and unit 
+		lists."""
+
+	stamp = source_stamp(location)
+	lists = read_snapshot(location, stamp)
+	if lists is None:
+		lists = extf.build_material_list(location)
+		save_snapshot(location, stamp, source_hash(location), *lists)
+	return lists
+
+def load_material_table(location):
+	""" Loads the material table of a CSV through its snapshot. Returns
+		the table, the material list and the material name list."""
+
+	material_list, name_list, unit_list = load_material_list(location)
+	return MaterialTable.from_list(material_list, unit_list), material_list, name_list
+
+# ~~~ End ~~~
@@ -3,6 +3,7 @@
 import utility_functions as utility
 import genetic_algorithm_functions as gaf
 import random
+import numpy as np
 
 def transpose(binary_string, mutate_index, transpose_dir):
 	""" Transposes the bit located at the mutate index up or down based 
@@ -66,3 +67,62 @@ def  mutate(binary_string, mutation_chance):
 		binary_string = transpose(binary_string, mutate_index, -1)
 	return binary_string
 	
+
+
+# ~~~ Array Mutation ~~~
+
+def flip_bits(packed, rows, bits):
+	""" Inverts the given bits of the given rows of a packed genome 
+	matrix in place. Repeated (row, bit) pairs flip once per entry. 
+	Returns the packed matrix."""
+	
+	bit_mask = np.left_shift(1, 7 - (bits & 7)).astype(np.uint8)
+	np.bitwise_xor.at(packed, (rows, bits >> 3), bit_mask)
+	return packed
+
+def read_bits(packed, rows, bits):
+	""" Reads the given bits of the given rows of a packed genome 
+	matrix. Returns a uint8 array of bit values."""
+	
+	return (packed[rows, bits >> 3] >> (7 - (bits & 7))) & 1
+
+def mutate_population(packed, mutate_chance, layout, rng=None):
+	""" Array version of mutate for a whole generation of packed 
+	genomes. Every bit's MutateChance is trialled in one draw, and each
+	component mutates at most once, at its last triggered bit, by 
+	inversion or by transposition with the next or previous bit of the
+	same component. Triggered chances are divided down and the rest 
+	incremented as in chance_modify. Returns the mutated packed genomes
+	and the updated mutation chances."""
+	
+	if rng is None:
+		rng = utility.rng
+	triggered = rng.random(mutate_chance.shape, dtype=np.float32) < mutate_chance
+	mutate_chance = utility.chance_modify_array(mutate_chance, triggered, "mutate")
+	
+	# Find the last triggered bit of every component of every row
+	seg_start = np.array([seg.start for seg in layout.comp_bit_slices])
+	seg_stop = np.array([seg.stop for seg in layout.comp_bit_slices])
+	bit_index = np.where(triggered, np.arange(layout.bit_count), -1)
+	last_bit = np.maximum.reduceat(bit_index, seg_start, axis=1)
+	rows, comps = np.nonzero(last_bit >= 0)
+	if len(rows) == 0:
+		return packed, mutate_chance
+	mutate_index = last_bit[rows, comps]
+	
+	# Pick the mutation type: transpose up, invert or transpose down
+	mutate_selector = rng.integers(0, 3, len(rows))
+	transpose_dir = 1 - mutate_selector
+	
+	# Transposition partners wrap around within the component
+	seg_len = seg_stop[comps] - seg_start[comps]
+	transpose_index = seg_start[comps] + (mutate_index - seg_start[comps] + transpose_dir) % seg_len
+	
+	# Inversions flip their bit. Transpositions flip both bits only 
+	# when they differ, which swaps them.
+	packed = packed.copy()
+	inverts = mutate_selector == 1
+	swaps = ~inverts & (read_bits(packed, rows, mutate_index) != read_bits(packed, rows, transpose_index))
+	flip_bits(packed, rows[inverts], mutate_index[inverts])
+	flip_bits(packed, np.concatenate((rows[swaps], rows[swaps])), np.concatenate((mutate_index[swaps], transpose_index[swaps])))
+	return packed, mutate_chance
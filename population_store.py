@@ -0,0 +1,476 @@
+""" Defines the array-backed population store for the genetic algorithm.
+	The genes of every member are held in one contiguous integer matrix
+	(members x genes), with parallel arrays for material IDs, fitness,
+	mass, cost, age, validity and per-bit crossover and mutation chances. Members are
+	accessed through lightweight row views instead of per-member object
+	graphs. The store is used by the array versions of the GA steps 
+	(fe.population_fitness_evaluation and roulette.population_evaluate,
+	which culls with roulette.population_cull and breeds with 
+	gaf.population_new_gen), which run the generation loops of _test.py,
+	the cycle runner and the island model, and by parallel evaluation.
+	MemberView is the row view. PopMember keeps its component objects 
+	for the per-member functions, such as initial population generation
+	and resets, and converts with gaf.build_population_store and 
+	gaf.store_to_members."""
+import weakref
+import numpy as np
+from multiprocessing import shared_memory
+import component_schema
+from genome_layout import GenomeLayout
+
+GENE_DTYPE = np.uint8
+MATERIAL_DTYPE = np.int16
+CHANCE_DTYPE = np.float32
+INITIAL_AGE = -3
+
+class PopulationStore():
+	""" Stores a whole population as parallel arrays sharing a common
+		GenomeLayout. Rows are kept packed at the front of buffers with
+		spare capacity so new generations can be appended in place. 
+		PopMember objects written from a row share the row's chance 
+		arrays, and are tracked so they follow the row as it moves."""
+
+	def __init__(self, layout, capacity=0):
+		self.layout = layout
+		self.size = 0
+		self._bound = weakref.WeakKeyDictionary()
+		self._allocate(max(int(capacity), 1))
+
+	def _allocate(self, capacity):
+		""" Allocates (or grows) the backing buffers to hold at least
+			capacity rows, keeping existing rows. Returns void."""
+
+		for name, (shape, dtype, fill) in self._buffer_specs(capacity).items():
+			buf = self._new_buffer(name, shape, dtype, fill)
+			if self.size:
+				buf[:self.size] = getattr(self, name)[:self.size]
+			setattr(self, name, buf)
+		self.capacity = capacity
+		for member, row in list(self._bound.items()):
+			self._bind_chances(member, row)
+
+	def _buffer_specs(self, capacity):
+		""" Returns the shape, dtype and initial value of every backing
+			buffer for the given capacity, keyed by attribute name."""
+
+		bit_count = self.layout.bit_count
+		return {
+			'_genes': ((capacity, self.layout.gene_count), GENE_DTYPE, 0),
+			'_material_ids': ((capacity, self.layout.comp_count), MATERIAL_DTYPE, 0),
+			'_fitness': ((capacity,), np.float64, 0),
+			'_mass': ((capacity,), np.float64, 0),
+			'_cost': ((capacity,), np.float64, 0),
+			'_age': ((capacity,), np.int16, INITIAL_AGE),
+			'_is_valid': ((capacity,), bool, True),
+			'_is_evaluated': ((capacity,), bool, False),
+			'_xover_chance': ((capacity, bit_count), CHANCE_DTYPE, 0),
+			'_mutate_chance': ((capacity, bit_count), CHANCE_DTYPE, 0),
+			}
+
+	def _new_buffer(self, name, shape, dtype, fill):
+		""" Creates one backing buffer. Returns the array."""
+
+		return np.full(shape, fill, dtype=dtype)
+
+	# ~~~ Array Views ~~~
+	# Each view covers only the occupied rows of its buffer.
+
+	@property
+	def genes(self):
+		return self._genes[:self.size]
+
+	@property
+	def material_ids(self):
+		return self._material_ids[:self.size]
+
+	@property
+	def fitness(self):
+		return self._fitness[:self.size]
+
+	@property
+	def mass(self):
+		return self._mass[:self.size]
+
+	@property
+	def cost(self):
+		return self._cost[:self.size]
+
+	@property
+	def age(self):
+		return self._age[:self.size]
+
+	@property
+	def is_valid(self):
+		return self._is_valid[:self.size]
+
+	@property
+	def is_evaluated(self):
+		return self._is_evaluated[:self.size]
+
+	@property
+	def xover_chance(self):
+		return self._xover_chance[:self.size]
+
+	@property
+	def mutate_chance(self):
+		return self._mutate_chance[:self.size]
+
+	def __len__(self):
+		return self.size
+
+	def __getitem__(self, row):
+		if row < 0:
+			row += self.size
+		if not 0 <= row < self.size:
+			raise IndexError("Population row out of range: " + str(row))
+		return MemberView(self, row)
+
+	def __iter__(self):
+		for row in range(self.size):
+			yield MemberView(self, row)
+
+	# ~~~ Population Operations ~~~
+
+	@classmethod
+	def from_members(cls, pop_list, layout=None):
+		""" Builds a store from a list of PopMember objects. The layout
+			is taken from the first member unless one is provided, and 
+			an empty population uses the layout of the member schema.
+			Returns the new PopulationStore."""
+
+		if layout is None:
+			layout = GenomeLayout.from_member(pop_list[0]) if pop_list else component_schema.MEMBER.layout()
+		if not pop_list:
+			return cls(layout)
+		store = cls(layout, len(pop_list))
+		genes = [layout.member_genes(mem) for mem in pop_list]
+		material_ids = [layout.member_materials(mem) for mem in pop_list]
+		xover_chance = [layout.member_chances(mem, 'XoverChance') for mem in pop_list]
+		mutate_chance = [layout.member_chances(mem, 'MutateChance') for mem in pop_list]
+		rows = store.append(genes, material_ids, xover_chance, mutate_chance)
+		store._fitness[rows] = [mem.total_fitness for mem in pop_list]
+		store._mass[rows] = [mem.total_mass for mem in pop_list]
+		store._cost[rows] = [mem.total_cost for mem in pop_list]
+		store._age[rows] = [mem.age for mem in pop_list]
+		store._is_valid[rows] = [mem.is_valid for mem in pop_list]
+		store._is_evaluated[rows] = [mem.is_evaluated for mem in pop_list]
+		return store
+
+	def append(self, genes, material_ids, xover_chance=None, mutate_chance=None):
+		""" Appends new, unevaluated members to the end of the store.
+			Accepts arrays of shape (n, gene_count) and (n, comp_count),
+			and optionally (n, bit_count) crossover and mutation chances,
+			which otherwise start at zero as in Component.roulette_chance.
+			Returns the slice of rows written."""
+
+		genes = np.asarray(genes, dtype=GENE_DTYPE).reshape(-1, self.layout.gene_count)
+		material_ids = np.asarray(material_ids, dtype=MATERIAL_DTYPE).reshape(-1, self.layout.comp_count)
+		if len(genes) != len(material_ids):
+			raise ValueError("Gene and material row counts differ: " + str(len(genes)) + " != " + str(len(material_ids)))
+
+		start = self.size
+		stop = start + len(genes)
+		if stop > self.capacity:
+			self._allocate(max(stop, 2 * self.capacity))
+		rows = slice(start, stop)
+		self._genes[rows] = genes
+		self._material_ids[rows] = material_ids
+		self._fitness[rows] = 0
+		self._mass[rows] = 0
+		self._cost[rows] = 0
+		self._age[rows] = INITIAL_AGE
+		self._is_valid[rows] = True
+		self._is_evaluated[rows] = False
+		self._xover_chance[rows] = 0 if xover_chance is None else xover_chance
+		self._mutate_chance[rows] = 0 if mutate_chance is None else mutate_chance
+		self.size = stop
+		return rows
+
+	def compact(self, keep):
+		""" Removes every row whose entry in the boolean keep mask is
+			False, in a single pass over each array. Returns the number
+			of rows removed."""
+
+		keep = np.asarray(keep, dtype=bool)
+		if keep.shape != (self.size,):
+			raise ValueError("Keep mask length " + str(keep.shape) + " does not match population size " + str(self.size))
+		kept = int(np.count_nonzero(keep))
+		new_rows = np.cumsum(keep) - 1
+		for member, row in list(self._bound.items()):
+			if row >= self.size or not keep[row]:
+				self._unbind_chances(member)
+		for name in self._buffer_specs(0):
+			buf = getattr(self, name)
+			buf[:kept] = buf[:self.size][keep]
+		for member, row in list(self._bound.items()):
+			self._bind_chances(member, int(new_rows[row]))
+		removed = self.size - kept
+		self.size = kept
+		return removed
+
+	def _bind_chances(self, member, row):
+		""" Points a member's crossover and mutation chances at a row of
+			the chance buffers, and records the member so it is re-bound
+			when the row moves. Returns void."""
+
+		member.share_chances(self._xover_chance[row], self._mutate_chance[row])
+		self._bound[member] = row
+
+	def _unbind_chances(self, member):
+		""" Gives a bound member its own copy of its row's chances and 
+			stops tracking it, before the row is removed or its buffer 
+			released. Returns void."""
+
+		row = self._bound.pop(member)
+		member.share_chances(self._xover_chance[row].copy(), self._mutate_chance[row].copy())
+
+	def packed_genomes(self, rows=slice(None)):
+		""" Packs the genes of the given rows (all rows by default) into
+			bit-packed genomes using the store's layout. Returns a uint8
+			array of shape (rows, byte_count)."""
+
+		return self.layout.encode(self.genes[rows])
+
+	def load_member(self, row, member):
+		""" Overwrites a row with the genes and state of a PopMember.
+			Returns void."""
+
+		self._genes[row] = self.layout.member_genes(member)
+		self._material_ids[row] = self.layout.member_materials(member)
+		self._fitness[row] = member.total_fitness
+		self._mass[row] = member.total_mass
+		self._cost[row] = member.total_cost
+		self._age[row] = member.age
+		self._is_valid[row] = member.is_valid
+		self._is_evaluated[row] = member.is_evaluated
+		self._xover_chance[row] = self.layout.member_chances(member, 'XoverChance')
+		self._mutate_chance[row] = self.layout.member_chances(member, 'MutateChance')
+
+	def write_member(self, row, member):
+		""" Writes the genes and state of a row onto an existing
+			PopMember. The member shares the row's chances rather than 
+			copying them. Material objects are left to the caller, since
+			the store only tracks material IDs. Returns void."""
+
+		genes = self._genes[row]
+		old_values = {comp_name: (getattr(comp, 'variable_dict', None), getattr(comp, 'material_ID', None)) for comp_name, comp in member.component_dict.items()}
+		for col, (comp_name, var_name) in enumerate(self.layout.gene_columns):
+			setattr(member.component_dict[comp_name], var_name, int(genes[col]))
+		for comp_name, comp in member.component_dict.items():
+			comp_index = self.layout.comp_index[comp_name]
+			comp.material_ID = int(self._material_ids[row, comp_index])
+			comp.calculated_variables()
+			comp.define_component_variables()
+		self._bind_chances(member, row)
+		member.mark_dirty([comp_name for comp_name, comp in member.component_dict.items() if (comp.variable_dict, comp.material_ID) != old_values[comp_name]])
+		member.total_fitness = float(self._fitness[row])
+		member.total_mass = float(self._mass[row])
+		member.total_cost = float(self._cost[row])
+		member.age = int(self._age[row])
+		member.is_valid = bool(self._is_valid[row])
+		member.is_evaluated = bool(self._is_evaluated[row])
+
+class SharedPopulationStore(PopulationStore):
+	""" PopulationStore whose buffers live in multiprocessing shared
+		memory blocks. Worker processes attach to the blocks by name 
+		through handle() and attach(), and read and write rows in place
+		without copying. The creating store owns the blocks and frees 
+		them in close()."""
+
+	def __init__(self, layout, capacity=0):
+		self._blocks = {}
+		self._owner = True
+		super().__init__(layout, capacity)
+
+	def _allocate(self, capacity):
+		old_blocks = self._blocks
+		self._blocks = {}
+		super()._allocate(capacity)
+		for block in old_blocks.values():
+			block.close()
+			block.unlink()
+
+	def _new_buffer(self, name, shape, dtype, fill):
+		""" Creates one backing buffer in a new shared memory block. 
+			Returns the array."""
+
+		nbytes = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+		block = shared_memory.SharedMemory(create=True, size=nbytes)
+		self._blocks[name] = block
+		buf = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+		buf[...] = fill
+		return buf
+
+	def handle(self):
+		""" Returns a small picklable description of the shared blocks,
+			used by attach() in another process."""
+
+		return {
+			'layout': self.layout,
+			'capacity': self.capacity,
+			'blocks': {name: block.name for name, block in self._blocks.items()},
+			}
+
+	@classmethod
+	def attach(cls, handle, size=0):
+		""" Attaches to the shared blocks described by a handle from 
+			another process. The attached store does not own the blocks,
+			and its size must be set to match the owner's. Returns the
+			attached SharedPopulationStore."""
+
+		store = cls.__new__(cls)
+		store.layout = handle['layout']
+		store.capacity = handle['capacity']
+		store.size = size
+		store._owner = False
+		store._blocks = {}
+		store._bound = weakref.WeakKeyDictionary()
+		for name, (shape, dtype, fill) in store._buffer_specs(store.capacity).items():
+			block = attach_block(handle['blocks'][name])
+			store._blocks[name] = block
+			setattr(store, name, np.ndarray(shape, dtype=dtype, buffer=block.buf))
+		return store
+
+	def close(self):
+		""" Releases the shared blocks, freeing them if this store owns 
+			them. Members sharing its rows keep copies of their chances.
+			The store cannot be used afterwards. Returns void."""
+
+		for member in list(self._bound):
+			self._unbind_chances(member)
+		for name in self._buffer_specs(0):
+			setattr(self, name, None)
+		for block in self._blocks.values():
+			block.close()
+			if self._owner:
+				block.unlink()
+		self._blocks = {}
+
+def attach_block(name):
+	""" Opens an existing shared memory block without registering it for
+		cleanup by this process, since the creating process owns it. 
+		Returns the SharedMemory object."""
+
+	try:
+		return shared_memory.SharedMemory(name=name, track=False)
+	except TypeError:
+		# Python < 3.13 always registers attached blocks. Pool workers 
+		# share their parent's resource tracker, so the registration 
+		# duplicates the owner's and is cleared by its unlink().
+		return shared_memory.SharedMemory(name=name)
+
+class MemberView():
+	""" Lightweight view onto one row of a PopulationStore. Exposes the
+		same member-level attribute names as PopMember, so selection
+		code reading age, fitness and validity works on either. Component
+		attributes return ComponentView objects onto the row's genes."""
+
+	__slots__ = ('store', 'row')
+
+	def __init__(self, store, row):
+		object.__setattr__(self, 'store', store)
+		object.__setattr__(self, 'row', row)
+
+	def __getattr__(self, name):
+		if name in self.store.layout.comp_index:
+			return ComponentView(self.store, self.row, name)
+		raise AttributeError(name)
+
+	def __eq__(self, other):
+		return isinstance(other, MemberView) and other.store is self.store and other.row == self.row
+
+	def __hash__(self):
+		return hash((id(self.store), self.row))
+
+	@property
+	def genes(self):
+		return self.store._genes[self.row]
+
+	@property
+	def material_ids(self):
+		return self.store._material_ids[self.row]
+
+	@property
+	def total_fitness(self):
+		return float(self.store._fitness[self.row])
+
+	@total_fitness.setter
+	def total_fitness(self, val):
+		self.store._fitness[self.row] = val
+
+	@property
+	def total_mass(self):
+		return float(self.store._mass[self.row])
+
+	@total_mass.setter
+	def total_mass(self, val):
+		self.store._mass[self.row] = val
+
+	@property
+	def total_cost(self):
+		return float(self.store._cost[self.row])
+
+	@total_cost.setter
+	def total_cost(self, val):
+		self.store._cost[self.row] = val
+
+	@property
+	def age(self):
+		return int(self.store._age[self.row])
+
+	@age.setter
+	def age(self, val):
+		self.store._age[self.row] = val
+
+	@property
+	def is_valid(self):
+		return bool(self.store._is_valid[self.row])
+
+	@is_valid.setter
+	def is_valid(self, val):
+		self.store._is_valid[self.row] = val
+
+	@property
+	def is_evaluated(self):
+		return bool(self.store._is_evaluated[self.row])
+
+	@is_evaluated.setter
+	def is_evaluated(self, val):
+		self.store._is_evaluated[self.row] = val
+
+class ComponentView():
+	""" View onto the genes of one component within a store row. Design
+		variables read and write the underlying gene matrix directly."""
+
+	__slots__ = ('store', 'row', 'name')
+
+	def __init__(self, store, row, name):
+		object.__setattr__(self, 'store', store)
+		object.__setattr__(self, 'row', row)
+		object.__setattr__(self, 'name', name)
+
+	def __getattr__(self, var_name):
+		try:
+			col = self.store.layout.gene_index[(self.name, var_name)]
+		except KeyError:
+			raise AttributeError(var_name)
+		return int(self.store._genes[self.row, col])
+
+	def __setattr__(self, var_name, val):
+		try:
+			col = self.store.layout.gene_index[(self.name, var_name)]
+		except KeyError:
+			raise AttributeError(var_name)
+		self.store._genes[self.row, col] = val
+
+	@property
+	def material_ID(self):
+		return int(self.store._material_ids[self.row, self.store.layout.comp_index[self.name]])
+
+	@property
+	def variable_dict(self):
+		layout = self.store.layout
+		var_names = layout.comp_variables[layout.comp_index[self.name]]
+		return {var_name: getattr(self, var_name) for var_name in var_names}
+
+# ~~~ End ~~~
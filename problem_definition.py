@@ -0,0 +1,143 @@
+""" Loads the problem definition of the design: the component forces of
+	component_forces.txt and the patient data of client_info.csv. The
+	files are parsed once into a validated, read-only Problem, which is
+	also saved as a binary snapshot keyed by the files' hashes so later
+	runs skip the text parsing. Component variables are declared in
+	component_schema, so class_attributes.txt is not read."""
+import hashlib, os, pickle
+from types import MappingProxyType
+
+import extfile_functions as extf
+import component_schema
+
+snapshot_location = 'problem_snapshot.pickle'
+
+# Bump when the snapshot contents change
+SNAPSHOT_VERSION = 2
+
+# Client values read by the design functions
+REQUIRED_CLIENT_INFO = ('Weight', 'FemurLength')
+
+_problems = {}
+
+class ProblemError(ValueError):
+	""" Raised when a problem definition file fails validation."""
+
+class Problem():
+	""" Read-only problem definition. forces maps component names to 
+		force mappings, and client_info maps client values to floats."""
+
+	__slots__ = ('forces', 'client_info', 'hashes')
+
+	def __init__(self, forces, client_info, hashes):
+		object.__setattr__(self, 'forces', MappingProxyType({name: MappingProxyType(dict(vals)) for name,vals in forces.items()}))
+		object.__setattr__(self, 'client_info', MappingProxyType(dict(client_info)))
+		object.__setattr__(self, 'hashes', tuple(hashes))
+
+	def __setattr__(self, name, val):
+		raise AttributeError("Problem definitions are read-only")
+
+	def component_forces(self, comp_name):
+		""" Returns a new dictionary of a component's forces."""
+
+		return dict(self.forces.get(comp_name, {}))
+
+	def to_dict(self):
+		""" Returns the problem as plain dictionaries for the snapshot."""
+
+		return {
+			'forces': {name: dict(vals) for name,vals in self.forces.items()},
+			'client_info': dict(self.client_info),
+			}
+
+def validate_problem(forces, client_info):
+	""" Checks parsed problem files for missing client values and for
+		member cylinders without a pressure. Raises ProblemError. 
+		Returns void."""
+
+	for name in REQUIRED_CLIENT_INFO:
+		if not(name in client_info):
+			raise ProblemError("Client info is missing " + name)
+	for name, schema in component_schema.MEMBER.components:
+		if schema.kind == 'Cylinder' and not('cyl_pressure' in forces.get(name, {})):
+			raise ProblemError("No cyl_pressure force for " + name)
+
+def file_hash(location):
+	""" Returns the blake2b hex digest of a file's contents."""
+
+	with open(location, 'rb') as file_object:
+		return hashlib.blake2b(file_object.read(), digest_size=16).hexdigest()
+
+def file_stamp(location):
+	""" Returns the modification time and size of a file."""
+
+	stat = os.stat(location)
+	return (stat.st_mtime_ns, stat.st_size)
+
+def read_snapshot(location, hashes):
+	""" Reads a problem snapshot saved from files with the given hashes.
+		Returns the snapshot's problem dictionary, or None if the
+		snapshot is missing, stale or unreadable."""
+
+	try:
+		with open(location, 'rb') as file_object:
+			snapshot = pickle.load(file_object)
+	except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+		return None
+	if not isinstance(snapshot, dict) or snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('hashes') != hashes:
+		return None
+	return snapshot['problem']
+
+def write_snapshot(location, problem):
+	""" Writes a problem snapshot through a temporary file, so readers
+		never see a partial snapshot. Failures to write are ignored, as
+		the snapshot is only a cache. Returns void."""
+
+	temp_location = location + '.' + str(os.getpid()) + '.tmp'
+	snapshot = {'version': SNAPSHOT_VERSION, 'hashes': problem.hashes, 'problem': problem.to_dict()}
+	try:
+		with open(temp_location, 'wb') as file_object:
+			pickle.dump(snapshot, file_object, protocol=pickle.HIGHEST_PROTOCOL)
+		os.replace(temp_location, location)
+	except OSError:
+		try:
+			os.remove(temp_location)
+		except OSError:
+			pass
+
+def load_problem(force_location, client_location, snapshot=None):
+	""" Loads the problem definition from its input files, through the
+		in-process cache, then the snapshot file (snapshot_location by
+		default, False to disable), and only then by parsing the text
+		files. The in-process cache is checked by file modification time
+		and size, so files are only hashed when they change. Raises 
+		ProblemError for invalid files. Returns a Problem."""
+
+	# The snapshot defaults to the forces file's folder
+	if snapshot is None:
+		snapshot = os.path.join(os.path.dirname(os.path.abspath(force_location)), snapshot_location)
+	locations = (force_location, client_location)
+	key = tuple(os.path.abspath(location) for location in locations)
+	stamps = tuple(file_stamp(location) for location in locations)
+	if key in _problems and _problems[key][0] == stamps:
+		return _problems[key][1]
+
+	hashes = tuple(file_hash(location) for location in locations)
+	data = read_snapshot(snapshot, hashes) if snapshot else None
+	if data is None:
+		data = {
+			'forces': extf.force_table(force_location),
+			'client_info': extf.import_client_info(client_location),
+			}
+		validate_problem(data['forces'], data['client_info'])
+		problem = Problem(data['forces'], data['client_info'], hashes)
+		if snapshot:
+			write_snapshot(snapshot, problem)
+	else:
+		problem = Problem(data['forces'], data['client_info'], hashes)
+		extf.store_force_table(force_location, problem.forces)
+
+	_problems[key] = (stamps, problem)
+	return problem
+
+# ~~~ End ~~~
@@ -2,85 +2,293 @@
 including fitness conversion to selection probability, pairing, and 
 new generation functions."""
 
-import random, math
+import random, math, bisect
+import numpy as np
 import utility_functions as utility
 import genetic_algorithm_functions as gaf
 from pprint import pprint
 
+# Members older than this many generations always die.
+max_age = 10
+
+# Parent selection method used by evaluate: 'roulette', 'tournament' 
+# or 'rank'.
+selection_method = 'roulette'
+
+# Members per tournament for tournament selection.
+tournament_size = 3
+
+# Expected selections of the best member relative to the average for 
+# linear rank selection, between 1 (uniform) and 2.
+rank_pressure = 1.7
+
+# Roulette sampler built by fitness_convert. 'cumulative' searches a
+# cumulative fitness array, 'alias' builds an AliasTable with O(1) draws.
+selection_sampler = 'cumulative'
+
+def age_mask(ages, rng=None):
+	""" Draws age-related deaths for an array of member ages. Each 
+		member dies when its age exceeds a random threshold of 1-10, up
+		to a third of the population, and always once it would pass 
+		max_age. Returns a boolean death mask."""
+	
+	if rng is None:
+		rng = utility.rng
+	ages = np.asarray(ages)
+	max_dead = math.floor(len(ages)/3)
+	thresh = rng.integers(1, 11, len(ages))
+	
+	# Random deaths, limited to the first max_dead in population order
+	dead = ages > thresh
+	dead &= np.cumsum(dead) <= max_dead
+	
+	# Survivors age a generation, and the oldest die regardless
+	dead |= ages + 1 > max_age
+	return dead
+
+def fitness_mask(is_valid, fitness, selection=None):
+	""" Flags members that cannot be selected as parents: invalid 
+		members, and for roulette selection zero-fitness members. Returns
+		a boolean keep mask."""
+	
+	if selection is None:
+		selection = selection_method
+	keep = np.asarray(is_valid, dtype=bool).copy()
+	if selection == 'roulette':
+		keep &= np.asarray(fitness) != 0
+	return keep
+
+def replacement_pairs(removed):
+	""" Number of extra pairs needed to replace removed members, two 
+		children per pair. Returns a float as used by pairing."""
+	
+	return removed / 2
+
 def age(pop_list):
 	""" Checks for age-related member deaths, and increments age of 
-		members that survive to the next generation. Returns modified 
-		population list."""
+		members that survive to the next generation. Dead members are 
+		removed in a single pass. Returns modified population list and
+		the number of pairs needed to replace the dead."""
 	
-	# Limit the number of members that can die per generation
-	max_dead = math.floor(len(pop_list)/3)
-	mem_dead = 0
+	dead = age_mask([member.age for member in pop_list])
+	survivors = [member for member, is_dead in zip(pop_list, dead) if not is_dead]
+	for member in survivors:
+		member.age += 1
+	
+	mem_dead = len(pop_list) - len(survivors)
+	pop_list[:] = survivors
 		
-	# Check for member death
-	for i,member in enumerate(pop_list):
-		thresh = random.randint(1,10)
-		if member.age > thresh and mem_dead < max_dead:
-			pop_list.pop(i)
-			mem_dead += 1
-		else:
-			member.age += 1
-
-			# If population member is older than 10 generations, kill the member
-			if member.age > 10:
-				pop_list.pop(i)
-				mem_dead += 1
+	return pop_list, replacement_pairs(mem_dead)
+
+def cull(pop_list, selection=None):
+	""" Applies age deaths and invalid/zero-fitness removal as one 
+		combined mask, compacting the population list once. Survivors 
+		age a generation. Returns the population list and the number of
+		pairs needed to replace the removed members."""
+	
+	keep = ~age_mask([member.age for member in pop_list])
+	keep &= fitness_mask([member.is_valid for member in pop_list], [member.total_fitness for member in pop_list], selection)
+	survivors = [member for member, is_kept in zip(pop_list, keep) if is_kept]
+	for member in survivors:
+		member.age += 1
+	
+	removed = len(pop_list) - len(survivors)
+	pop_list[:] = survivors
+	return pop_list, replacement_pairs(removed)
+
+def population_cull(store, selection=None, rng=None):
+	""" Store version of cull. Only evaluated rows are checked for 
+		validity and fitness, and the store is compacted once. Returns 
+		the number of pairs needed to replace the removed rows."""
+	
+	keep = ~age_mask(store.age, rng)
+	keep &= fitness_mask(store.is_valid, store.fitness, selection) | ~store.is_evaluated
+	store.age[keep] += 1
+	return replacement_pairs(store.compact(keep))
+	
+class AliasTable():
+	""" Walker/Vose alias table over a fitness vector. Built once per 
+		generation with array operations; each draw then costs one 
+		uniform index and one coin flip regardless of population size."""
+	
+	def __init__(self, fitness):
+		weights = np.maximum(np.asarray(fitness, dtype=np.float64), 0)
+		self.total = weights.sum()
+		n = len(weights)
+		scaled = weights * n / self.total
+		self.prob = np.ones(n, dtype=np.float64)
+		self.alias = np.arange(n, dtype=np.intp)
 		
-		# Adjust members dead to account for pair production
-		mem_dead = math.floor(mem_dead/2)
+		# Under-full columns take their top from an over-full donor, in 
+		# Vose's order without the per-member loop. Donor k fills the 
+		# columns whose cumulative deficit starts within its cumulative 
+		# surplus, and each exhausted donor is topped up by the next.
+		small = np.nonzero(scaled < 1)[0]
+		large = np.nonzero(scaled >= 1)[0]
+		if len(large) == 0:
+			# Equal weights can all round to just under 1. As in Vose, 
+			# columns left without a donor keep a probability of 1.
+			return
+		deficit = 1 - scaled[small]
+		surplus = scaled[large] - 1
+		donor = np.searchsorted(np.cumsum(surplus), np.cumsum(deficit) - deficit, side='left')
+		donor = np.minimum(donor, len(large) - 1)
+		self.prob[small] = scaled[small]
+		self.alias[small] = large[donor]
+		donated = np.bincount(donor, weights=deficit, minlength=len(large))
+		self.prob[large] = np.clip(1 + np.cumsum(surplus - donated), 0, 1)
+		self.alias[large[:-1]] = large[1:]
+	
+	def __len__(self):
+		return len(self.prob)
+	
+	def draw(self, count, rng=None):
+		""" Draws count member indices. Returns an integer array."""
 		
-	return pop_list, mem_dead
+		if rng is None:
+			rng = utility.rng
+		column = rng.integers(0, len(self.prob), count)
+		keep = rng.random(count) < self.prob[column]
+		return np.where(keep, column, self.alias[column])
+
+def build_sampler(fitness, sampler=None):
+	""" Builds the roulette sampler named by sampler (selection_sampler
+		by default) from a fitness vector. Returns a cumulative fitness 
+		array or an AliasTable."""
 	
-def fitness_convert(pop_list):
+	if sampler is None:
+		sampler = selection_sampler
+	if sampler == 'cumulative':
+		return cumulative_fitness(fitness)
+	elif sampler == 'alias':
+		return AliasTable(fitness)
+	raise ValueError("Unknown roulette sampler: " + str(sampler))
+
+def fitness_convert(pop_list, sampler=None):
 	""" Collects each member's fitness score, then gives a weighted 
-		probability for selection. Returns a list composed of a lower
-		and upper probability bound."""
-	
-	# Check for invalid members of the population
-	add_temp = 0
-	i = 0
-	while i < len(pop_list):
-		if pop_list[i].is_valid == False or pop_list[i].total_fitness == 0:
-			pop_list.pop(i)
-			add_temp += 1
-		i += 1	
+		probability for selection. Returns the roulette sampler for the
+		population, by default a cumulative fitness array where member
+		i is selected by draws between entries i-1 and i."""
+	
+	# Remove invalid members of the population
+	add_temp = len(pop_list)
+	pop_list[:] = [mem for mem in pop_list if mem.is_valid and mem.total_fitness != 0]
+	add_temp -= len(pop_list)
 	
 	#~ utility.print_member_fitness(pop_list)
 	
-	# Sum all fitness scores for weighting purposes.
-	total_fitness = 0
-	for member in pop_list:
-		total_fitness += member.total_fitness
+	# Sum fitness scores for weighting purposes.
+	fitness = np.maximum([member.total_fitness for member in pop_list], 0)
+	total_fitness = fitness.sum()
 	
 	print("Total Fitness Value: " + str(total_fitness))
 	
-	# Assign percentage of total fitness to each member
-	fitness_percent = [0] * len(pop_list)
-	for index,val in enumerate(pop_list):
-		try:
-			fitness_percent[index] = val.total_fitness/total_fitness
-		except ZeroDivisionError:
-			print(total_fitness)
-			print("Dead population, ending program")
-			exit()
-			
-	# Determine probability bounds for each member
-	select_prob = []
-	i = 0
-	while i < len(pop_list):
-		prob_range = [0,0]
-		if i != 0:
-			prob_range[0] = select_prob[(i-1)][1]
-		prob_range[1] = prob_range[0] + fitness_percent[i]
-		select_prob.append(prob_range)
-		i += 1
+	if total_fitness <= 0:
+		print(total_fitness)
+		print("Dead population, ending program")
+		exit()
 	
+	select_prob = build_sampler(fitness, sampler)
 	return select_prob, add_temp
 
+class Tournament():
+	""" Tournament-k selector over a fitness vector. Each draw picks k 
+		members uniformly at random and keeps the fittest, so only the
+		ordering of fitness values matters."""
+	
+	def __init__(self, fitness, size=None):
+		self.fitness = np.asarray(fitness, dtype=np.float64)
+		self.size = tournament_size if size is None else size
+	
+	def __len__(self):
+		return len(self.fitness)
+	
+	def draw(self, count, rng=None):
+		""" Runs count tournaments at once. Returns an integer array of
+			the winners."""
+		
+		if rng is None:
+			rng = utility.rng
+		entrants = rng.integers(0, len(self.fitness), (count, self.size))
+		winner = np.argmax(self.fitness[entrants], axis=1)
+		return entrants[np.arange(count), winner]
+
+def rank_weights(fitness, pressure=None):
+	""" Linear rank selection weights. The worst member gets 2 - pressure
+		and the best gets pressure, with ties broken by order. Returns a 
+		float array summing to the member count."""
+	
+	if pressure is None:
+		pressure = rank_pressure
+	n = len(fitness)
+	rank = np.empty(n, dtype=np.float64)
+	rank[np.argsort(fitness, kind='stable')] = np.arange(n)
+	if n < 2:
+		return np.ones(n)
+	return (2 - pressure) + 2 * (pressure - 1) * rank / (n - 1)
+
+def selection_convert(pop_list, selection=None):
+	""" Removes invalid members and builds the parent sampler for the 
+		selection method (selection_method by default). Roulette uses 
+		fitness_convert; tournament and rank selection only compare 
+		fitness values, so zero and negative scores are kept. Returns 
+		the sampler and the number of members removed."""
+	
+	if selection is None:
+		selection = selection_method
+	if selection == 'roulette':
+		return fitness_convert(pop_list)
+	if selection not in ('tournament', 'rank'):
+		raise ValueError("Unknown selection method: " + str(selection))
+	
+	add_temp = len(pop_list)
+	pop_list[:] = [mem for mem in pop_list if mem.is_valid]
+	add_temp -= len(pop_list)
+	if not pop_list:
+		print("Dead population, ending program")
+		exit()
+	
+	fitness = np.array([member.total_fitness for member in pop_list], dtype=np.float64)
+	if selection == 'tournament':
+		return Tournament(fitness), add_temp
+	return build_sampler(rank_weights(fitness)), add_temp
+
+def cumulative_fitness(fitness):
+	""" Builds the running sum of fitness scores used for roulette 
+		draws. Negative scores are treated as zero. Returns a float 
+		array."""
+	
+	return np.cumsum(np.maximum(fitness, 0), dtype=np.float64)
+
+def draw_members(select_prob, count, rng=None):
+	""" Draws count member indices at once from a sampler built by 
+		build_sampler or selection_convert, by binary search of a 
+		cumulative fitness array or by the sampler's own draw method. 
+		Members with zero roulette weight are never drawn. Returns an 
+		integer array."""
+	
+	if hasattr(select_prob, 'draw'):
+		return select_prob.draw(count, rng)
+	if rng is None:
+		rng = utility.rng
+	targets = rng.random(count) * select_prob[-1]
+	index = np.searchsorted(select_prob, targets, side='right')
+	return np.minimum(index, len(select_prob) - 1)
+
+def draw_pairs(select_prob, pair_count, rng=None, max_redraws=100):
+	""" Roulette-draws pair_count pairs of member indices. The second 
+		member of any pair matching its first is redrawn, up to 
+		max_redraws times. Returns two integer arrays."""
+	
+	parents1 = draw_members(select_prob, pair_count, rng)
+	parents2 = draw_members(select_prob, pair_count, rng)
+	for _ in range(max_redraws):
+		bad_match = np.nonzero(parents1 == parents2)[0]
+		if len(bad_match) == 0:
+			break
+		parents2[bad_match] = draw_members(select_prob, len(bad_match), rng)
+	return parents1, parents2
+
 def pairing(pop_list, select_prob, add_members):
 	"""Takes selection probabilities and population list to define pairs
 		of members for defining the new generations. Returns a list of 
@@ -89,29 +297,23 @@ def pairing(pop_list, select_prob, add_members):
 	# deaths
 	
 	# Define the needed variables
-	new_pairs = 8 + add_members
+	new_pairs = math.ceil(8 + add_members)
 	#~ print('\nNew Pairs: ' + str(new_pairs) + '\n')
-	current_pair = 0
-	pair_list = []
 	
-	# Loop to determine new pairs
-	while current_pair < new_pairs:
-		pair_list.append(temp_pair_set(pop_list,select_prob))
-		current_pair +=1
+	# Draw every pair at once
+	parents1, parents2 = draw_pairs(select_prob, new_pairs)
+	pair_list = [[pop_list[i], pop_list[j]] for i, j in zip(parents1, parents2)]
 	return pair_list
 
 def pair_search(select_prob):
-	exit_val = False
-	search_count = 0
-	while exit_val == False:
-		select_val = random.random()
-		#~ print("Starting search...")
-		for i,val in enumerate(select_prob):
-			if (select_val >= val[0] and select_val < val[1]):
-				exit_val = True
-				return(i)
-				exit()
-			#~ print("No Append")
+	""" Draws a single member index by bisecting the cumulative fitness
+		array, or from a sampler with its own draw method. Returns the 
+		index."""
+	
+	if hasattr(select_prob, 'draw'):
+		return int(select_prob.draw(1)[0])
+	select_val = random.random() * select_prob[-1]
+	return min(bisect.bisect_right(select_prob, select_val), len(select_prob) - 1)
 
 def temp_pair_set(pop_list,select_prob):
 	temp_pair = [0,0]
@@ -135,23 +337,57 @@ def new_gen (pop_list, pair_list):
 		pop_list.append(mem2)
 	return pop_list
 
-def evaluate(pop_list):
-	""" Performs evaluation of population fitness and generates new 
-	members of the population based on roulette selection method. 
-	Returns the updated population list."""
+def population_convert(store, selection=None, sampler=None):
+	""" Store version of selection_convert, called after population_cull
+		on an evaluated store, so no invalid or (for roulette) 
+		zero-fitness rows remain. Ends the program on a dead population.
+		Returns the sampler over the store rows."""
 	
-	add_members = 0
+	if selection is None:
+		selection = selection_method
+	if selection not in ('roulette', 'tournament', 'rank'):
+		raise ValueError("Unknown selection method: " + str(selection))
+	
+	fitness = store.fitness.astype(np.float64)
+	if selection == 'roulette':
+		fitness = np.maximum(fitness, 0)
+	print("Total Fitness Value: " + str(fitness.sum()))
+	if len(fitness) == 0 or (selection == 'roulette' and fitness.sum() <= 0):
+		print("Dead population, ending program")
+		exit()
+	
+	if selection == 'roulette':
+		return build_sampler(fitness, sampler)
+	if selection == 'tournament':
+		return Tournament(fitness)
+	return build_sampler(rank_weights(fitness))
+
+def population_evaluate(store, selection=None, rng=None):
+	""" Store version of evaluate for a store evaluated by 
+		fe.population_fitness_evaluation. Culls the store, draws parent
+		pairs for the selection method and appends their children as 
+		unevaluated rows. Returns the store."""
+	
+	add_members = population_cull(store, selection, rng)
+	select_prob = population_convert(store, selection)
+	parents1, parents2 = draw_pairs(select_prob, math.ceil(8 + add_members), rng)
+	gaf.population_new_gen(store, parents1, parents2, rng)
+	return store
+
+def evaluate(pop_list, selection=None):
+	""" Performs evaluation of population fitness and generates new 
+	members of the population based on the selection method: roulette, 
+	tournament or rank (selection_method by default). Returns the 
+	updated population list."""
 	
-	# Kill old members
-	pop_list,add_temp = age(pop_list)
-	add_members += add_temp
+	# Kill old, invalid and (for roulette) zero-fitness members
+	pop_list, add_members = cull(pop_list, selection)
 	
 	# Evaluate fitness scores and defines reproduction probabilty
-	select_prob, add_temp = fitness_convert(pop_list)
-	add_members += add_temp
-	add_members /= 2
+	select_prob, add_temp = selection_convert(pop_list, selection)
+	add_members += replacement_pairs(add_temp)
 
-	# Roulette-select pairs for new generation members 
+	# Select pairs for new generation members 
 	pair_list = pairing(pop_list, select_prob,add_members)
 	
 	# Crosses pair members, then appends new members to population list
@@ -1,6 +1,11 @@
 """ Defines the equations for mechanical stress and strain in three 
 	dimensions."""
 import math
+import numpy as np
+import utility_functions as utility
+
+# Stress returned by the scalar functions for a zero area or moment
+FAILED_STRESS = 999999999
 
 # ~~~ Pure Stress Functions ~~~
 	
@@ -157,4 +162,82 @@ def von_mises(sig_x, sig_y = 0, sig_z = 0, tau_x = 0, tau_y = 0, tau_z = 0):
 	
 	return vm_stress
 	
+# ~~~ Array Stress Functions ~~~
+# Batched versions of the stress functions above. Inputs broadcast as 
+# NumPy arrays. Degenerate geometry (zero area or moment of inertia) is
+# reported as an infinite stress rather than through ZeroDivisionError
+# or the 999999999 sentinel, so failures can be flagged in bulk with 
+# failed_mask.
+
+def _safe_divide(num, den, out):
+	""" Divides into out, setting entries with a zero denominator to 
+		inf. Returns out."""
+	
+	with np.errstate(divide='ignore', invalid='ignore'):
+		np.divide(num, den, out=out)
+	out[np.broadcast_to(np.equal(den, 0), out.shape)] = np.inf
+	return out
+
+def axial_array(force, area, out=None):
+	""" Array version of axial. Returns stress in psi or Pa, inf where 
+	the area is zero."""
+	
+	out = utility.out_buffer(out, force, area)
+	return _safe_divide(force, area, out)
+	
+def bending_array(torque, max_dist, inertia_moment, out=None):
+	""" Array version of bending. Returns stress in psi or Pa, inf where
+	the moment of inertia is zero."""
+	
+	out = utility.out_buffer(out, torque, max_dist, inertia_moment)
+	return _safe_divide(np.multiply(torque, max_dist), inertia_moment, out)
+
+def torsion_array(torque, radius, polar_moment = 0, in_radius = 0, out=None):
+	""" Array version of torsion. Entries with a zero polar moment use 
+	the circular (or hollow circular) section. Returns shear stress in 
+	psi or Pa, inf where the polar moment is still zero."""
+	
+	out = utility.out_buffer(out, torque, radius, polar_moment, in_radius)
+	circ_moment = math.pi/32 * (np.power(np.multiply(2, radius), 4) - np.power(np.multiply(2, in_radius), 4))
+	polar_moment = np.where(np.equal(polar_moment, 0), circ_moment, polar_moment)
+	return _safe_divide(np.multiply(torque, radius), polar_moment, out)
+
+def pressure_vessel_array(in_rad, out_rad, in_pres, out_pres = 0, out=None):
+	""" Array version of pressure_vessel. Returns a (3, ...) array of 
+		tangential, radial, and longitudinal stresses in psi or Pa, inf
+		where the wall thickness is zero."""
+	
+	out = utility.out_buffer(out, in_rad, out_rad, in_pres, out_pres, lead=(3,))
+	term1 = np.multiply(in_pres, np.square(in_rad))
+	term2 = np.multiply(out_pres, np.square(out_rad))
+	term3 = np.square(out_rad) * np.subtract(out_pres, in_pres)
+	term4 = np.square(out_rad) - np.square(in_rad)
+	_safe_divide(term1 - term2 - term3, term4, out[0, ...])
+	_safe_divide(term1 - term2 + term3, term4, out[1, ...])
+	_safe_divide(term1, term4, out[2, ...])
+	return out
+
+def von_mises_array(sig_x, sig_y = 0, sig_z = 0, tau_x = 0, tau_y = 0, tau_z = 0, out=None):
+	""" Array version of von_mises. Returns stress in psi or Pa."""
+	
+	out = utility.out_buffer(out, sig_x, sig_y, sig_z, tau_x, tau_y, tau_z)
+	np.square(np.subtract(sig_x, sig_y), out=out)
+	out += np.square(np.subtract(sig_y, sig_z))
+	out += np.square(np.subtract(sig_z, sig_x))
+	out += 6 * (np.square(tau_x) + np.square(tau_y) + np.square(tau_z))
+	np.sqrt(out, out=out)
+	out *= 1/math.sqrt(2)
+	return out
+
+def failed_mask(stresses):
+	""" Flags entries whose stress is not finite in any of the given 
+		stress arrays, marking degenerate designs. Returns a boolean 
+		array."""
+	
+	failed = None
+	for val in stresses:
+		bad = ~np.isfinite(val)
+		failed = bad if failed is None else (failed | bad)
+	return failed
+	
 # >>> End <<<
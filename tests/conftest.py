@@ -0,0 +1,66 @@
+""" Test setup. The design modules are flat top-level modules that read
+	their input files relative to the working directory, so tests import
+	them from, and run in, the repository root."""
+import os, shutil, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+import pytest
+
+import component_schema
+import design_context
+from full_leg_classes import PopMember
+from population_store import PopulationStore
+
+@pytest.fixture
+def random_store():
+	""" Returns a function building a store (a PopulationStore unless
+		store_type is given) of count random genomes and materials from
+		a seed, with a zero_chance share of zero genes as left by
+		crossover and mutation. Stores with a close() are closed after
+		the test."""
+
+	stores = []
+	def build(seed, count, zero_chance=0, store_type=PopulationStore):
+		rng = np.random.default_rng(seed)
+		layout = component_schema.MEMBER.layout()
+		genes = rng.integers(0, 64, (count, layout.gene_count))
+		genes[rng.random(genes.shape) < zero_chance] = 0
+		material_ids = rng.choice(PopMember.material_table.ids, (count, layout.comp_count))
+		store = store_type(layout, count)
+		store.append(genes, material_ids)
+		stores.append(store)
+		return store
+	yield build
+	for store in stores:
+		if hasattr(store, 'close'):
+			store.close()
+
+@pytest.fixture
+def input_copies(tmp_path, monkeypatch):
+	""" Copies the design input files to a temporary folder and makes a
+		context reading them current. Returns the folder."""
+
+	for location in design_context.DEFAULT_LOCATIONS.values():
+		shutil.copy(location, tmp_path)
+	monkeypatch.setattr(design_context, '_context', None)
+	design_context.configure(*(str(tmp_path / location) for location in design_context.DEFAULT_LOCATIONS.values()))
+	return tmp_path
+
+@pytest.fixture
+def edit_input():
+	""" Returns a function replacing text in an input file and moving
+		its modification time forward, so stamp checks see the edit."""
+
+	def edit(location, old, new):
+		with open(location) as file_object:
+			text = file_object.read()
+		assert old in text
+		with open(location, 'w') as file_object:
+			file_object.write(text.replace(old, new))
+		stat = os.stat(location)
+		os.utime(location, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+	return edit
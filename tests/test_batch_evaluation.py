@@ -0,0 +1,73 @@
+""" Tests comparing the batch evaluation of population stores against
+	the member-by-member evaluation of define_components and 
+	fitness_evaluation."""
+import numpy as np
+import pytest
+
+import design_context
+import fitness_evaluation as fe
+import full_leg_functions as flf
+import genetic_algorithm_functions as gaf
+
+@pytest.fixture
+def no_component_cache(monkeypatch):
+	monkeypatch.setattr(flf, 'component_cache', None)
+
+def test_structure_mass_with_zero_genes(random_store, no_component_cache):
+	""" Structures failing on stress keep their mass; only degenerate 
+		ribs are given no mass, as in define_components."""
+	
+	store = random_store(0, 400, 0.05)
+	pop_list = gaf.store_to_members(store)
+	for mem in pop_list:
+		flf.define_components(mem)
+	rows, results = flf.define_population(store)
+	
+	for comp_name in flf.STRUCTURE_JOINTS:
+		scalar_mass = [mem.mass_dict[comp_name] for mem in pop_list]
+		np.testing.assert_allclose(results[comp_name]['mass'], scalar_mass)
+	np.testing.assert_allclose(store.mass, [mem.total_mass for mem in pop_list])
+
+@pytest.mark.parametrize('zero_chance', [0, 0.05])
+def test_population_evaluation_matches_fitness_evaluation(random_store, no_component_cache, zero_chance):
+	""" population_fitness_evaluation scores components and members as 
+		fitness_evaluation does, and totals the same mass and cost."""
+	
+	store = random_store(1, 300, zero_chance)
+	pop_list = gaf.store_to_members(store)
+	fe.fitness_evaluation(pop_list, workers=1, use_cache=False)
+	rows, results = flf.define_population(store)
+	
+	for comp_name in store.layout.comp_names:
+		comps = [mem.component_dict[comp_name] for mem in pop_list]
+		comp_fitness, comp_valid = fe.stress_eval_array(results[comp_name]['safety_factors'], fe.design_factor)
+		np.testing.assert_allclose(comp_fitness, [comp.fitness for comp in comps])
+		np.testing.assert_array_equal(comp_valid & results[comp_name]['is_valid'], [getattr(comp, 'is_valid', True) for comp in comps])
+		np.testing.assert_allclose(results[comp_name]['cost'], [mem.cost_dict[comp_name] for mem in pop_list])
+	
+	fe.population_fitness_evaluation(store, rows)
+	np.testing.assert_allclose(store.fitness, [mem.total_fitness for mem in pop_list])
+	np.testing.assert_array_equal(store.is_valid, [mem.is_valid for mem in pop_list])
+	np.testing.assert_allclose(store.mass, [mem.total_mass for mem in pop_list])
+	np.testing.assert_allclose(store.cost, [mem.total_cost for mem in pop_list])
+
+def test_batch_caches_follow_design_context(random_store, no_component_cache, input_copies, edit_input):
+	""" Batch plans and material arrays built under one design context
+		are not reused after switching to a context with other cylinder
+		pressures."""
+	
+	store = random_store(4, 200)
+	copied_context = design_context.get_context()
+	design_context.configure()
+	fe.population_fitness_evaluation(store)
+	first = store.fitness.copy()
+	
+	edit_input(input_copies / 'component_forces.txt', 'cyl_pressure = 4', 'cyl_pressure = 15')
+	design_context.set_context(copied_context)
+	store.is_evaluated[:] = False
+	pop_list = gaf.store_to_members(store)
+	fe.fitness_evaluation(pop_list, workers=1, use_cache=False)
+	fe.population_fitness_evaluation(store)
+	
+	assert not np.allclose(store.fitness, first)
+	np.testing.assert_allclose(store.fitness, [mem.total_fitness for mem in pop_list])
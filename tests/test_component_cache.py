@@ -0,0 +1,31 @@
+""" Tests for the size of the LRU evaluation caches."""
+import component_schema
+import evaluation_cache
+import full_leg_functions as flf
+
+def test_resize_evicts_least_recent():
+	""" Shrinking a cache drops its least recently used entries."""
+
+	cache = evaluation_cache.LRUCache(max_size=3)
+	for key in 'abc':
+		cache.put(key, key.upper())
+	cache.get('a')
+	cache.resize(2)
+	assert len(cache) == 2
+	assert 'a' in cache and 'c' in cache and not 'b' in cache
+	cache.put('d', 'D')
+	assert not 'c' in cache
+
+def test_component_cache_sized_from_population(monkeypatch):
+	""" The component cache holds a few generations of every component
+		of the population, rather than a fixed large count."""
+
+	comp_count = component_schema.MEMBER.comp_count
+	assert flf.component_cache.max_size == 100 * comp_count * flf.COMPONENT_CACHE_GENERATIONS
+	monkeypatch.setattr(flf, 'component_cache', evaluation_cache.ComponentCache())
+	flf.size_component_cache(40)
+	assert flf.component_cache.max_size == 40 * comp_count * flf.COMPONENT_CACHE_GENERATIONS
+	flf.size_component_cache(40, generations=2)
+	assert flf.component_cache.max_size == 40 * comp_count * 2
+	monkeypatch.setattr(flf, 'component_cache', None)
+	flf.size_component_cache(40)
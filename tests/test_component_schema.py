@@ -0,0 +1,42 @@
+""" Tests for grouping layout components by their schema's kind."""
+import pytest
+
+import component_schema
+import full_leg_functions as flf
+from genome_layout import compile_layout
+
+def test_kinds_follow_component_types():
+	""" Components are grouped by the kind of their type, not by their
+		names, and share their kind's design variables."""
+
+	layout = compile_layout(('Actuator', 'Frame', 'Spare', 'Pivot'), ('MainCylinder', 'Structure', 'Cylinder', 'Gimbal'), (component_schema.CYLINDER_VARIABLES, component_schema.STRUCTURE.design_variables, component_schema.CYLINDER_VARIABLES, component_schema.GIMBAL.design_variables))
+	assert component_schema.kind_components(layout, 'Cylinder') == ('Actuator', 'Spare')
+	assert component_schema.kind_components(layout, 'Structure') == ('Frame',)
+	assert component_schema.kind_variables(layout, 'Cylinder') == component_schema.CYLINDER_VARIABLES
+	assert component_schema.kind_variables(layout, 'Gimbal') == component_schema.GIMBAL.design_variables
+	assert component_schema.kind_variables(layout, 'Foot') == ()
+
+def test_kind_variables_must_match(monkeypatch):
+	""" Types of one kind with different design variables cannot share
+		the batch columns of their kind."""
+
+	short = component_schema.ComponentSchema('ShortCylinder', ('inner_diameter', 'cyl_length'), kind='Cylinder')
+	monkeypatch.setitem(component_schema.COMPONENT_TYPES, 'ShortCylinder', short)
+	layout = compile_layout(('Actuator', 'Stub'), ('Cylinder', 'ShortCylinder'), (component_schema.CYLINDER_VARIABLES, short.design_variables))
+	with pytest.raises(ValueError):
+		component_schema.kind_variables(layout, 'Cylinder')
+
+def test_batch_plan_groups_member_components():
+	""" The batch plan of the member layout reads every design variable
+		of each component, grouped by kind in layout order."""
+
+	layout = component_schema.MEMBER.layout()
+	plan = flf.batch_plan(layout)
+	for kind in flf.BATCH_KINDS:
+		names = tuple(comp_name for comp_name, schema in component_schema.MEMBER.components if schema.kind == kind)
+		assert plan[kind]['names'] == names
+		for comp_name, columns in zip(names, plan[kind]['columns']):
+			comp_slice = layout.comp_slices[layout.comp_index[comp_name]]
+			assert list(columns) == list(range(comp_slice.start, comp_slice.stop))
+	assert plan['Cylinder']['names'][-2:] == ('MainCylinder', 'ReceiverCylinder')
+	assert plan['Structure']['variables'] == component_schema.STRUCTURE.design_variables
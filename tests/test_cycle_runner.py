@@ -0,0 +1,25 @@
+""" Tests for the store-based generation loop of the cycle runner."""
+import numpy as np
+
+import cycle_runner
+import roulette_selection as roulette
+
+def test_run_cycle(monkeypatch):
+	""" A seeded cycle evolves its store for every generation, growing
+		by the children of 8 pairs a generation plus replacements, and 
+		repeats exactly. Random designs are rarely valid under the 
+		default inputs, so only zero-fitness rows are culled here."""
+
+	exports = []
+	monkeypatch.setattr(cycle_runner.extf, 'export_generation_data', lambda *data: exports.append(data) or 'gen_data.csv')
+	monkeypatch.setattr(roulette, 'fitness_mask', lambda is_valid, fitness, selection=None: np.asarray(fitness) != 0)
+
+	summary = cycle_runner.run_cycle(0, 3, 12, 6)
+	repeat = cycle_runner.run_cycle(0, 3, 12, 6)
+
+	pop_count_list, max_fitness_list, total_fitness_list, suffix = exports[0]
+	assert summary['generations'] == 6
+	assert pop_count_list[0] >= 12 + 16 and all(np.diff(pop_count_list) >= 16)
+	assert all(fitness > 0 for fitness in total_fitness_list)
+	assert exports[1] == exports[0]
+	assert {key: val for key, val in summary.items() if key != 'elapsed'} == {key: val for key, val in repeat.items() if key != 'elapsed'}
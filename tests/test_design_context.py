@@ -0,0 +1,12 @@
+""" Tests for choosing the current design context."""
+import sys
+
+import design_context
+
+def test_unconfigured_context_uses_defaults(monkeypatch):
+	""" Without configure(), the default locations are used even when the
+		running script defines location globals."""
+
+	monkeypatch.setattr(sys.modules['__main__'], 'material_location', 'other_materials.csv', raising=False)
+	monkeypatch.setattr(design_context, '_context', None)
+	assert design_context.get_context().locations() == tuple(design_context.DEFAULT_LOCATIONS.values())
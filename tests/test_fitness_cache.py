@@ -0,0 +1,61 @@
+""" Tests that fitness_cache results are reused only in the design
+	context they were scored in."""
+import numpy as np
+import pytest
+
+import design_context
+import fitness_evaluation as fe
+import genetic_algorithm_functions as gaf
+
+@pytest.fixture
+def store(random_store):
+	return random_store(3, 100)
+
+@pytest.fixture
+def empty_cache(monkeypatch):
+	monkeypatch.setattr(fe, 'fitness_cache', fe.evaluation_cache.FitnessCache())
+
+def cached_and_fresh(store):
+	""" Scores the store's genomes through the cache and without it.
+		Returns both fitness lists."""
+
+	cached = gaf.store_to_members(store)
+	fresh = gaf.store_to_members(store)
+	fe.fitness_evaluation(cached, workers=1)
+	fe.fitness_evaluation(fresh, workers=1, use_cache=False)
+	return [mem.total_fitness for mem in cached], [mem.total_fitness for mem in fresh]
+
+def test_design_factor_change(store, empty_cache, monkeypatch):
+	""" Cached results are not reused after the design factor changes."""
+
+	first, fresh = cached_and_fresh(store)
+	monkeypatch.setattr(fe, 'design_factor', 1.5)
+	second, fresh = cached_and_fresh(store)
+
+	assert second != pytest.approx(first)
+	np.testing.assert_allclose(second, fresh)
+
+def test_design_context_change(store, empty_cache, input_copies, edit_input):
+	""" Cached results are not reused after switching to a design
+		context with different client inputs."""
+
+	copied_context = design_context.get_context()
+	design_context.configure()
+	first, fresh = cached_and_fresh(store)
+	edit_input(input_copies / 'client_info.csv', 'Weight,660,', 'Weight,6600,')
+	design_context.set_context(copied_context)
+	second, fresh = cached_and_fresh(store)
+
+	assert second != pytest.approx(first)
+	np.testing.assert_allclose(second, fresh)
+
+def test_input_file_edit(store, empty_cache, input_copies, edit_input):
+	""" Cached results are not reused after an input file of the current
+		context is edited."""
+
+	first, fresh = cached_and_fresh(store)
+	edit_input(input_copies / 'component_forces.txt', 'cyl_pressure = 4', 'cyl_pressure = 15')
+	second, fresh = cached_and_fresh(store)
+
+	assert second != pytest.approx(first)
+	np.testing.assert_allclose(second, fresh)
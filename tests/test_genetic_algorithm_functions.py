@@ -0,0 +1,94 @@
+""" Tests for the population crossover of genetic_algorithm_functions."""
+import numpy as np
+
+import component_schema
+import genetic_algorithm_functions as gaf
+import utility_functions as utility
+
+def component_bits(layout, bits):
+	""" Splits a (pairs, bit_count) array into per-component arrays."""
+
+	return [bits[:, seg] for seg in layout.comp_bit_slices]
+
+def random_chances(layout, pair_count, seed):
+	rng = np.random.default_rng(seed)
+	return (rng.random((pair_count, layout.bit_count), dtype=np.float32), rng.random((pair_count, layout.bit_count), dtype=np.float32))
+
+def test_xover_masks_points():
+	""" Each component gets 1 to MAX_XOVER_POINTS points, none on its
+		first bit, and its mask flips only at chosen points."""
+
+	layout = component_schema.MEMBER.layout()
+	xover_chance1, xover_chance2 = random_chances(layout, 500, 1)
+	masks, chosen1, chosen2 = gaf.xover_masks(layout, xover_chance1, xover_chance2, np.random.default_rng(2))
+	mask_bits = layout.unpack(masks).astype(bool)
+	chosen = chosen1 | chosen2
+
+	for comp_mask, comp_chosen in zip(component_bits(layout, mask_bits), component_bits(layout, chosen)):
+		point_count = comp_chosen.sum(axis=1)
+		assert point_count.min() >= 1
+		assert point_count.max() <= gaf.MAX_XOVER_POINTS
+		assert not comp_chosen[:, 0].any()
+		assert not comp_mask[:, 0].any()
+		flips = comp_mask[:, 1:] != comp_mask[:, :-1]
+		assert not (flips & ~comp_chosen[:, 1:]).any()
+
+class FixedPointCount():
+	""" Generator stand-in placing the same number of crossover points
+		in every component."""
+
+	def __init__(self, point_count, seed):
+		self.point_count = point_count
+		self.rng = np.random.default_rng(seed)
+
+	def integers(self, low, high, size):
+		return np.full(size, self.point_count)
+
+	def random(self, *args, **kwargs):
+		return self.rng.random(*args, **kwargs)
+
+def test_xover_masks_parity():
+	""" A bit is masked when an odd number of points lie at or before it
+		within its component; two points on the same bit cancel."""
+
+	layout = component_schema.MEMBER.layout()
+	xover_chance1, xover_chance2 = random_chances(layout, 200, 3)
+	for point_count in (1, 2):
+		masks, chosen1, chosen2 = gaf.xover_masks(layout, xover_chance1, xover_chance2, FixedPointCount(point_count, 4))
+		mask_bits = layout.unpack(masks).astype(bool)
+		for comp_mask, comp_chosen in zip(component_bits(layout, mask_bits), component_bits(layout, chosen1 | chosen2)):
+			distinct = comp_chosen.sum(axis=1) == point_count
+			np.testing.assert_array_equal(comp_mask[distinct], np.cumsum(comp_chosen[distinct], axis=1) % 2 == 1)
+			assert not comp_mask[~distinct].any()
+
+def test_population_xover(random_store):
+	""" Children swap the masked bits of their parents, keep each
+		component's leading bit and the materials of their leading
+		parent, and parents' chances adapt at the chosen bits."""
+
+	store = random_store(5, 100)
+	layout = store.layout
+	store.xover_chance[:], store.mutate_chance[:] = random_chances(layout, 100, 6)
+	parents1 = np.arange(0, 100, 2)
+	parents2 = np.arange(1, 100, 2)
+	genome1 = layout.unpack(store.packed_genomes(parents1))
+	genome2 = layout.unpack(store.packed_genomes(parents2))
+	xover_chance1 = store.xover_chance[parents1].copy()
+	xover_chance2 = store.xover_chance[parents2].copy()
+	masks, chosen1, chosen2 = gaf.xover_masks(layout, xover_chance1, xover_chance2, np.random.default_rng(7))
+
+	children, material_ids, xover_chance = gaf.population_xover(store, parents1, parents2, np.random.default_rng(7))
+	mask_bits = layout.unpack(masks).astype(bool)
+	child1, child2 = np.split(layout.unpack(children), 2)
+
+	np.testing.assert_array_equal(child1, np.where(mask_bits, genome2, genome1))
+	np.testing.assert_array_equal(child2, np.where(mask_bits, genome1, genome2))
+	for seg in layout.comp_bit_slices:
+		np.testing.assert_array_equal(child1[:, seg.start], genome1[:, seg.start])
+	np.testing.assert_array_equal(material_ids, np.concatenate((store.material_ids[parents1], store.material_ids[parents2])))
+
+	adapted1 = utility.chance_modify_array(xover_chance1, chosen1, "xover")
+	adapted2 = utility.chance_modify_array(xover_chance2, chosen2, "xover")
+	np.testing.assert_allclose(store.xover_chance[parents1], adapted1)
+	np.testing.assert_allclose(store.xover_chance[parents2], adapted2)
+	np.testing.assert_allclose(xover_chance, np.concatenate((adapted1, adapted2)))
@@ -0,0 +1,91 @@
+""" Tests for the island model migration protocol."""
+import multiprocessing, queue, threading
+
+import numpy as np
+
+import design_context
+import island_model
+import roulette_selection as roulette
+import utility_functions as utility
+
+def test_dead_island_drains_inbox(monkeypatch):
+	""" A run finishes when one island dies early while the live island
+		keeps sending batches too large for an unread queue pipe."""
+
+	seed = 7
+	island_seed = {}
+	real_seed = utility.seed
+
+	def record_seed(seed_val):
+		island_seed['value'] = seed_val
+		real_seed(seed_val)
+
+	def population_evaluate(store, selection=None, rng=None):
+		# Island 0 dies in its first generation, island 1 stays alive
+		if island_seed['value'] == seed:
+			exit("Dead population")
+		return store
+
+	def select_migrants(store, migrant_count):
+		if not len(store):
+			return {'genes': None, 'material_ids': None}
+		return {'genes': np.zeros((2000, 100), dtype=np.int64), 'material_ids': None}
+
+	# The islands are forked, so the patches reach the island processes
+	monkeypatch.setattr(utility, 'seed', record_seed)
+	monkeypatch.setattr(roulette, 'population_evaluate', population_evaluate)
+	monkeypatch.setattr(island_model, 'select_migrants', select_migrants)
+	monkeypatch.setattr(island_model, 'receive_migrants', lambda store, migrants: store)
+	monkeypatch.setattr(island_model, 'max_resets', 0)
+
+	island_results = []
+	run = threading.Thread(target=lambda: island_results.extend(island_model.run_islands(2, 4, 30, migration_interval=2, migrant_count=50, seed=seed)), daemon=True)
+	run.start()
+	run.join(timeout=60)
+	hung = run.is_alive()
+	if hung:
+		for process in multiprocessing.active_children():
+			process.terminate()
+
+	assert not hung
+	assert island_results[0]['history']['pop_count'] == []
+	assert len(island_results[1]['history']['pop_count']) == 30
+
+def test_migrants_replace_least_fit(random_store):
+	""" The fittest valid rows migrate, and replace the least fit rows
+		of the receiving store as newly evaluated rows."""
+
+	source = random_store(1, 50)
+	source.fitness[:] = np.arange(50)
+	source.is_valid[:] = True
+	source.is_valid[49] = False
+	source.is_evaluated[:] = True
+	migrants = island_model.select_migrants(source, 3)
+	np.testing.assert_array_equal(migrants['genes'], source.genes[[48, 47, 46]])
+	np.testing.assert_array_equal(migrants['material_ids'], source.material_ids[[48, 47, 46]])
+
+	target = random_store(2, 40)
+	target.fitness[:] = np.arange(40)[::-1]
+	target.is_evaluated[:] = True
+	island_model.receive_migrants(target, migrants)
+	assert len(target) == 40
+	np.testing.assert_array_equal(target.fitness[:37], np.arange(40)[:2:-1])
+	np.testing.assert_array_equal(target.genes[37:], migrants['genes'])
+	assert target.is_evaluated.all()
+
+def test_island_uses_given_context(monkeypatch):
+	""" An island process runs under the design context passed from the
+		parent."""
+
+	context = design_context.DesignContext('material_properties.csv', 'component_forces.txt', 'client_info.csv')
+	island_context = []
+	def initial_population(member_count):
+		island_context.append(design_context.get_context())
+		return []
+	monkeypatch.setattr(island_model, 'initial_population', initial_population)
+	monkeypatch.setattr(design_context, '_context', None)
+
+	results = queue.Queue()
+	island_model.run_island(0, 1, 4, 1, 5, 2, 'ring', 0, [queue.Queue()], results, context)
+	assert island_context == [context]
+	assert results.get_nowait()[0] == 0
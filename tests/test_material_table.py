@@ -0,0 +1,34 @@
+""" Tests for the material list snapshot."""
+import os, shutil
+
+import extfile_functions as extf
+import material_table
+from full_leg_classes import PopMember
+
+def test_snapshot_stamp_rewritten_after_hash_match(monkeypatch, tmp_path):
+	""" A CSV touched without changes is hashed once; the snapshot then
+		takes its new stamp, so later loads skip the hash."""
+
+	location = str(tmp_path / 'material_properties.csv')
+	shutil.copy('material_properties.csv', location)
+	lists = material_table.load_material_list(location)
+
+	stat = os.stat(location)
+	os.utime(location, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+	hashed = []
+	real_hash = material_table.source_hash
+	def source_hash(location):
+		hashed.append(location)
+		return real_hash(location)
+	monkeypatch.setattr(material_table, 'source_hash', source_hash)
+	monkeypatch.setattr(material_table.extf, 'build_material_list', None)
+
+	assert material_table.load_material_list(location) == lists
+	assert material_table.load_material_list(location) == lists
+	assert len(hashed) == 1
+
+def test_member_material_names():
+	""" PopMember.mat_names is the name list of build_material_list."""
+
+	material_list, name_list, unit_list = extf.build_material_list('material_properties.csv')
+	assert PopMember.mat_names == name_list
@@ -0,0 +1,102 @@
+""" Tests comparing mutate_population against the scalar mutate."""
+import numpy as np
+import pytest
+
+import component_schema
+import mutation_functions as mutate
+import utility_functions as utility
+
+class FixedDraws():
+	""" Generator stand-in returning given chance draws and one mutation
+		type for every mutated component."""
+
+	def __init__(self, draws, selector):
+		self.draws = draws
+		self.selector = selector
+
+	def random(self, shape, dtype=np.float64):
+		return self.draws.astype(dtype).reshape(shape)
+
+	def integers(self, low, high, size):
+		return np.full(size, self.selector)
+
+def random_genomes(layout, count, seed):
+	rng = np.random.default_rng(seed)
+	return layout.encode(rng.integers(0, layout.gene_max + 1, (count, layout.gene_count)))
+
+def scalar_mutation(bits, mutate_index, selector):
+	""" Applies the transpose or invert of the scalar mutate to a list of
+		component bits. Selectors 0, 1 and 2 stand for mutate's
+		transpose up, invert and transpose down."""
+
+	if selector == 1:
+		return mutate.invert(bits, mutate_index)
+	return mutate.transpose(bits, mutate_index, 1 - selector)
+
+@pytest.mark.parametrize('selector', [0, 1, 2])
+def test_mutation_matches_scalar(selector):
+	""" Each component with triggered bits mutates at its last triggered
+		bit, by the transpose or invert of the scalar mutate, with
+		transpositions wrapping around within the component."""
+
+	layout = component_schema.MEMBER.layout()
+	rng = np.random.default_rng(selector)
+	packed = random_genomes(layout, 50, selector)
+	draws = np.ones((50, layout.bit_count))
+	mutate_chance = np.full((50, layout.bit_count), 0.5, dtype=np.float32)
+
+	# Trigger up to two bits per component, including the component ends
+	triggered = {}
+	for row in range(50):
+		for comp, seg in enumerate(layout.comp_bit_slices):
+			bits = rng.choice(np.arange(seg.start, seg.stop), rng.integers(0, 3), replace=False)
+			if row < 2:
+				bits = np.array([seg.start, seg.stop - 1][row:row + 1])
+			draws[row, bits] = 0
+			if len(bits):
+				triggered[row, comp] = int(bits.max())
+
+	mutated, chance = mutate.mutate_population(packed, mutate_chance, layout, FixedDraws(draws, selector))
+
+	bits_before = layout.unpack(packed)
+	bits_after = layout.unpack(mutated)
+	for row in range(50):
+		for comp, seg in enumerate(layout.comp_bit_slices):
+			comp_bits = list(bits_before[row, seg])
+			if (row, comp) in triggered:
+				comp_bits = scalar_mutation(comp_bits, triggered[row, comp] - seg.start, selector)
+			np.testing.assert_array_equal(bits_after[row, seg], comp_bits)
+
+def test_chance_updates():
+	""" Triggered chances are divided down and the rest incremented, as
+		chance_modify does bit by bit."""
+
+	layout = component_schema.MEMBER.layout()
+	rng = np.random.default_rng(5)
+	packed = random_genomes(layout, 20, 5)
+	mutate_chance = (rng.random((20, layout.bit_count)) * 0.9).astype(np.float32)
+	draws = rng.random((20, layout.bit_count)).astype(np.float32)
+
+	mutated, chance = mutate.mutate_population(packed, mutate_chance.copy(), layout, FixedDraws(draws, 1))
+
+	triggered = draws < mutate_chance
+	expected = [[utility.chance_modify(float(val), bool(hit), "mutate") for val, hit in zip(vals, hits)] for vals, hits in zip(mutate_chance, triggered)]
+	np.testing.assert_allclose(chance, expected, rtol=1e-6)
+	np.testing.assert_allclose(chance, utility.chance_modify_array(mutate_chance, triggered, "mutate"))
+
+def test_genome_width():
+	""" Mutated genomes keep the layout's byte width and dtype, leave the
+		input untouched and keep the padding bits clear."""
+
+	layout = component_schema.MEMBER.layout()
+	packed = random_genomes(layout, 100, 6)
+	original = packed.copy()
+	mutate_chance = np.full((100, layout.bit_count), 0.5, dtype=np.float32)
+
+	mutated, chance = mutate.mutate_population(packed, mutate_chance, layout, np.random.default_rng(7))
+
+	assert mutated.shape == (100, layout.byte_count)
+	assert mutated.dtype == np.uint8
+	np.testing.assert_array_equal(packed, original)
+	assert (np.unpackbits(mutated, axis=1)[:, layout.bit_count:] == 0).all()
+	assert (mutated != packed).any()
@@ -0,0 +1,69 @@
+""" Tests comparing the process pool evaluation paths against serial 
+	fitness_evaluation."""
+import numpy as np
+import pytest
+
+import fitness_evaluation as fe
+import genetic_algorithm_functions as gaf
+from population_store import SharedPopulationStore
+
+@pytest.fixture
+def shared_store(random_store):
+	yield random_store(2, 200, store_type=SharedPopulationStore)
+	fe.shutdown_executor()
+
+def test_shared_matches_serial(shared_store):
+	""" Shared-memory workers give each row the fitness, validity, mass
+		and cost fitness_evaluation gives its member."""
+	
+	pop_list = gaf.store_to_members(shared_store)
+	serial_total = fe.fitness_evaluation(pop_list, workers=1, use_cache=False)
+	shared_total = fe.shared_fitness_evaluation(shared_store, workers=2)
+	
+	assert shared_total == pytest.approx(serial_total)
+	np.testing.assert_allclose(shared_store.fitness, [mem.total_fitness for mem in pop_list])
+	np.testing.assert_array_equal(shared_store.is_valid, [mem.is_valid for mem in pop_list])
+	np.testing.assert_allclose(shared_store.mass, [mem.total_mass for mem in pop_list])
+	np.testing.assert_allclose(shared_store.cost, [mem.total_cost for mem in pop_list])
+
+def test_shared_uses_current_design_factor(shared_store, monkeypatch):
+	""" Workers of a reused pool score at the parent's current design 
+		factor."""
+	
+	pop_list = gaf.store_to_members(shared_store)
+	first_total = fe.shared_fitness_evaluation(shared_store, workers=2)
+	monkeypatch.setattr(fe, 'design_factor', 1.5)
+	shared_store.is_evaluated[:] = False
+	second_total = fe.shared_fitness_evaluation(shared_store, workers=2)
+	
+	serial_total = fe.fitness_evaluation(pop_list, workers=1, use_cache=False)
+	assert second_total != pytest.approx(first_total)
+	assert second_total == pytest.approx(serial_total)
+	np.testing.assert_allclose(shared_store.fitness, [mem.total_fitness for mem in pop_list])
+
+def test_member_pool_uses_current_design_factor(shared_store, monkeypatch):
+	""" Member lists sent to a reused pool are scored at the parent's 
+		current design factor."""
+	
+	serial = gaf.store_to_members(shared_store)
+	parallel = gaf.store_to_members(shared_store)
+	fe.fitness_evaluation(gaf.store_to_members(shared_store), workers=2, use_cache=False)
+	monkeypatch.setattr(fe, 'design_factor', 1.5)
+	fe.fitness_evaluation(serial, workers=1, use_cache=False)
+	fe.fitness_evaluation(parallel, workers=2, use_cache=False)
+	np.testing.assert_allclose([mem.total_fitness for mem in parallel], [mem.total_fitness for mem in serial])
+
+def test_shared_follows_edited_inputs(shared_store, input_copies, edit_input):
+	""" Workers of a reused pool score with the cylinder pressures of an
+		edited forces file."""
+	
+	first_total = fe.shared_fitness_evaluation(shared_store, workers=2)
+	edit_input(input_copies / 'component_forces.txt', 'cyl_pressure = 4', 'cyl_pressure = 15')
+	shared_store.is_evaluated[:] = False
+	pop_list = gaf.store_to_members(shared_store)
+	second_total = fe.shared_fitness_evaluation(shared_store, workers=2)
+	
+	serial_total = fe.fitness_evaluation(pop_list, workers=1, use_cache=False)
+	assert second_total != pytest.approx(first_total)
+	assert second_total == pytest.approx(serial_total)
+	np.testing.assert_allclose(shared_store.fitness, [mem.total_fitness for mem in pop_list])
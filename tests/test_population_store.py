@@ -0,0 +1,58 @@
+""" Tests for the array-backed population store."""
+import numpy as np
+
+import component_schema
+import genetic_algorithm_functions as gaf
+from population_store import PopulationStore, SharedPopulationStore
+
+def test_from_members_empty():
+	""" An empty population builds an empty store with the member 
+		schema's layout."""
+	
+	store = PopulationStore.from_members([])
+	assert len(store) == 0
+	assert store.layout is component_schema.MEMBER.layout()
+
+def member_chances(member):
+	return np.concatenate([member.component_dict[comp_name].XoverChance for comp_name in member.schema.layout().comp_names])
+
+def test_members_share_row_chances(random_store):
+	""" Members written from a store use its chance rows in place, and
+		follow their rows through compaction and growth. Members of 
+		removed rows keep a copy of their last chances."""
+	
+	store = random_store(0, 6)
+	store.xover_chance[:] = np.arange(6)[:, None]
+	main_bits = store.layout.comp_bit_slices[store.layout.comp_index['MainCylinder']]
+	pop_list = gaf.store_to_members(store)
+	pop_list[4].component_dict['MainCylinder'].XoverChance[:] = 0.5
+	assert (store.xover_chance[4, main_bits] == 0.5).all()
+	expected = store.xover_chance.copy()
+	
+	store.compact(np.array([True, False, True, True, False, True]))
+	for member, row in zip([pop_list[0], pop_list[2], pop_list[3], pop_list[5]], range(4)):
+		assert np.shares_memory(member.xover_chance, store.xover_chance[row])
+		np.testing.assert_array_equal(member_chances(member), store.xover_chance[row])
+	for row in (1, 4):
+		assert not np.shares_memory(pop_list[row].xover_chance, store._xover_chance)
+		np.testing.assert_array_equal(member_chances(pop_list[row]), expected[row])
+	store.xover_chance[:] = 0
+	np.testing.assert_array_equal(member_chances(pop_list[4]), expected[4])
+	
+	capacity = store.capacity
+	store.append(store.genes, store.material_ids)
+	assert store.capacity > capacity
+	store.xover_chance[3] = 0.25
+	np.testing.assert_array_equal(member_chances(pop_list[5]), 0.25)
+
+def test_closed_shared_store_members(random_store):
+	""" Closing a shared store leaves its members with copies of their
+		chances."""
+	
+	store = random_store(1, 4, store_type=SharedPopulationStore)
+	store.mutate_chance[:] = 0.125
+	pop_list = gaf.store_to_members(store)
+	store.close()
+	for member in pop_list:
+		np.testing.assert_array_equal(member.mutate_chance, 0.125)
+		np.testing.assert_array_equal(member.component_dict['HipGimbal'].MutateChance, 0.125)
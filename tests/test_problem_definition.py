@@ -0,0 +1,36 @@
+""" Tests for the problem definition loader's in-process cache."""
+import os, shutil
+
+import problem_definition
+
+def test_files_hashed_only_when_changed(monkeypatch, tmp_path):
+	""" Repeated loads of unchanged files return the cached problem
+		without hashing; a changed file is hashed and parsed again."""
+
+	force_location = str(tmp_path / 'component_forces.txt')
+	client_location = str(tmp_path / 'client_info.csv')
+	shutil.copy('component_forces.txt', force_location)
+	shutil.copy('client_info.csv', client_location)
+
+	hashed = []
+	real_hash = problem_definition.file_hash
+	def file_hash(location):
+		hashed.append(location)
+		return real_hash(location)
+	monkeypatch.setattr(problem_definition, 'file_hash', file_hash)
+	monkeypatch.setattr(problem_definition, '_problems', {})
+
+	problem = problem_definition.load_problem(force_location, client_location, snapshot=False)
+	assert problem_definition.load_problem(force_location, client_location, snapshot=False) is problem
+	assert len(hashed) == 2
+
+	with open(client_location) as file_object:
+		client_info = file_object.read().replace('Weight,660,', 'Weight,6600,')
+	with open(client_location, 'w') as file_object:
+		file_object.write(client_info)
+	stat = os.stat(client_location)
+	os.utime(client_location, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+	changed = problem_definition.load_problem(force_location, client_location, snapshot=False)
+	assert len(hashed) == 4
+	assert changed.client_info['Weight'] == 6600
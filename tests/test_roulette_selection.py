@@ -0,0 +1,224 @@
+""" Tests for the selection samplers and population culling."""
+import math
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import roulette_selection as roulette
+import utility_functions as utility
+from population_store import INITIAL_AGE
+
+def test_alias_table_equal_weights():
+	""" Equal weights that scale to just under 1 leave no donor column,
+		and every member keeps a probability of 1."""
+	
+	table = roulette.AliasTable([0.01] * 6)
+	np.testing.assert_array_equal(table.prob, 1)
+	draws = table.draw(60000, np.random.default_rng(0))
+	counts = np.bincount(draws, minlength=6)
+	assert counts.min() > 9000 and counts.max() < 11000
+
+def test_alias_table_single_member():
+	""" A single member is drawn every time."""
+	
+	table = roulette.AliasTable([2.5])
+	np.testing.assert_array_equal(table.draw(100, np.random.default_rng(0)), 0)
+
+def test_alias_table_matches_weights():
+	""" Draw frequencies follow the fitness weights."""
+	
+	weights = np.array([1, 2, 3, 4, 0, 10], dtype=float)
+	table = roulette.AliasTable(weights)
+	draws = table.draw(200000, np.random.default_rng(0))
+	np.testing.assert_allclose(np.bincount(draws, minlength=len(weights)) / len(draws), weights / weights.sum(), atol=0.005)
+
+def cull_store(random_store, seed, count):
+	""" Builds an evaluated store with a spread of ages, some invalid 
+		rows and some zero and negative fitness scores. The mass column
+		holds each row's original index so survivors can be traced."""
+	
+	rng = np.random.default_rng(seed)
+	store = random_store(seed, count)
+	store.age[:] = rng.integers(-3, roulette.max_age + 1, count)
+	store.fitness[:] = rng.random(count) * 10
+	store.fitness[rng.random(count) < 0.15] = 0
+	store.fitness[rng.random(count) < 0.1] *= -1
+	store.is_valid[:] = rng.random(count) > 0.1
+	store.is_evaluated[:] = True
+	store.mass[:] = np.arange(count)
+	return store
+
+def store_members(store):
+	""" Copies the culled columns of a store into simple member objects,
+		as read by age, cull and fitness_convert."""
+	
+	return [SimpleNamespace(row=int(row), age=int(age), total_fitness=float(fitness), is_valid=bool(is_valid)) for row, age, fitness, is_valid in zip(store.mass, store.age, store.fitness, store.is_valid)]
+
+def test_population_cull_ages_survivors(random_store):
+	""" Every surviving row is a generation older."""
+	
+	store = cull_store(random_store, 0, 300)
+	ages = store.age.copy()
+	roulette.population_cull(store, 'roulette', np.random.default_rng(1))
+	np.testing.assert_array_equal(store.age, ages[store.mass.astype(int)] + 1)
+
+def test_population_cull_mask_count(random_store):
+	""" The rows removed are the age deaths plus the invalid and 
+		zero-fitness rows, and the returned pair count replaces them."""
+	
+	store = cull_store(random_store, 2, 300)
+	dead = roulette.age_mask(store.age, np.random.default_rng(3))
+	unfit = ~store.is_valid | (store.fitness == 0)
+	kept = ~dead & ~unfit
+	
+	pairs = roulette.population_cull(store, 'roulette', np.random.default_rng(3))
+	assert len(store) == kept.sum()
+	assert pairs == (300 - kept.sum()) / 2
+	np.testing.assert_array_equal(store.mass, np.nonzero(kept)[0])
+
+def test_population_cull_unevaluated_rows(random_store):
+	""" Unevaluated rows are only subject to age deaths, and tournament
+		and rank selection keep zero-fitness rows."""
+	
+	store = cull_store(random_store, 4, 200)
+	store.is_evaluated[:100] = False
+	dead = roulette.age_mask(store.age, np.random.default_rng(5))
+	unfit = ~store.is_valid | (store.fitness == 0)
+	unfit[:100] = False
+	roulette.population_cull(store, 'roulette', np.random.default_rng(5))
+	np.testing.assert_array_equal(store.mass, np.nonzero(~dead & ~unfit)[0])
+	
+	store = cull_store(random_store, 4, 200)
+	is_valid = store.is_valid.copy()
+	roulette.population_cull(store, 'tournament', np.random.default_rng(5))
+	np.testing.assert_array_equal(store.mass, np.nonzero(~dead & is_valid)[0])
+
+def test_population_cull_compacts_once(random_store, monkeypatch):
+	""" The store is compacted in a single call."""
+	
+	store = cull_store(random_store, 6, 200)
+	compact_calls = []
+	real_compact = store.compact
+	def compact(keep):
+		compact_calls.append(keep)
+		return real_compact(keep)
+	monkeypatch.setattr(store, 'compact', compact)
+	roulette.population_cull(store, 'roulette', np.random.default_rng(7))
+	assert len(compact_calls) == 1
+
+def test_population_cull_matches_list_order(random_store, monkeypatch):
+	""" After compact() the rows are in the order, and have the ages, 
+		left by age followed by fitness_convert on a member list."""
+	
+	store = cull_store(random_store, 8, 300)
+	pop_list = store_members(store)
+	
+	monkeypatch.setattr(utility, 'rng', np.random.default_rng(9))
+	pop_list, age_pairs = roulette.age(pop_list)
+	select_prob, removed = roulette.fitness_convert(pop_list)
+	roulette.population_cull(store, 'roulette', np.random.default_rng(9))
+	
+	assert [mem.row for mem in pop_list] == list(store.mass.astype(int))
+	assert [mem.age for mem in pop_list] == list(store.age)
+	np.testing.assert_allclose(select_prob, roulette.cumulative_fitness(store.fitness))
+
+def test_tournament_favours_fitter_members():
+	""" Win counts rise with fitness, and the chance of the best member
+		winning matches 1 - (1 - 1/n)**k for k entrants."""
+	
+	fitness = np.array([3.0, -1.0, 0.0, 7.0, 5.0])
+	tournament = roulette.Tournament(fitness, size=3)
+	wins = np.bincount(tournament.draw(100000, np.random.default_rng(0)), minlength=5)
+	assert list(np.argsort(wins)) == list(np.argsort(fitness))
+	assert abs(wins[3] / wins.sum() - (1 - (4 / 5) ** 3)) < 0.01
+	
+	# A single entrant is a uniform draw
+	wins = np.bincount(roulette.Tournament(fitness, size=1).draw(100000, np.random.default_rng(1)), minlength=5)
+	np.testing.assert_allclose(wins / wins.sum(), 0.2, atol=0.01)
+
+def test_rank_weights_linear():
+	""" Weights rise by a constant step in fitness order, from 
+		2 - pressure to pressure, and sum to the member count."""
+	
+	fitness = np.array([4.0, -2.0, 9.0, 0.0, 4.0, 1.5])
+	weights = roulette.rank_weights(fitness, pressure=1.6)
+	ordered = weights[np.argsort(fitness, kind='stable')]
+	np.testing.assert_allclose(np.diff(ordered), 2 * 0.6 / 5)
+	np.testing.assert_allclose(ordered[[0, -1]], [0.4, 1.6])
+	assert abs(weights.sum() - 6) < 1e-9
+	np.testing.assert_array_equal(roulette.rank_weights([-5.0]), [1])
+	np.testing.assert_allclose(roulette.rank_weights(fitness, pressure=1), 1)
+
+def fitness_members(fitness, is_valid=None):
+	if is_valid is None:
+		is_valid = [True] * len(fitness)
+	return [SimpleNamespace(row=row, total_fitness=value, is_valid=valid) for row, (value, valid) in enumerate(zip(fitness, is_valid))]
+
+def test_selection_convert_zero_and_negative_fitness():
+	""" Tournament and rank selection keep valid members with zero or 
+		negative fitness and rank them by score, while roulette drops
+		zero scores and never draws negative ones."""
+	
+	fitness = [-3.0, 0.0, 2.0, -1.0, 0.0, 5.0]
+	is_valid = [True, True, True, True, False, True]
+	rng = np.random.default_rng(0)
+	
+	pop_list = fitness_members(fitness, is_valid)
+	tournament, removed = roulette.selection_convert(pop_list, 'tournament')
+	assert removed == 1 and [mem.row for mem in pop_list] == [0, 1, 2, 3, 5]
+	np.testing.assert_array_equal(tournament.fitness, [-3, 0, 2, -1, 5])
+	wins = np.bincount(tournament.draw(50000, rng), minlength=5)
+	assert list(np.argsort(wins)) == [0, 3, 1, 2, 4]
+	
+	pop_list = fitness_members(fitness, is_valid)
+	select_prob, removed = roulette.selection_convert(pop_list, 'rank')
+	assert removed == 1 and len(pop_list) == 5
+	draws = np.bincount(roulette.draw_members(select_prob, 50000, rng), minlength=5) / 50000
+	expected = roulette.rank_weights([-3, 0, 2, -1, 5]) / 5
+	np.testing.assert_allclose(draws, expected, atol=0.01)
+	
+	pop_list = fitness_members(fitness, is_valid)
+	select_prob, removed = roulette.selection_convert(pop_list, 'roulette')
+	assert removed == 2 and [mem.row for mem in pop_list] == [0, 2, 3, 5]
+	draws = np.bincount(roulette.draw_members(select_prob, 50000, rng), minlength=4)
+	assert draws[0] == 0 and draws[2] == 0
+	assert abs(draws[1] / draws[3] - 2 / 5) < 0.03
+
+def test_selection_convert_all_negative_fitness():
+	""" A population scored entirely at or below zero can still be 
+		ranked, but gives roulette nothing to draw from."""
+	
+	pop_list = fitness_members([-4.0, -1.0, -2.5])
+	select_prob, removed = roulette.selection_convert(pop_list, 'rank')
+	draws = np.bincount(roulette.draw_members(select_prob, 30000, np.random.default_rng(2)), minlength=3)
+	assert removed == 0 and draws[1] > draws[2] > draws[0] > 0
+	
+	with pytest.raises(SystemExit):
+		roulette.selection_convert(fitness_members([-4.0, 0.0, -2.5]), 'roulette')
+	with pytest.raises(ValueError):
+		roulette.selection_convert(fitness_members([1.0]), 'ranked')
+
+def test_population_evaluate(random_store):
+	""" A generation culls the store once, then appends two unevaluated
+		children for each of 8 pairs plus the replacement pairs."""
+	
+	store = cull_store(random_store, 10, 200)
+	dead = roulette.age_mask(store.age, np.random.default_rng(11))
+	kept = ~dead & store.is_valid & (store.fitness != 0)
+	
+	roulette.population_evaluate(store, 'roulette', np.random.default_rng(11))
+	survivors = int(kept.sum())
+	assert len(store) == survivors + 2 * math.ceil(8 + (200 - survivors) / 2)
+	np.testing.assert_array_equal(store.mass[:survivors], np.nonzero(kept)[0])
+	assert store.is_evaluated[:survivors].all()
+	assert not store.is_evaluated[survivors:].any()
+	assert (store.age[survivors:] == INITIAL_AGE).all()
+
+def test_population_evaluate_dead_store(random_store):
+	""" A store with nothing left to select from ends the program."""
+	
+	store = cull_store(random_store, 12, 50)
+	store.fitness[:] = 0
+	with pytest.raises(SystemExit):
+		roulette.population_evaluate(store, 'roulette', np.random.default_rng(13))
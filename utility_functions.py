@@ -1,8 +1,28 @@
 """ Contains utility functions for the program to facilitate with 
 	handling of data."""
 import random,math
+import numpy as np
 from pprint import pprint
 
+# Shared NumPy generator for the vectorized GA functions. Replaced by seed().
+rng = np.random.default_rng()
+
+# Chance modifiers for each chance type. *_up is a division factor, 
+# *_down is an increment factor.
+xover_up = 10
+xover_down = 0.05
+mutate_up = 10
+mutate_down = 0.05
+
+def seed(seed_val):
+	""" Seeds both the random module and the shared NumPy generator so
+		scalar and vectorized GA functions are reproducible. Returns 
+		void."""
+	
+	global rng
+	random.seed(seed_val)
+	rng = np.random.default_rng(seed_val)
+
 def chance_check(threshold):
 	""" Evaluates a probabliliy condition as True or False based on a
 		provided threshold. Returns a boolean."""
@@ -36,13 +56,6 @@ def chance_modify(chance_val, prob_decrease, chance_type):
 	true or false and the type of chance being evaluated. False slightly
 	increases the chance, whereas True halves the probability."""
 	
-	# Set modifiers for the different chance types. *_up is a 
-	# division factor, *_down is an increment factor.
-	xover_up = 10
-	xover_down = 0.05
-	mutate_up = 10
-	mutate_down = 0.05
-	
 	# Determine which mod set to use for the probability adjustment.
 	if chance_type == "xover":
 		# Modifying crossover chances, check for True/False condition
@@ -69,6 +82,22 @@ def chance_modify(chance_val, prob_decrease, chance_type):
 		input("Chance Modifier Type Error")
 	return chance_val
 
+def chance_modify_array(chance_vals, prob_decrease, chance_type):
+	""" Array version of chance_modify. prob_decrease is a boolean mask
+		of triggered chances: triggered chances are divided down, all 
+		others are incremented. Results are clipped to [0, 1]. Returns
+		the modified chance array."""
+	
+	if chance_type == "xover":
+		chance_up, chance_down = xover_up, xover_down
+	elif chance_type == "mutate":
+		chance_up, chance_down = mutate_up, mutate_down
+	else:
+		raise ValueError("Chance Modifier Type Error: " + str(chance_type))
+	
+	chance_vals = np.where(prob_decrease, chance_vals / chance_up, chance_vals + chance_down)
+	return np.clip(chance_vals, 0, 1, out=chance_vals)
+
 def name_get(target,member,val = ''):
 	""" Returns the target object of a call to a component with an ID 
 	number attached based on a target name and component. If a value is 
@@ -128,6 +157,10 @@ def dict_search(old_val_dict,mode1 = 'max',mode2 = 'abs'):
 	return m_index, m_val
 
 def set_mat_properties(mat_ID,mat_list):
+	# Indexed material tables look the ID up directly
+	if hasattr(mat_list,'properties'):
+		return mat_list.properties(mat_ID)
+	
 	MatProperties = {}
 	#~ setattr(pop_member,('MatProperties'),{})
 	# Cycles through material list looking for a matching name value
@@ -143,6 +176,16 @@ def set_mat_properties(mat_ID,mat_list):
 		input("Material ID Error")
 	return MatProperties
 
+def out_buffer(out, *arrays, lead=()):
+	""" Returns the caller-provided output buffer, or a new float buffer
+		of the broadcast shape of the input arrays with any leading 
+		dimensions prepended. Used by the array geometry and stress 
+		functions."""
+	
+	if out is None:
+		out = np.empty(tuple(lead) + np.broadcast_shapes(*(np.shape(a) for a in arrays)))
+	return out
+
 # ~~~ Binary Operations ~~~
 
 def is_valid_population(pop_list):
@@ -171,35 +214,17 @@ def binary_encode (value):
 	#Values currently limited to integers, will consider decimals later
 	bin_place = 6	
 	
-	# Special Case:
-	if value == 0:
-		bin_string = [0] * bin_place
-		return bin_string
-
-	#Construct binary string
-	# Hard-coded values: consider revising. Upper value limit of 63
-
-	bit_max = bin_place
-	bin_string =[0] * bin_place
-	current_sum =  0
-	while bin_place >= 1:
-		bit_val = 2**(bin_place-1)
-		try:	
-			val_test = int(value) - (bit_val)
-		except ValueError:
-			print(value)
-			print(type(value))
-			input("Value Error")
-		current_sum += bit_val
-
-		if current_sum > int(value):
-			current_sum -= bit_val
-			bin_string[bit_max-bin_place] = 0
-		elif val_test < 0:
-			bin_string[bit_max-bin_place] = 0
-		else:
-			bin_string[bit_max-bin_place] = 1
-		bin_place -= 1
+	# Hard-coded values: consider revising. Values saturate at the upper
+	# limit of 63 and the lower limit of 0.
+	try:
+		value = min(max(int(value), 0), 2**bin_place - 1)
+	except ValueError:
+		print(value)
+		print(type(value))
+		input("Value Error")
+	
+	# Shift each bit down to the ones place and mask it, MSB first
+	bin_string = [(value >> shift) & 1 for shift in range(bin_place-1, -1, -1)]
 	return bin_string
 
 def binary_decode(bin_string):